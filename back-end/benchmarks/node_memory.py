@@ -0,0 +1,119 @@
+"""노드 1개당 메모리 사용량 비교 (기존 FileNode vs 압축 FileNode)
+
+    python benchmarks/node_memory.py [노드 수]
+
+back-end 디렉토리에서 실행한다. 디스크를 읽지 않고 같은 모양의 가상 트리
+(디렉토리 100개 x 파일 N/100개)를 만들어 tracemalloc으로 측정한다.
+"""
+import os
+import sys
+import time
+import uuid
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from indexer.filesystem import FileSystem  # noqa: E402
+
+ROOT = "/volumes/monitored"
+
+
+class LegacyFileNode:
+    """압축 전 FileNode (비교용 사본)"""
+
+    def __init__(self, name: str, path: str, is_directory: bool = False):
+        self.uuid = str(uuid.uuid4())
+        self.name = name
+        self.path = path
+        self.is_directory = is_directory
+        self.parent = None
+        self.children = []
+        self.metadata = {}
+        self.created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.modified_at = self.created_at
+
+
+class NullIndexer:
+    """측정에서 히스토리 메모리를 빼기 위한 빈 인덱서"""
+
+    root_path = None
+
+    def add_event(self, *args, **kwargs):
+        pass
+
+    def add_events(self, events):
+        pass
+
+
+def make_metadata(name: str, index: int) -> dict:
+    now = time.time()
+    return {
+        "size": 1000 + index,
+        "created": datetime.fromtimestamp(now).strftime("%Y-%m-%d %H:%M:%S"),
+        "modified": datetime.fromtimestamp(now).strftime("%Y-%m-%d %H:%M:%S"),
+        "is_hidden": name.startswith("."),
+        "permissions": oct(0o100644)[-3:],
+        "owner": 1000,
+        "group": 1000,
+        "mtime_ns": int(now * 1e9) + index,
+        "inode": 1_000_000 + index,
+    }
+
+
+def entries(count: int):
+    directories = 100
+    for d in range(directories):
+        directory = os.path.join(ROOT, f"project_{d:03d}")
+        yield directory, True, make_metadata(directory, d)
+        for f in range(count // directories):
+            name = f"file_{f:06d}.txt"
+            yield os.path.join(directory, name), False, make_metadata(name, f)
+
+
+def measure(build) -> int:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    keep = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del keep
+    return after - before
+
+
+def build_legacy(count: int):
+    nodes, path_index = {}, {}
+    root = LegacyFileNode(os.path.basename(ROOT), ROOT, True)
+    nodes[root.uuid] = root
+    path_index[ROOT] = root.uuid
+    for path, is_directory, metadata in entries(count):
+        node = LegacyFileNode(os.path.basename(path), path, is_directory)
+        node.metadata = metadata
+        parent = nodes[path_index[os.path.dirname(path)]]
+        node.parent = parent
+        parent.children.append(node)
+        nodes[node.uuid] = node
+        path_index[path] = node.uuid
+    return nodes, path_index
+
+
+def build_compact(count: int):
+    file_system = FileSystem(NullIndexer())
+    file_system.root_path = ROOT
+    file_system.create_node(ROOT, is_directory=True)
+    file_system.bulk_create(entries(count))
+    return file_system
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    legacy = measure(lambda: build_legacy(count))
+    compact = measure(lambda: build_compact(count))
+    print(f"nodes: {count:,}")
+    print(f"legacy : {legacy / count:8.1f} bytes/node ({legacy / 2**20:.1f} MiB)")
+    print(f"compact: {compact / count:8.1f} bytes/node ({compact / 2**20:.1f} MiB)")
+    print(f"saving : {(1 - compact / legacy) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+from bisect import bisect_left, bisect_right, insort
+from itertools import chain
+from typing import Iterable, Iterator, List, Optional
+
+# 이름 버킷 하나의 목표 크기 (2배를 넘으면 반으로 나눔)
+BUCKET_SIZE = 512
+
+
+class ChildMap:
+    """이름으로 찾고 이름순으로 순회하는 자식 노드 컨테이너
+
+    이름 -> 노드 dict로 O(1) 조회/삭제 판단을 하고, 이름은 크기가 제한된 정렬
+    버킷들의 목록(청크 정렬 리스트)으로 유지한다. 각 버킷의 마지막 이름 목록을
+    bisect해 버킷을 찾으므로 추가/삭제는 O(log n + 버킷 크기)이고, 자식이 수십만
+    개인 디렉토리에서도 전체 목록을 옮기지 않는다. sorted() 호출 없이 이름순 순회와
+    커서 기반 페이지 조회를 제공한다.
+
+    버킷 목록은 copy-on-write다. 변경할 때는 바뀌는 버킷 하나와 버킷 참조 목록
+    (spine, 크기 n / 버킷 크기)만 복사해 (버킷 목록, 최댓값 목록) 쌍을 한 번에
+    바꾼다. 읽는 쪽은 잠금 없이 시작 시점의 쌍을 끝까지 순회하므로 쓰기 중에도
+    "changed size during iteration" 오류나 중복/누락이 없다. 추가는 dict에 먼저
+    넣고 버킷을 바꾸며, 삭제는 버킷을 먼저 바꾸고 dict에서 뺀다 (순회 중 사라진
+    이름은 건너뜀). 쓰기는 FileSystem의 쓰기 잠금 아래에서 한 스레드만 한다.
+    """
+
+    __slots__ = ("_by_name", "_spine")
+
+    def __init__(self):
+        self._by_name = {}
+        # (버킷 목록, 버킷별 마지막 이름 목록). 발행한 뒤에는 수정하지 않음
+        self._spine = ([], [])
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+    def __bool__(self) -> bool:
+        return bool(self._by_name)
+
+    def __iter__(self) -> Iterator:
+        by_name = self._by_name
+        for name in chain.from_iterable(self._spine[0]):
+            node = by_name.get(name)
+            if node is not None:
+                yield node
+
+    def __contains__(self, item) -> bool:
+        if isinstance(item, str):
+            return item in self._by_name
+        return self._by_name.get(item.name) is item
+
+    def get(self, name: str):
+        return self._by_name.get(name)
+
+    def _insert(self, name: str):
+        buckets, maxes = self._spine
+        if not buckets:
+            self._spine = ([[name]], [name])
+            return
+        index = min(bisect_left(maxes, name), len(buckets) - 1)
+        bucket = buckets[index][:]
+        insort(bucket, name)
+        buckets, maxes = buckets[:], maxes[:]
+        if len(bucket) > 2 * BUCKET_SIZE:
+            half = len(bucket) // 2
+            buckets[index:index + 1] = [bucket[:half], bucket[half:]]
+            maxes[index:index + 1] = [bucket[half - 1], bucket[-1]]
+        else:
+            buckets[index] = bucket
+            maxes[index] = bucket[-1]
+        self._spine = (buckets, maxes)
+
+    def _delete(self, name: str):
+        buckets, maxes = self._spine
+        index = bisect_left(maxes, name)
+        if index == len(buckets):
+            return
+        bucket = buckets[index]
+        position = bisect_left(bucket, name)
+        if position == len(bucket) or bucket[position] != name:
+            return
+        bucket = bucket[:position] + bucket[position + 1:]
+        buckets, maxes = buckets[:], maxes[:]
+        if bucket:
+            buckets[index] = bucket
+            maxes[index] = bucket[-1]
+        else:
+            del buckets[index]
+            del maxes[index]
+        self._spine = (buckets, maxes)
+
+    def add(self, node):
+        """노드 추가 (같은 이름이 있으면 교체)"""
+        name = node.name
+        exists = name in self._by_name
+        self._by_name[name] = node
+        if not exists:
+            self._insert(name)
+
+    def add_many(self, nodes: Iterable):
+        """여러 노드 추가 (많으면 이름 목록을 한 번에 다시 나눔)"""
+        added = []
+        for node in nodes:
+            if node.name not in self._by_name:
+                added.append(node.name)
+            self._by_name[node.name] = node
+        if len(added) < BUCKET_SIZE:
+            for name in added:
+                self._insert(name)
+            return
+        names = list(chain.from_iterable(self._spine[0]))
+        names.extend(dict.fromkeys(added))
+        names.sort()
+        buckets = [
+            names[start:start + BUCKET_SIZE] for start in range(0, len(names), BUCKET_SIZE)
+        ]
+        self._spine = (buckets, [bucket[-1] for bucket in buckets])
+
+    def remove(self, node):
+        """노드 제거 (다른 노드가 같은 이름을 차지하고 있으면 무시)"""
+        name = node.name
+        if self._by_name.get(name) is not node:
+            return
+        self._delete(name)
+        del self._by_name[name]
+
+    def after(self, name: Optional[str] = None, limit: Optional[int] = None) -> List:
+        """name 다음부터 이름순으로 최대 limit개 (커서 기반 페이지 조회용)"""
+        buckets, maxes = self._spine
+        by_name = self._by_name
+        index = bisect_right(maxes, name) if name is not None else 0
+        page = []
+        for bucket in buckets[index:]:
+            start = bisect_right(bucket, name) if name is not None else 0
+            for child_name in bucket[start:]:
+                node = by_name.get(child_name)
+                if node is not None:
+                    page.append(node)
+                    if limit is not None and len(page) >= limit:
+                        return page
+            name = None
+        return page
@@ -1,118 +1,491 @@
 import os
 import json
+import logging
+import threading
+from collections import Counter
+from bisect import bisect_left, bisect_right
 from datetime import datetime
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Iterable, Iterator, Tuple
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "file_index.json"
+HISTORY_FILE = "file_history.json"
+JOURNAL_FILE = "file_history.journal"
+ROTATED_JOURNAL_FILE = "file_history.journal.1"
+
+# (event_type, file_path, metadata, is_directory)
+EventRecord = Tuple[str, str, dict, Optional[bool]]
+
+# 정렬 경로 목록에 반영되지 않은 변경이 목록 크기의 이 비율을 넘으면 목록을 버리고
+# 다음 디렉토리 이동 때 다시 정렬
+PATH_MERGE_RATIO = 64
+
+
+def _to_timestamp(value: str) -> float:
+    return datetime.fromisoformat(value).timestamp()
+
 
 class FileIndexer:
-    def __init__(self, log_directory: str):
+    def __init__(
+        self,
+        log_directory: str,
+        checkpoint_interval: float = 30.0,
+        checkpoint_threshold: int = 10000,
+        fsync: bool = True,
+    ):
         self.log_directory = log_directory
         self.index: Dict[str, dict] = {}  # path -> metadata
+        # 디렉토리 이동 시 하위 경로를 bisect로 찾기 위한 정렬 경로 목록 (필요할 때 생성)
+        self._paths: Optional[List[str]] = None
+        self._path_changes: Dict[str, bool] = {}  # 목록에 반영 전 변경: 경로 -> 추가/삭제
         self.history: List[dict] = []
+        # history 위치(position) 기반 보조 인덱스
+        self._timestamps: List[float] = []  # history와 같은 순서의 epoch 초 (정렬 유지)
+        self._by_path: Dict[str, List[int]] = {}  # path -> 이벤트 위치 목록
+        self._by_type: Dict[str, List[int]] = {}  # event_type -> 이벤트 위치 목록
+        # 증분 통계 (이벤트 유형은 history 기준, 나머지는 현재 index 기준)
+        self._root_path: Optional[str] = None
+        self._event_counts: Counter = Counter()
+        self._extension_counts: Counter = Counter()
+        self._top_level_counts: Counter = Counter()
+        self._total_bytes = 0
+        self._file_count = 0
+        self._dir_count = 0
+        self.checkpoint_interval = checkpoint_interval  # 체크포인트 주기 (초)
+        self.checkpoint_threshold = checkpoint_threshold  # 저널 항목 수 임계치
+        self.fsync = fsync  # 이벤트마다 저널을 디스크에 동기화할지 여부
+
+        self._lock = threading.RLock()  # 메모리 상태 + 저널 쓰기 보호
+        self._checkpoint_lock = threading.Lock()  # 체크포인트 직렬화
+        self._last_seq = 0
+        self._journal = None
+        self._journal_entries = 0  # 마지막 체크포인트 이후 저널에 쌓인 이벤트 수
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._checkpoint_thread = None
+
         self.ensure_log_directory()
         self.load_index()
         self.load_history()
+        self.recover()
+        self.start_checkpointer()
+
+    @property
+    def root_path(self) -> Optional[str]:
+        return self._root_path
+
+    @root_path.setter
+    def root_path(self, value: Optional[str]):
+        """최상위 디렉토리 통계의 기준 경로 (변경 시 통계 재구성)"""
+        value = os.path.abspath(value) if value else None
+        if value != self._root_path:
+            with self._lock:
+                self._root_path = value
+                self._rebuild_statistics()
+
+    def _path(self, file_name: str) -> str:
+        return os.path.join(self.log_directory, file_name)
 
     def ensure_log_directory(self):
         """로그 디렉토리 생성"""
         if not os.path.exists(self.log_directory):
             os.makedirs(self.log_directory)
 
+    def read_journal(self) -> List[dict]:
+        """저널(회전된 저널 포함)에 기록된 이벤트를 순서대로 읽기"""
+        events = []
+        for file_name in (ROTATED_JOURNAL_FILE, JOURNAL_FILE):
+            journal_path = self._path(file_name)
+            if not os.path.exists(journal_path):
+                continue
+            with open(journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        events.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # 충돌 중 잘린 마지막 줄은 확인(ack)되지 않은 이벤트이므로 무시
+                        logger.warning(f"Skipping torn journal entry in {file_name}")
+        return events
+
     def load_index(self):
-        """인덱스 파일 로드"""
-        index_path = os.path.join(self.log_directory, "file_index.json")
+        """인덱스 스냅샷 로드 후 저널 재생"""
+        index_path = self._path(INDEX_FILE)
         if os.path.exists(index_path):
             with open(index_path, "r", encoding="utf-8") as f:
                 self.index = json.load(f)
+        self._paths = None
+        self._path_changes = {}
+        self._rebuild_statistics()
+
+        # 인덱스 갱신은 순서대로 재적용해도 결과가 같으므로 저널 전체를 재생
+        for event in self.read_journal():
+            self._apply_to_index(event)
 
     def load_history(self):
-        """히스토리 파일 로드"""
-        history_path = os.path.join(self.log_directory, "file_history.json")
+        """히스토리 스냅샷 로드 후 저널 꼬리(tail) 재생"""
+        history_path = self._path(HISTORY_FILE)
         if os.path.exists(history_path):
             with open(history_path, "r", encoding="utf-8") as f:
                 self.history = json.load(f)
 
+        # 시퀀스 번호가 없는 이전 형식의 히스토리 보정
+        for position, event in enumerate(self.history, start=1):
+            event.setdefault("seq", position)
+        self._last_seq = self.history[-1]["seq"] if self.history else 0
+
+        # 스냅샷에 이미 포함된 이벤트는 건너뛰고 나머지만 추가
+        for event in self.read_journal():
+            if event["seq"] > self._last_seq:
+                self.history.append(event)
+                self._last_seq = event["seq"]
+
+        self._rebuild_history_indexes()
+
+    def _rebuild_history_indexes(self):
+        """히스토리 보조 인덱스 재구성"""
+        self._timestamps = []
+        self._by_path = {}
+        self._by_type = {}
+        self._event_counts = Counter()
+        for position, event in enumerate(self.history):
+            self._index_event(position, event)
+
+    def _index_event(self, position: int, event: dict):
+        timestamp = _to_timestamp(event["timestamp"])
+        # 시계가 뒤로 가더라도 이진 탐색이 가능하도록 단조 증가 유지
+        if self._timestamps and timestamp < self._timestamps[-1]:
+            timestamp = self._timestamps[-1]
+        self._timestamps.append(timestamp)
+        self._by_path.setdefault(event["file_path"], []).append(position)
+        self._by_type.setdefault(event["event_type"], []).append(position)
+        self._event_counts[event["event_type"]] += 1
+
+    def _top_level(self, file_path: str, is_directory: bool) -> str:
+        """root_path 기준 최상위 디렉토리 이름 (루트 자신과 루트 바로 아래 파일은 ".")"""
+        if not self._root_path or not file_path.startswith(self._root_path + os.sep):
+            return "."
+        relative = file_path[len(self._root_path) + 1:]
+        head, sep, _ = relative.partition(os.sep)
+        return head if sep or is_directory else "."
+
+    def _count_entry(self, file_path: str, entry: dict, sign: int):
+        """인덱스 항목 하나를 통계에 더하거나(sign=1) 뺀다(sign=-1)"""
+        self._top_level_counts[
+            self._top_level(file_path, bool(entry.get("is_directory")))
+        ] += sign
+        if entry.get("is_directory"):
+            self._dir_count += sign
+            return
+        self._file_count += sign
+        self._total_bytes += sign * (entry["metadata"].get("size") or 0)
+        extension = os.path.splitext(file_path)[1][1:].lower() or "없음"
+        self._extension_counts[extension] += sign
+
+    def _rebuild_statistics(self):
+        """현재 인덱스 기준 통계 재구성"""
+        self._extension_counts = Counter()
+        self._top_level_counts = Counter()
+        self._total_bytes = 0
+        self._file_count = 0
+        self._dir_count = 0
+        for file_path, entry in self.index.items():
+            self._count_entry(file_path, entry, 1)
+
+    def recover(self):
+        """이전 실행의 저널이 남아 있으면 스냅샷으로 압축한 뒤 새 저널 시작"""
+        pending = any(
+            os.path.exists(self._path(file_name))
+            and os.path.getsize(self._path(file_name)) > 0
+            for file_name in (ROTATED_JOURNAL_FILE, JOURNAL_FILE)
+        )
+        if pending:
+            self._write_snapshot(HISTORY_FILE, self.history)
+            self._write_snapshot(INDEX_FILE, self.index)
+            for file_name in (ROTATED_JOURNAL_FILE, JOURNAL_FILE):
+                if os.path.exists(self._path(file_name)):
+                    os.remove(self._path(file_name))
+        self._open_journal()
+
+    def _open_journal(self):
+        self._journal = open(self._path(JOURNAL_FILE), "a", encoding="utf-8")
+
+    def _write_snapshot(self, file_name: str, data):
+        """임시 파일에 쓴 뒤 원자적으로 교체"""
+        target_path = self._path(file_name)
+        tmp_path = target_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, target_path)
+
+    def checkpoint(self):
+        """저널을 스냅샷으로 압축 (저널 회전 -> 스냅샷 원자적 교체 -> 회전된 저널 삭제)"""
+        with self._checkpoint_lock:
+            with self._lock:
+                if self._journal_entries == 0:
+                    return
+                history = list(self.history)
+                index = dict(self.index)
+                # 새 이벤트는 새 저널에 기록되도록 현재 저널을 회전
+                self._journal.close()
+                os.replace(self._path(JOURNAL_FILE), self._path(ROTATED_JOURNAL_FILE))
+                self._open_journal()
+                self._journal_entries = 0
+
+            # 스냅샷 쓰기는 잠금 밖에서 수행하여 add_event를 막지 않음
+            self._write_snapshot(HISTORY_FILE, history)
+            self._write_snapshot(INDEX_FILE, index)
+            os.remove(self._path(ROTATED_JOURNAL_FILE))
+            logger.info(f"Checkpoint written: {len(history)} events, {len(index)} files")
+
+    def start_checkpointer(self):
+        """백그라운드 체크포인트 스레드 시작"""
+        if self._checkpoint_thread and self._checkpoint_thread.is_alive():
+            return
+        self._stopped.clear()
+        self._checkpoint_thread = threading.Thread(
+            target=self._checkpoint_loop, name="file-indexer-checkpoint", daemon=True
+        )
+        self._checkpoint_thread.start()
+
+    def _checkpoint_loop(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.checkpoint_interval)
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                self.checkpoint()
+            except Exception as e:
+                logger.error(f"Error during checkpoint: {e}")
+
+    def close(self):
+        """체크포인트 스레드 종료 후 마지막 체크포인트 기록"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._checkpoint_thread:
+            self._checkpoint_thread.join()
+            self._checkpoint_thread = None
+        self.checkpoint()
+        with self._lock:
+            if self._journal:
+                self._journal.close()
+                self._journal = None
+
     def save_index(self):
-        """인덱스 저장"""
-        index_path = os.path.join(self.log_directory, "file_index.json")
-        with open(index_path, "w", encoding="utf-8") as f:
-            json.dump(self.index, f, ensure_ascii=False, indent=2)
+        """인덱스 저장 (체크포인트 수행)"""
+        self.checkpoint()
 
     def save_history(self):
-        """히스토리 저장"""
-        history_path = os.path.join(self.log_directory, "file_history.json")
-        with open(history_path, "w", encoding="utf-8") as f:
-            json.dump(self.history, f, ensure_ascii=False, indent=2)
-
-    def add_event(self, event_type: str, file_path: str, metadata: dict):
-        """파일 시스템 이벤트 기록"""
-        timestamp = datetime.now().isoformat()
-        event = {
-            "timestamp": timestamp,
-            "event_type": event_type,
-            "file_path": file_path,
-            "metadata": metadata
-        }
-        self.history.append(event)
-        self.save_history()
-
-        # 인덱스 업데이트
-        if event_type != "deleted":
-            self.index[file_path] = {
-                "last_modified": timestamp,
-                "metadata": metadata
-            }
+        """히스토리 저장 (체크포인트 수행)"""
+        self.checkpoint()
+
+    def _put_entry(self, file_path: str, entry: dict):
+        self.index[file_path] = entry
+        self._count_entry(file_path, entry, 1)
+        self._track_path(file_path, True)
+
+    def _pop_entry(self, file_path: str) -> Optional[dict]:
+        entry = self.index.pop(file_path, None)
+        if entry is not None:
+            self._count_entry(file_path, entry, -1)
+            self._track_path(file_path, False)
+        return entry
+
+    def _track_path(self, file_path: str, added: bool):
+        """정렬 경로 목록이 있으면 변경을 모아 둠 (너무 많이 쌓이면 목록을 버림)"""
+        if self._paths is None:
+            return
+        self._path_changes[file_path] = added
+        if len(self._path_changes) * PATH_MERGE_RATIO > len(self._paths) + PATH_MERGE_RATIO:
+            self._paths = None
+            self._path_changes = {}
+
+    def _sorted_paths(self) -> List[str]:
+        """인덱스 경로 정렬 목록 (모아 둔 변경을 bisect로 반영하거나 새로 정렬)"""
+        if self._paths is None:
+            self._paths = sorted(self.index)
         else:
-            self.index.pop(file_path, None)
-        self.save_index()
+            paths = self._paths
+            for file_path, added in self._path_changes.items():
+                index = bisect_left(paths, file_path)
+                present = index < len(paths) and paths[index] == file_path
+                if added and not present:
+                    paths.insert(index, file_path)
+                elif not added and present:
+                    del paths[index]
+        self._path_changes = {}
+        return self._paths
+
+    def _move_entries(self, src_path: str, dest_path: str):
+        """src_path와 그 하위 항목의 인덱스 경로를 dest_path 기준으로 바꿈
+
+        파일은 항목 하나만 옮기고, 디렉토리는 정렬 경로 목록에서 하위 경로
+        범위를 bisect로 찾으므로 인덱스 전체를 훑지 않는다.
+        """
+        entry = self._pop_entry(src_path)
+        if entry is not None:
+            self._put_entry(dest_path, entry)
+            if not entry.get("is_directory"):
+                return
+        prefix = src_path + os.sep
+        paths = self._sorted_paths()
+        moved = []
+        for position in range(bisect_left(paths, prefix), len(paths)):
+            if not paths[position].startswith(prefix):
+                break
+            moved.append(paths[position])
+        for file_path in moved:
+            self._put_entry(dest_path + file_path[len(src_path):], self._pop_entry(file_path))
 
-    def get_file_history(self, file_path: Optional[str] = None, 
+    def _apply_to_index(self, event: dict):
+        file_path = event["file_path"]
+        src_path = (event.get("metadata") or {}).get("src_path")
+        if event["event_type"] == "moved" and src_path and file_path not in self.index:
+            # 저널 재생 시 스냅샷에 이미 반영된 이동(대상 경로가 있음)은 건너뜀
+            self._move_entries(src_path, file_path)
+        self._pop_entry(file_path)
+        if event["event_type"] != "deleted":
+            self._put_entry(file_path, {
+                "last_modified": event["timestamp"],
+                "metadata": event["metadata"],
+                "is_directory": event.get("is_directory"),
+            })
+
+    def add_event(self, event_type: str, file_path: str, metadata: dict,
+                  is_directory: Optional[bool] = None):
+        """파일 시스템 이벤트 기록 (저널에 기록된 뒤 반환)"""
+        self.add_events([(event_type, file_path, metadata, is_directory)])
+
+    def add_events(self, events: Iterable[EventRecord]):
+        """여러 이벤트를 한 번의 저널 쓰기/동기화로 기록 (저널에 기록된 뒤 반환)"""
+        with self._lock:
+            timestamp = datetime.now().isoformat()
+            batch = []
+            for event_type, file_path, metadata, is_directory in events:
+                self._last_seq += 1
+                batch.append({
+                    "seq": self._last_seq,
+                    "timestamp": timestamp,
+                    "event_type": event_type,
+                    "file_path": file_path,
+                    "metadata": dict(metadata) if metadata else {},
+                    "is_directory": is_directory,
+                })
+            if not batch:
+                return
+
+            # 저널에 먼저 기록 (write-ahead)
+            self._journal.write(
+                "".join(json.dumps(event, ensure_ascii=False) + "\n" for event in batch)
+            )
+            self._journal.flush()
+            if self.fsync:
+                os.fsync(self._journal.fileno())
+            self._journal_entries += len(batch)
+
+            for event in batch:
+                self.history.append(event)
+                self._index_event(len(self.history) - 1, event)
+                # 인덱스 업데이트
+                self._apply_to_index(event)
+
+        if self._journal_entries >= self.checkpoint_threshold:
+            self._wakeup.set()
+
+    def get_file_history(self, file_path: Optional[str] = None,
                         start_date: Optional[str] = None,
                         end_date: Optional[str] = None,
                         event_type: Optional[str] = None) -> List[dict]:
         """파일 변경 이력 조회"""
-        filtered_history = self.history
+        return list(self.iter_file_history(file_path, start_date, end_date, event_type))
 
-        if file_path:
-            filtered_history = [
-                event for event in filtered_history 
-                if event["file_path"] == file_path
-            ]
+    def iter_file_history(self, file_path: Optional[str] = None,
+                          start_date: Optional[str] = None,
+                          end_date: Optional[str] = None,
+                          event_type: Optional[str] = None,
+                          after_seq: Optional[int] = None) -> Iterator[dict]:
+        """조건에 맞는 이벤트를 seq 순서로 하나씩 (after_seq가 있으면 그 다음부터)
 
-        if start_date:
-            start = datetime.fromisoformat(start_date)
-            filtered_history = [
-                event for event in filtered_history 
-                if datetime.fromisoformat(event["timestamp"]) >= start
-            ]
+        기간 조건과 after_seq는 정렬된 timestamp/seq에서 이진 탐색으로 위치 범위로
+        바꾸고, 경로/유형 조건은 위치 목록 중 가장 작은 것을 기준으로 나머지 조건을
+        확인한다. 결과 목록을 만들지 않으므로 스트리밍 응답에 쓸 수 있다.
+        """
+        with self._lock:
+            end_position = len(self.history)
 
+        low, high = 0, end_position
+        if start_date:
+            low = bisect_left(self._timestamps, _to_timestamp(start_date), 0, end_position)
         if end_date:
-            end = datetime.fromisoformat(end_date)
-            filtered_history = [
-                event for event in filtered_history 
-                if datetime.fromisoformat(event["timestamp"]) <= end
-            ]
+            high = bisect_right(self._timestamps, _to_timestamp(end_date), 0, end_position)
+        if after_seq is not None:
+            low = max(low, bisect_right(
+                self.history, after_seq, 0, end_position, key=lambda event: event["seq"]
+            ))
+        if low >= high:
+            return
 
+        candidates = []
+        if file_path:
+            candidates.append(self._by_path.get(file_path, []))
         if event_type:
-            filtered_history = [
-                event for event in filtered_history 
-                if event["event_type"] == event_type
-            ]
+            candidates.append(self._by_type.get(event_type, []))
+
+        if not candidates:
+            for position in range(low, high):
+                yield self.history[position]
+            return
 
-        return filtered_history
+        # 각 위치 목록을 기간 범위로 자른 뒤 가장 짧은 목록으로 교집합 계산
+        ranges = [
+            (positions, bisect_left(positions, low), bisect_left(positions, high))
+            for positions in candidates
+        ]
+        positions, start, stop = min(ranges, key=lambda r: r[2] - r[1])
+        for index in range(start, stop):
+            event = self.history[positions[index]]
+            if (not file_path or event["file_path"] == file_path) and (
+                not event_type or event["event_type"] == event_type
+            ):
+                yield event
 
     def get_file_metadata(self, file_path: str) -> Optional[dict]:
         """파일 메타데이터 조회"""
         return self.index.get(file_path)
 
     def get_statistics(self) -> dict:
-        """파일 시스템 통계 정보"""
+        """파일 시스템 통계 정보 (증분 카운터 기반, O(1))"""
+        last_event = self.history[-1] if self.history else None
         return {
             "total_files": len(self.index),
             "total_events": len(self.history),
-            "last_event": self.history[-1]["timestamp"] if self.history else None,
+            "last_event": last_event["timestamp"] if last_event else None,
             "event_types": {
-                "created": len([e for e in self.history if e["event_type"] == "created"]),
-                "modified": len([e for e in self.history if e["event_type"] == "modified"]),
-                "deleted": len([e for e in self.history if e["event_type"] == "deleted"])
-            }
+                "created": self._event_counts["created"],
+                "modified": self._event_counts["modified"],
+                "deleted": self._event_counts["deleted"],
+                "moved": self._event_counts["moved"],
+            },
         }
+
+    def get_detailed_statistics(self) -> dict:
+        """확장 통계 정보 (확장자/최상위 디렉토리별 개수, 전체 크기)"""
+        with self._lock:
+            statistics = self.get_statistics()
+            statistics.update({
+                "event_types": {k: v for k, v in self._event_counts.items() if v},
+                "file_count": self._file_count,
+                "directory_count": self._dir_count,
+                "total_bytes": self._total_bytes,
+                "extensions": {k: v for k, v in self._extension_counts.items() if v},
+                "top_level_directories": {
+                    k: v for k, v in self._top_level_counts.items() if v
+                },
+            })
+        return statistics
@@ -1,64 +1,404 @@
 import os
+import sys
+import time
 import uuid
+import functools
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional
+from typing import Iterable, List, Optional, Tuple
 from indexer.file_indexer import FileIndexer
+from indexer.children import ChildMap
+from indexer.name_index import NameIndex
+from indexer.metadata_index import MetadataIndex
+from indexer.tree_cache import TreeCache
+
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# 숫자 필드로 저장하는 메타데이터 (스냅샷에 그대로 기록)
+METADATA_FIELDS = (
+    "size", "ctime", "mtime", "mtime_ns", "inode", "mode", "owner", "group", "extra",
+)
+
+# 다른 필드에서 계산되므로 따로 저장하지 않는 메타데이터 키
+DERIVED_METADATA_KEYS = frozenset(("name", "path", "extension", "is_hidden"))
+
+# 디스크 stat(과 내용 해시)에서 오는 메타데이터 키 (설명, 권한, 소유자 등은 제외)
+STAT_METADATA_KEYS = frozenset(("size", "created", "modified", "mtime_ns", "inode", "hash"))
+
+
+def stat_metadata(metadata: dict) -> dict:
+    """metadata에서 stat 필드만 골라냄 (다른 메타데이터를 지우지 않고 병합할 때)"""
+    return {key: value for key, value in metadata.items() if key in STAT_METADATA_KEYS}
+
+
+def format_time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).strftime(TIME_FORMAT)
+
+
+def parse_time(value) -> Optional[float]:
+    """"%Y-%m-%d %H:%M:%S" 문자열을 epoch 초로 변환 (strptime보다 빠른 고정 위치 파싱)"""
+    try:
+        return datetime(
+            int(value[0:4]), int(value[5:7]), int(value[8:10]),
+            int(value[11:13]), int(value[14:16]), int(value[17:19]),
+        ).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
 
 
 class FileNode:
-    def __init__(self, name: str, path: str, is_directory: bool = False):
-        self.uuid = str(uuid.uuid4())
-        self.name = name
-        self.path = path
+    """트리 노드 (수백만 개를 메모리에 두기 위한 압축 표현)
+
+    __slots__로 인스턴스 dict를 없애고, 전체 경로 대신 sys.intern한 이름과 부모
+    참조만 저장한다 (path는 부모를 따라 올라가며 계산, 루트만 절대 경로 보관).
+    메타데이터는 숫자 필드로 저장하고 metadata 속성이 기존과 같은 dict를 만들어 준다.
+    """
+
+    __slots__ = (
+        "uuid", "name", "is_directory", "_parent", "_path", "children",
+        "size", "ctime", "mtime", "mtime_ns", "inode", "mode", "owner", "group",
+        "extra", "created_ts", "modified_ts", "listing_digest", "version",
+    )
+
+    def __init__(self, name: str, path: str, is_directory: bool = False,
+                 node_uuid: Optional[str] = None, created_ts: Optional[float] = None):
+        self.uuid = node_uuid or str(uuid.uuid4())  # 스냅샷 복원 시 기존 uuid 유지
+        self.name = sys.intern(name)
+        self._path = path  # 부모가 연결되면 버림
+        self._parent = None
         self.is_directory = is_directory
-        self.parent = None
-        self.children = []
-        self.metadata = {}
-        self.created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.modified_at = self.created_at
+        self.children = ChildMap() if is_directory else ()  # 파일은 빈 튜플 공유
+        self.clear_metadata()
+        self.listing_digest = None  # 디렉토리 직속 항목 목록 다이제스트 (증분 새로고침용)
+        self.version = 0  # 자신이나 하위 항목이 바뀔 때마다 증가 (FileSystem.touch)
+        self.created_ts = created_ts or time.time()
+        self.modified_ts = self.created_ts
+
+    @property
+    def parent(self):
+        return self._parent
+
+    @parent.setter
+    def parent(self, parent):
+        if parent is not None and self._path is not None:
+            self._path = None
+        self._parent = parent
+
+    @property
+    def path(self) -> str:
+        names = []
+        node = self
+        while node._path is None:
+            names.append(node.name)
+            node = node._parent
+        if not names:
+            return node._path
+        names.append(node._path)
+        names.reverse()
+        return os.path.join(*names)
+
+    @property
+    def created_at(self) -> str:
+        return format_time(self.created_ts)
+
+    @property
+    def modified_at(self) -> str:
+        return format_time(self.modified_ts)
+
+    def clear_metadata(self):
+        self.size = self.ctime = self.mtime = self.mtime_ns = None
+        self.inode = self.mode = self.owner = self.group = None
+        self.extra = None
+
+    @property
+    def metadata(self) -> dict:
+        """기존 형식의 메타데이터 dict (매번 새로 생성되므로 수정은 update_metadata로)"""
+        metadata = {}
+        if self.size is not None:
+            metadata["size"] = self.size
+        if self.ctime is not None:
+            metadata["created"] = format_time(self.ctime)
+        if self.mtime_ns is not None:
+            metadata["modified"] = format_time(self.mtime_ns / 1e9)
+        elif self.mtime is not None:
+            metadata["modified"] = format_time(self.mtime)
+        if metadata:
+            # 노드 필드에서 계산되는 키 (저장하지 않고 매번 다시 만듦)
+            extension = os.path.splitext(self.name)[1]
+            metadata["name"] = self.name
+            metadata["extension"] = extension[1:] if extension else "없음"
+            metadata["is_hidden"] = self.name.startswith(".")
+            metadata["path"] = self.path
+        if self.mode is not None:
+            metadata["permissions"] = oct(self.mode)[-3:]
+        if self.owner is not None:
+            metadata["owner"] = self.owner
+        if self.group is not None:
+            metadata["group"] = self.group
+        if self.mtime_ns is not None:
+            metadata["mtime_ns"] = self.mtime_ns
+        if self.inode is not None:
+            metadata["inode"] = self.inode
+        if self.extra:
+            metadata.update(self.extra)
+        return metadata
+
+    @metadata.setter
+    def metadata(self, metadata: dict):
+        self.clear_metadata()
+        self.update_metadata(metadata)
+
+    def update_metadata(self, metadata: dict):
+        """메타데이터 일부 갱신 (알려진 키는 숫자 필드로, 나머지는 extra에 저장)"""
+        for key, value in metadata.items():
+            if key == "size":
+                self.size = value
+            elif key == "mtime_ns":
+                self.mtime_ns = value
+            elif key == "modified":
+                # mtime_ns가 있으면 그것으로 계산하므로 따로 저장하지 않음
+                if "mtime_ns" not in metadata:
+                    self.mtime = parse_time(value)
+            elif key == "created":
+                self.ctime = parse_time(value)
+            elif key == "inode":
+                self.inode = value
+            elif key == "owner":
+                self.owner = value
+            elif key == "group":
+                self.group = value
+            elif key == "permissions" and isinstance(value, str) and value.isdigit():
+                self.mode = int(value, 8)
+            elif key not in DERIVED_METADATA_KEYS:
+                if self.extra is None:
+                    self.extra = {}
+                self.extra[key] = value
+
+    def stat_key(self) -> tuple:
+        """변경 여부 비교에 쓰는 (크기, 수정 시각, inode)"""
+        return (self.size, self.mtime_ns, self.inode)
+
+
+def mutator(method):
+    """FileSystem을 바꾸는 메서드: 쓰기 잠금 아래에서 실행 (FileSystem.writing 참고)"""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.writing():
+            return method(self, *args, **kwargs)
+
+    return wrapper
 
 
 class FileSystem:
+    """메모리 파일 트리와 색인
+
+    쓰기(노드 추가/삭제/수정)는 write_lock으로 한 번에 한 스레드만 하고, 읽기는
+    잠금 없이 한다. 읽는 쪽이 순회하는 구조는 copy-on-write로 교체되므로
+    (ChildMap 이름 목록, 정렬 색인) 쓰기 중에도 일관된 시점의 값을 보고, 쓰기는
+    읽기(트리 직렬화 등)를 기다리지 않는다. 정렬 색인의 변경은 가장 바깥 쓰기
+    작업이 끝날 때 한 번에 발행된다.
+    """
+
     def __init__(self, file_indexer: FileIndexer):
         self.root = None
-        self.root_path = None  # root_path 추가
-        self.nodes = {}  # uuid -> node
-        self.path_index = {}  # path -> uuid
+        self._root_path = None  # root_path 추가
+        self.nodes = {}  # uuid -> node (경로 조회는 이름 기반 자식 컨테이너를 따라 내려감)
+        self.name_index = NameIndex()  # 이름 부분 문자열 검색용 trigram 색인
+        self.metadata_index = MetadataIndex()  # 크기/수정 시각/확장자 범위 조회용 색인
+        self.tree_cache = TreeCache()  # 디렉토리별 트리 직렬화 캐시
+        self.tree_epoch = uuid.uuid4().hex[:12]  # 서버 실행마다 다른 ETag 접두사
+        self._version = 0
         self.event_handlers = []  # 이벤트 핸들러 리스트
         self.file_indexer = file_indexer  # FileIndexer 인스턴스 추가
+        self._batch = None  # batch() 안에서 모은 ([이벤트 기록], [(이벤트 유형, 노드, summary)])
+        self.write_lock = threading.RLock()  # 쓰기 작업 직렬화 (읽기는 잠그지 않음)
+        self._write_depth = 0
+
+    @property
+    def root_path(self):
+        return self._root_path
+
+    @root_path.setter
+    def root_path(self, value):
+        """루트 경로 설정 (FileIndexer 통계 기준 경로도 함께 설정)"""
+        self._root_path = value
+        self.file_indexer.root_path = value
+
     def subscribe(self, handler):
         """이벤트 핸들러 등록"""
         self.event_handlers.append(handler)
 
+    @contextmanager
+    def writing(self):
+        """쓰기 잠금을 잡고, 가장 바깥 쓰기 작업이 끝나면 정렬 색인 변경을 발행
+
+        여러 쓰기를 하나로 묶으면 (초기 스캔 등) 정렬 색인을 끝에 한 번만 다시 만든다.
+        """
+        with self.write_lock:
+            self._write_depth += 1
+            try:
+                yield
+            finally:
+                self._write_depth -= 1
+                if self._write_depth == 0:
+                    self.metadata_index.publish()
+
+    @contextmanager
+    def batch(self):
+        """안에서 발생한 이벤트를 모아 FileIndexer에 한 번에 기록 (그룹 커밋)
+
+        묶음 전체가 하나의 쓰기 작업이다. 저널 쓰기/동기화는 묶음당 한 번이고,
+        핸들러는 기록과 발행이 끝난 뒤 잠금 밖에서 발생 순서대로 호출된다.
+        중첩하면 가장 바깥 묶음에서 기록한다.
+        """
+        events = None
+        try:
+            with self.writing():
+                if self._batch is not None:
+                    yield
+                    return
+                self._batch = ([], [])
+                try:
+                    yield
+                finally:
+                    (records, events), self._batch = self._batch, None
+                    if records:
+                        self.file_indexer.add_events(records)
+        finally:
+            for event_type, node, summary in events or ():
+                self.dispatch_event(event_type, node, **summary)
+
     def notify_event(self, event_type: str, node: FileNode):
         """이벤트 발생 시 등록된 핸들러들에게 통지"""
-        # FileIndexer에 이벤트 기록
-        self.file_indexer.add_event(
-            event_type=event_type,
-            file_path=node.path,
-            metadata=node.metadata
+        self.record_events(
+            [(event_type, node.path, node.metadata, node.is_directory)], event_type, node
         )
-        
-        # 기존 이벤트 핸들러 호출
+
+    def record_events(self, records: List[tuple], event_type: str, node: FileNode, **summary):
+        """이벤트 기록 묶음을 FileIndexer에 한 번에 쓰고 핸들러에는 이벤트 하나만 전달
+
+        batch() 안이면 묶음에 합쳐 두었다가 묶음이 끝날 때 기록/전달한다.
+        """
+        if self._batch is not None:
+            self._batch[0].extend(records)
+            self._batch[1].append((event_type, node, summary))
+            return
+        self.file_indexer.add_events(records)
+        self.dispatch_event(event_type, node, **summary)
+
+    def dispatch_event(self, event_type: str, node: FileNode, **summary):
+        """FileIndexer 기록 없이 이벤트 핸들러만 호출 (summary는 요약 이벤트의 부가 정보)"""
         for handler in self.event_handlers:
-            handler(event_type, node)
+            handler(event_type, node, **summary)
+
+    def register_node(self, node: FileNode):
+        """노드를 uuid 맵과 검색 색인에 등록"""
+        self.register_nodes([node])
+
+    @mutator
+    def register_nodes(self, nodes: List[FileNode]):
+        """여러 노드를 한 번에 등록 (정렬 색인은 묶음 단위로 갱신)"""
+        for node in nodes:
+            self.nodes[node.uuid] = node
+            self.name_index.add(node)
+        self.metadata_index.add_many(nodes)
+
+    def unregister_node(self, node: FileNode):
+        self.unregister_nodes([node])
+
+    @mutator
+    def unregister_nodes(self, nodes: Iterable[FileNode]):
+        for node in nodes:
+            self.nodes.pop(node.uuid, None)
+            self.name_index.remove(node)
+            self.metadata_index.remove(node)
+            self.tree_cache.discard(node)
+
+    def touch(self, *nodes: FileNode):
+        """노드가 바뀐 뒤 호출: 노드에서 루트까지 버전을 올리고 직렬화 캐시를 무효화
+
+        메타데이터가 바뀐 노드는 그 노드를, 자식이 추가/삭제된 경우는 부모를 넘긴다.
+        한 번의 호출에서 이미 올린 조상에서 멈추므로 여러 노드를 넘겨도 공통
+        조상은 한 번씩만 지난다. 잠금 없이 캐시를 채우는 읽기 스레드가 버전 변화를
+        알아챌 수 있도록 버전을 먼저 올리고 캐시를 무효화한다.
+        """
+        self._version += 1
+        version = self._version
+        for node in nodes:
+            current = node
+            while current is not None and current.version != version:
+                current.version = version
+                current = current.parent
+        for node in nodes:
+            self.tree_cache.invalidate(node)
+
+    @mutator
+    def merge_metadata(self, node: FileNode, metadata: dict):
+        """이벤트 없이 노드 메타데이터에 metadata를 병합하고 색인 갱신 (없는 키는 유지)"""
+        node.update_metadata(metadata)
+        self.metadata_index.update(node)
+        self.touch(node)
+
+    def query_nodes(self, **criteria) -> dict:
+        """메타데이터 조건 조회 (MetadataIndex.query 참고). uuids 대신 nodes를 돌려줌"""
+        result = self.metadata_index.query(**criteria)
+        nodes = (self.nodes.get(node_uuid) for node_uuid in result.pop("uuids"))
+        # 색인을 읽은 뒤 제거된 노드는 제외
+        result["nodes"] = [node for node in nodes if node is not None]
+        return result
+
+    def search_nodes(self, query: str, limit: int = 100) -> List[FileNode]:
+        """이름에 query가 포함된 노드 검색 (대소문자 무시, 순위순 최대 limit개)"""
+        return self.name_index.search(query, limit)
 
     def get_node_by_path(self, path: str) -> Optional[FileNode]:
-        """경로로 노드 찾기"""
-        return self.nodes.get(self.path_index.get(path))
+        """경로로 노드 찾기 (루트에서 이름으로 한 단계씩, O(깊이))"""
+        root = self.root
+        if root is None or not path:
+            return None
+        root_path = root.path
+        if path == root_path:
+            return root
+        prefix = root_path if root_path.endswith(os.sep) else root_path + os.sep
+        if not path.startswith(prefix):
+            return None
 
-    def create_node(self, path: str, is_directory: bool = False):
+        node = root
+        for name in path[len(prefix):].split(os.sep):
+            if not name:
+                continue
+            if not node.is_directory:
+                return None
+            node = node.children.get(name)
+            if node is None:
+                return None
+        return node
+
+    @mutator
+    def create_node(self, path: str, is_directory: bool = False,
+                    metadata: Optional[dict] = None):
         # 절대 경로로 변환
         abs_path = os.path.abspath(path)
 
         # 이미 존재하는 노드인지 확인
-        if abs_path in self.path_index:
-            existing_node = self.nodes[self.path_index[abs_path]]
+        existing_node = self.get_node_by_path(abs_path)
+        if existing_node:
             print(f"Node already exists: {existing_node.uuid} ({abs_path})")
             return existing_node
 
+        root_path = os.path.abspath(self.root_path) if self.root_path else None
+        if root_path and abs_path != root_path and not abs_path.startswith(
+            root_path.rstrip(os.sep) + os.sep
+        ):
+            raise ValueError(f"Path is outside of the root directory: {abs_path}")
+
         name = os.path.basename(abs_path)
         node = FileNode(name, abs_path, is_directory)
+        if metadata is not None:
+            node.metadata = metadata
 
         # 상대 경로로 변환
         rel_path = os.path.relpath(abs_path, start=self.root_path)
@@ -76,64 +416,219 @@ class FileSystem:
             if not parent_node:
                 print(f"Creating parent node for: {parent_path}")
                 parent_node = self.create_node(parent_path, is_directory=True)
+            if not parent_node.is_directory:
+                raise ValueError(f"Parent is not a directory: {parent_path}")
 
             # 부모-자식 관계 설정
             node.parent = parent_node
-            if node not in parent_node.children:  # 중복 방지
-                parent_node.children.append(node)
+            if node.name not in parent_node.children:  # 중복 방지
+                parent_node.children.add(node)
                 print(f"Added node {node.uuid} to parent {parent_node.uuid}")
 
         # 노드 등록
-        self.nodes[node.uuid] = node
-        self.path_index[abs_path] = node.uuid
+        self.register_node(node)
+        self.touch(node.parent or node)
         self.notify_event("created", node)
 
         return node
 
+    @mutator
+    def bulk_create(self, entries: Iterable[Tuple[str, bool, dict]]) -> List[FileNode]:
+        """(절대 경로, 디렉토리 여부, 메타데이터) 묶음을 한 번에 노드로 등록
+
+        부모가 자식보다 먼저 나오는 순서를 가정한다. FileIndexer에는 묶음당 한 번
+        기록하고, 핸들러에는 개별 이벤트 대신 "bulk_created" 요약 이벤트 하나만 보낸다.
+        이미 존재하는 경로는 메타데이터만 병합하고, 부모가 디렉토리가 아닌 항목은
+        (스캔 도중 종류가 바뀐 경로 등) 건너뛴다.
+        """
+        created = []
+        records = []
+        parents = []
+        directories = 0
+        anchor = None
+        parent_path, parent_node = None, None
+        siblings = []  # parent_node에 아직 붙이지 않은 새 자식 (이름 목록을 한 번만 교체)
+        for path, is_directory, metadata in entries:
+            # 같은 디렉토리의 항목이 연달아 오므로 직전 부모를 재사용
+            directory, name = os.path.split(path)
+            if directory != parent_path:
+                if siblings:
+                    parent_node.children.add_many(siblings)
+                    siblings = []
+                parent_path = directory
+                parent_node = self.get_node_by_path(directory)
+                try:
+                    if not parent_node:
+                        parent_node = self.create_node(directory, is_directory=True)
+                    if not parent_node.is_directory:
+                        raise ValueError(f"Parent is not a directory: {directory}")
+                except ValueError as e:
+                    print(f"Warning: Skipping entries under {directory}: {e}")
+                    parent_node = None
+            if parent_node is None:
+                continue
+
+            existing_node = parent_node.children.get(name)
+            if existing_node is not None:
+                self.merge_metadata(existing_node, metadata)
+                continue
+            if anchor is None:
+                anchor = parent_node
+
+            node = FileNode(name, path, is_directory)
+            node.metadata = metadata
+            node.parent = parent_node
+            siblings.append(node)
+            if not parents or parents[-1] is not parent_node:
+                parents.append(parent_node)
+
+            created.append(node)
+            records.append(("created", path, metadata, is_directory))
+            directories += is_directory
+        if siblings:
+            parent_node.children.add_many(siblings)
+
+        if created:
+            self.register_nodes(created)
+            self.touch(*parents)
+            self.record_events(
+                records,
+                "bulk_created",
+                anchor,
+                count=len(created),
+                directories=directories,
+                files=len(created) - directories,
+            )
+        return created
+
+    @mutator
     def remove_node(self, path: str):
-        """노드 제거"""
-        if path not in self.path_index:
+        """노드를 하위 트리째로 제거
+
+        하위 항목은 스택으로 순회하므로 깊은 트리에서도 재귀 한도에 걸리지 않는다.
+        FileIndexer에는 항목별 삭제 기록을 자식부터 한 번에 쓰고, 핸들러에는 제거한
+        노드의 "deleted" 이벤트 하나만 보낸다 (하위 항목이 있으면 summary에 개수).
+        """
+        node = self.get_node_by_path(path)
+        if node is None:
             print(f"Warning: Node not found for path {path}")
             return
 
-        node_uuid = self.path_index[path]
-        node = self.nodes[node_uuid]
-
-        # 자식 노드들도 함께 제거
-        children = node.children.copy()  # 복사본 생성
-        for child in children:
-            self.remove_node(child.path)
+        removed = []
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            removed.append(current)
+            if current.is_directory:
+                stack.extend(current.children)
+        removed.reverse()  # 자식이 부모보다 먼저
+        records = [
+            ("deleted", current.path, current.metadata, current.is_directory)
+            for current in removed
+        ]
 
         # 부모 노드에서 제거
         if node.parent:
             node.parent.children.remove(node)
+            self.touch(node.parent)
 
         # 루트 노드인 경우
         if self.root and node.uuid == self.root.uuid:
             self.root = None
 
         # 인덱스에서 제거
-        del self.nodes[node_uuid]
-        del self.path_index[path]
+        self.unregister_nodes(removed)
+
+        if len(removed) > 1:
+            print(f"Removed node: {node.uuid} ({path}) with {len(removed) - 1} descendants")
+            directories = sum(current.is_directory for current in removed)
+            self.record_events(
+                records,
+                "deleted",
+                node,
+                count=len(removed),
+                directories=directories,
+                files=len(removed) - directories,
+            )
+        else:
+            print(f"Removed node: {node.uuid} ({path})")
+            self.record_events(records, "deleted", node)
 
-        print(f"Removed node: {node.uuid} ({path})")
-        self.notify_event("deleted", node)
+    @mutator
+    def move_node(self, src_path: str, dest_path: str,
+                  metadata: Optional[dict] = None) -> Optional[FileNode]:
+        """노드를 하위 트리째로 옮김 (이름 변경 포함, uuid 유지)
 
+        경로는 부모를 따라 계산되므로 부모 참조와 이름만 바꾸면 하위 항목의 경로도
+        함께 바뀐다. 색인은 옮긴 노드의 이름/메타데이터만 갱신하고, FileIndexer에는
+        원래 경로(src_path)를 담은 "moved" 기록 하나를 써서 하위 경로를 접두사로
+        바꾸게 한다. 대상 경로에 다른 노드가 있으면 먼저 제거한다 (덮어쓰기).
+        """
+        node = self.get_node_by_path(src_path)
+        if node is None:
+            print(f"Warning: Node not found for path {src_path}")
+            return None
+        if node is self.root:
+            raise ValueError("Cannot move the root directory")
+
+        src_path = node.path
+        dest_path = os.path.abspath(dest_path)
+        if dest_path == src_path:
+            return node
+        if dest_path.startswith(src_path + os.sep) or src_path.startswith(dest_path + os.sep):
+            raise ValueError(f"Cannot move {src_path} into itself or its ancestor: {dest_path}")
+        root_path = os.path.abspath(self.root_path) if self.root_path else None
+        if root_path and not dest_path.startswith(root_path.rstrip(os.sep) + os.sep):
+            raise ValueError(f"Path is outside of the root directory: {dest_path}")
+
+        if self.get_node_by_path(dest_path) is not None:
+            self.remove_node(dest_path)
+        parent_path, name = os.path.split(dest_path)
+        parent_node = self.get_node_by_path(parent_path)
+        if not parent_node:
+            print(f"Creating parent node for: {parent_path}")
+            parent_node = self.create_node(parent_path, is_directory=True)
+        if not parent_node.is_directory:
+            raise ValueError(f"Parent is not a directory: {parent_path}")
+
+        # 이름 목록에서 빼고 이름/부모를 바꾼 뒤 새 부모에 추가
+        old_parent = node.parent
+        old_parent.children.remove(node)
+        old_name = node.name
+        node.name = sys.intern(name)
+        node.parent = parent_node
+        parent_node.children.add(node)
+        if node.name != old_name:
+            self.name_index.rename(node, old_name)
+        if metadata is not None:
+            # 새 위치의 stat만 병합 (설명, 권한 등 노드에 붙은 메타데이터는 유지)
+            node.update_metadata(metadata)
+        node.modified_ts = time.time()
+        self.metadata_index.update(node)
+        # 트리 캐시 조각에는 경로가 없으므로 하위 항목은 그대로 둠
+        self.touch(node, old_parent, parent_node)
+
+        print(f"Moved node: {node.uuid} ({src_path} -> {dest_path})")
+        self.record_events(
+            [("moved", dest_path, {**node.metadata, "src_path": src_path}, node.is_directory)],
+            "moved",
+            node,
+            src_path=src_path,
+        )
+        return node
+
+    @mutator
     def update_node(self, path: str, metadata: dict):
         """노드 업데이트"""
-        if path not in self.path_index:
+        node = self.get_node_by_path(path)
+        if node is None:
             return
 
-        node_uuid = self.path_index[path]
-        node = self.nodes[node_uuid]
-
         # 메타데이터 업데이트
-        node.metadata.update(metadata)
-        node.modified_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        # 노드 맵 갱신
-        self.nodes[node_uuid] = node
-        self.path_index[path] = node_uuid
+        node.update_metadata(metadata)
+        node.modified_ts = time.time()
+        self.metadata_index.update(node)
+        self.touch(node)
 
         # 이벤트 통지
         print(f"Node updated: {node.uuid} ({path})")
@@ -0,0 +1,311 @@
+import os
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# uuid보다 항상 큰 값 (같은 값의 마지막 항목 뒤를 찾기 위함)
+MAX_UUID = "\uffff"
+
+# 정렬 필드 색인의 범위가 가장 작은 후보 집합의 이 배수 이하이면 정렬 색인을
+# 순서대로 훑으며 limit개에서 멈추고, 아니면 후보를 모아 정렬한다
+STREAM_FACTOR = 8
+
+
+def node_extension(node) -> Optional[str]:
+    """파일 확장자 (소문자, 점 제외). 디렉토리는 None, 확장자가 없으면 빈 문자열"""
+    if node.is_directory:
+        return None
+    return os.path.splitext(node.name)[1][1:].lower()
+
+
+def node_mtime(node) -> Optional[float]:
+    if node.mtime_ns is not None:
+        return node.mtime_ns / 1e9
+    return node.mtime
+
+
+class SortedIndex:
+    """(값, uuid) 정렬 리스트. 범위 조회와 범위 크기 추정이 O(log n)
+
+    읽기는 발행된(published) 리스트만 보고, 쓰기는 변경을 모아 두었다가 publish()에서
+    새 리스트를 만들어 참조를 한 번에 바꾼다 (copy-on-write). 읽는 쪽은 잠금 없이
+    시작 시점의 리스트를 끝까지 쓰므로 쓰기 도중에도 중복/누락이 없고, 대량 추가
+    (스캔, 스냅샷 복원)도 묶음마다 한 번만 다시 만든다.
+    """
+
+    __slots__ = ("_keys", "_changes")
+
+    # 변경이 발행된 리스트 크기의 이 비율보다 적으면 복사 후 bisect로, 많으면 다시 정렬
+    MERGE_RATIO = 64
+
+    def __init__(self):
+        self._keys: List[Tuple] = []
+        self._changes: Dict[Tuple, bool] = {}  # 발행 전 변경: 키 -> 추가(True)/삭제(False)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @property
+    def keys(self) -> List[Tuple]:
+        """발행된 정렬 리스트 (수정하지 말 것)"""
+        return self._keys
+
+    def add(self, value, node_uuid: str):
+        self._changes[(value, node_uuid)] = True
+
+    def add_many(self, items: List[Tuple]):
+        changes = self._changes
+        for item in items:
+            changes[item] = True
+
+    def remove(self, value, node_uuid: str):
+        self._changes[(value, node_uuid)] = False
+
+    def publish(self):
+        """모아 둔 변경을 반영한 새 리스트로 교체 (쓰기 스레드에서만 호출)"""
+        changes = self._changes
+        if not changes:
+            return
+        self._changes = {}
+        keys = self._keys
+        if len(changes) * self.MERGE_RATIO < len(keys):
+            keys = keys[:]
+            for key, added in changes.items():
+                index = bisect_left(keys, key)
+                present = index < len(keys) and keys[index] == key
+                if added and not present:
+                    keys.insert(index, key)
+                elif not added and present:
+                    del keys[index]
+        elif all(changes.values()):
+            # 추가만 있으면 정렬된 두 묶음을 이어 붙여 병합 (timsort가 런을 합침)
+            additions = []
+            for key in sorted(changes):
+                index = bisect_left(keys, key)
+                if index == len(keys) or keys[index] != key:
+                    additions.append(key)
+            keys = keys + additions
+            keys.sort()
+        else:
+            keys = [key for key in keys if key not in changes]
+            keys.extend(key for key, added in changes.items() if added)
+            keys.sort()
+        self._keys = keys
+
+    def bounds(self, low=None, high=None, keys: Optional[List[Tuple]] = None) -> Tuple[int, int]:
+        """low <= 값 <= high인 항목의 [시작, 끝) 위치"""
+        if keys is None:
+            keys = self._keys
+        start = 0 if low is None else bisect_left(keys, (low,))
+        end = len(keys) if high is None else bisect_right(keys, (high, MAX_UUID))
+        return start, max(start, end)
+
+    def count(self, low=None, high=None) -> int:
+        start, end = self.bounds(low, high)
+        return end - start
+
+    def iterate(self, low=None, high=None, reverse: bool = False,
+                after: Optional[Tuple] = None) -> Iterator[Tuple]:
+        """범위 안의 (값, uuid)를 정렬 순서로 (after가 있으면 그 다음부터)"""
+        keys = self._keys
+        start, end = self.bounds(low, high, keys)
+        if reverse:
+            if after is not None:
+                end = min(end, bisect_left(keys, tuple(after)))
+            for index in range(end - 1, start - 1, -1):
+                yield keys[index]
+        else:
+            if after is not None:
+                start = max(start, bisect_right(keys, tuple(after)))
+            for index in range(start, end):
+                yield keys[index]
+
+
+class MetadataIndex:
+    """크기, 수정 시각, 확장자 보조 색인
+
+    크기와 수정 시각은 (값, uuid) 정렬 리스트로, 확장자는 확장자 -> uuid 집합으로
+    유지한다. 색인에 넣은 값을 노드별로 기억해 두어 메타데이터가 바뀌어도 이전
+    항목을 정확히 지울 수 있다. 정렬 리스트의 변경은 publish()에서 한 번에
+    보이게 된다 (FileSystem이 쓰기 작업이 끝날 때마다 호출).
+    """
+
+    SORTABLE = ("size", "modified")
+
+    def __init__(self):
+        self.size = SortedIndex()
+        self.modified = SortedIndex()
+        self.extensions: Dict[str, Set[str]] = {}
+        self._entries: Dict[str, Tuple] = {}  # uuid -> (size, mtime, 확장자)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def sorted_index(self, field: str) -> SortedIndex:
+        return self.size if field == "size" else self.modified
+
+    @staticmethod
+    def _entry(node) -> Tuple:
+        return (node.size, node_mtime(node), node_extension(node))
+
+    def add(self, node):
+        self.add_many([node])
+
+    def add_many(self, nodes: Iterable):
+        sizes, mtimes = [], []
+        for node in nodes:
+            entry = self._entries[node.uuid] = self._entry(node)
+            size, mtime, extension = entry
+            if size is not None:
+                sizes.append((size, node.uuid))
+            if mtime is not None:
+                mtimes.append((mtime, node.uuid))
+            if extension is not None:
+                self.extensions.setdefault(extension, set()).add(node.uuid)
+        self.size.add_many(sizes)
+        self.modified.add_many(mtimes)
+
+    def remove(self, node):
+        entry = self._entries.pop(node.uuid, None)
+        if entry is None:
+            return
+        size, mtime, extension = entry
+        if size is not None:
+            self.size.remove(size, node.uuid)
+        if mtime is not None:
+            self.modified.remove(mtime, node.uuid)
+        if extension is not None:
+            uuids = self.extensions.get(extension)
+            if uuids is not None:
+                uuids.discard(node.uuid)
+                if not uuids:
+                    del self.extensions[extension]
+
+    def update(self, node):
+        """노드 메타데이터가 바뀐 뒤 호출"""
+        if self._entries.get(node.uuid) != self._entry(node):
+            self.remove(node)
+            self.add(node)
+
+    def publish(self):
+        self.size.publish()
+        self.modified.publish()
+
+    def clear(self):
+        self.size = SortedIndex()
+        self.modified = SortedIndex()
+        self.extensions.clear()
+        self._entries.clear()
+
+    def _matches(self, node_uuid: str, size_min, size_max, modified_after,
+                 modified_before, extensions, is_directory) -> bool:
+        entry = self._entries.get(node_uuid)
+        if entry is None:
+            # 정렬 리스트가 발행된 뒤 제거된 노드
+            return False
+        size, mtime, extension = entry
+        if size_min is not None and (size is None or size < size_min):
+            return False
+        if size_max is not None and (size is None or size > size_max):
+            return False
+        if modified_after is not None and (mtime is None or mtime < modified_after):
+            return False
+        if modified_before is not None and (mtime is None or mtime > modified_before):
+            return False
+        if extensions and extension not in extensions:
+            return False
+        if is_directory is not None and (extension is None) != is_directory:
+            return False
+        return True
+
+    def query(
+        self,
+        size_min: Optional[int] = None,
+        size_max: Optional[int] = None,
+        modified_after: Optional[float] = None,
+        modified_before: Optional[float] = None,
+        extensions: Optional[Iterable[str]] = None,
+        is_directory: Optional[bool] = None,
+        sort: str = "modified",
+        descending: bool = True,
+        limit: int = 100,
+        cursor: Optional[Tuple] = None,
+    ) -> dict:
+        """조건에 맞는 노드 uuid를 정렬 순서대로 최대 limit개
+
+        각 조건이 고르는 항목 수를 색인에서 O(log n)으로 추정해 가장 작은 후보
+        집합을 고르고, 나머지 조건은 후보마다 확인한다. cursor는 이전 응답의
+        next_cursor((정렬 값, uuid))로, 그 다음 항목부터 이어서 돌려준다.
+        """
+        if sort not in self.SORTABLE:
+            raise ValueError(f"Unsupported sort field: {sort}")
+        extensions = {
+            extension.strip().lower().lstrip(".") for extension in extensions or ()
+        }
+        ranges = {
+            "size": (size_min, size_max),
+            "modified": (modified_after, modified_before),
+        }
+
+        estimates = {}
+        for field, (low, high) in ranges.items():
+            if low is not None or high is not None:
+                estimates[field] = self.sorted_index(field).count(low, high)
+        if extensions:
+            estimates["extension"] = sum(
+                len(self.extensions.get(extension, ())) for extension in extensions
+            )
+        sort_index = self.sorted_index(sort)
+        sort_estimate = sort_index.count(*ranges[sort])
+        driver = min(estimates, key=estimates.get) if estimates else sort
+        streaming = sort_estimate <= STREAM_FACTOR * estimates.get(driver, sort_estimate)
+
+        def matches(node_uuid):
+            return self._matches(
+                node_uuid, size_min, size_max, modified_after, modified_before,
+                extensions, is_directory,
+            )
+
+        keys = []
+        if streaming:
+            # 정렬 색인을 순서대로 훑다가 limit + 1개에서 멈춤
+            driver = sort
+            for key in sort_index.iterate(*ranges[sort], reverse=descending, after=cursor):
+                if matches(key[1]):
+                    keys.append(key)
+                    if len(keys) > limit:
+                        break
+        else:
+            if driver == "extension":
+                candidates = set().union(
+                    *(self.extensions.get(extension, ()) for extension in extensions)
+                )
+            else:
+                candidates = (
+                    node_uuid
+                    for _, node_uuid in self.sorted_index(driver).iterate(*ranges[driver])
+                )
+            position = 0 if sort == "size" else 1
+            for node_uuid in candidates:
+                entry = self._entries.get(node_uuid)
+                if entry is not None and matches(node_uuid):
+                    value = entry[position]
+                    if value is not None:
+                        keys.append((value, node_uuid))
+            keys.sort(reverse=descending)
+            if cursor is not None:
+                cursor = tuple(cursor)
+                keys = [key for key in keys if (key < cursor if descending else key > cursor)]
+            del keys[limit + 1:]
+
+        has_more = len(keys) > limit
+        keys = keys[:limit]
+        return {
+            "uuids": [node_uuid for _, node_uuid in keys],
+            "next_cursor": list(keys[-1]) if has_more and keys else None,
+            "plan": {
+                "driver": driver,
+                "streaming": streaming,
+                "estimates": estimates,
+                "sort_estimate": sort_estimate,
+            },
+        }
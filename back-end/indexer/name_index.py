@@ -0,0 +1,154 @@
+import sys
+from typing import Dict, Iterable, Iterator, List, Set
+
+# 이름 앞에 붙이는 경계 문자 (접두사 trigram을 만들기 위함)
+SENTINEL = "\x00"
+
+
+def ngrams(text: str, n: int) -> Set[str]:
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def trigrams(text: str) -> Set[str]:
+    return ngrams(text, 3)
+
+
+def name_grams(key: str) -> Set[str]:
+    """이름을 색인하는 키: 글자, bigram, trigram (bigram/trigram은 경계 문자를 붙여서)"""
+    padded = SENTINEL + key
+    return ngrams(key, 1) | ngrams(padded, 2) | ngrams(padded, 3)
+
+
+def query_grams(query: str) -> Set[str]:
+    """query를 포함하는 이름이 반드시 가진 키 (1~2글자 쿼리는 글자/bigram 자체)"""
+    return ngrams(query, min(len(query), 3))
+
+
+def prefix_grams(query: str) -> Set[str]:
+    """query로 시작하는 이름이 반드시 가진 키"""
+    return ngrams(SENTINEL + query, min(len(query) + 1, 3))
+
+
+class NameIndex:
+    """노드 이름(소문자) n-gram 역색인
+
+    n-gram(글자, bigram, trigram) -> 이름 길이 -> 그 trigram을 포함하는 서로 다른 소문자 이름 집합을 유지한다.
+    같은 이름(README.md, __init__.py 등)은 한 번만 색인되므로 노드 수보다 적은
+    메모리를 쓴다. 검색은 정확히 일치 > 접두사 > 부분 문자열, 그 안에서는 짧은
+    이름 순으로 순위를 매기므로, 길이별 목록을 짧은 것부터 교집합하고 확인하다가
+    limit개를 채우면 멈춘다. 흔한 단어를 검색해도 전체 일치 항목을 훑지 않는다.
+    글자와 bigram도 색인하므로 1~2글자 쿼리(두 음절 한글 등)도 이름 어디서든 찾는다.
+
+    검색은 잠금 없이 쓰기와 동시에 실행될 수 있다. 교집합은 C 수준에서 한 번에
+    계산되고 노드 집합은 복사한 뒤 정렬하므로 순회 중 크기 변경 오류가 없다.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[int, Set[str]]] = {}
+        self._nodes: Dict[str, set] = {}
+        self._max_length = 0
+
+    def __len__(self) -> int:
+        return sum(len(nodes) for nodes in list(self._nodes.values()))
+
+    def add(self, node):
+        key = sys.intern(node.name.lower())
+        nodes = self._nodes.get(key)
+        if nodes is None:
+            nodes = self._nodes[key] = set()
+            length = len(key)
+            self._max_length = max(self._max_length, length)
+            for gram in name_grams(key):
+                self._postings.setdefault(gram, {}).setdefault(length, set()).add(key)
+        nodes.add(node)
+
+    def remove(self, node):
+        key = node.name.lower()
+        nodes = self._nodes.get(key)
+        if nodes is None:
+            return
+        nodes.discard(node)
+        if nodes:
+            return
+        del self._nodes[key]
+        length = len(key)
+        for gram in name_grams(key):
+            by_length = self._postings.get(gram)
+            if by_length is not None:
+                self._discard(by_length, length, key)
+                if not by_length:
+                    del self._postings[gram]
+
+    @staticmethod
+    def _discard(buckets: Dict[int, Set[str]], length: int, key: str):
+        names = buckets.get(length)
+        if names is not None:
+            names.discard(key)
+            if not names:
+                del buckets[length]
+
+    def rename(self, node, old_name: str):
+        """node.name이 이미 바뀐 뒤 호출"""
+        new_name = node.name
+        node.name = old_name
+        self.remove(node)
+        node.name = new_name
+        self.add(node)
+
+    def clear(self):
+        self._postings.clear()
+        self._nodes.clear()
+        self._max_length = 0
+
+    def _names_by_length(self, grams: Iterable[str], min_length: int, verify) -> Iterator[str]:
+        """grams를 모두 가진 이름 중 verify를 통과한 것을 짧은 길이부터"""
+        postings = []
+        if not grams:
+            return
+        for gram in grams:
+            by_length = self._postings.get(gram)
+            if not by_length:
+                return
+            postings.append(by_length)
+
+        for length in range(min_length, self._max_length + 1):
+            sets = []
+            for by_length in postings:
+                names = by_length.get(length)
+                if not names:
+                    break
+                sets.append(names)
+            else:
+                sets.sort(key=len)
+                candidates = sets[0].intersection(*sets[1:])
+                yield from sorted(name for name in candidates if verify(name))
+
+    def search(self, query: str, limit: int = 100) -> List:
+        """이름에 query가 포함된 노드 (정확히 일치 > 접두사 > 그 외, 짧은 이름 우선)"""
+        query = query.lower()
+        if not query or limit <= 0:
+            return []
+
+        grams = query_grams(query)
+        phases = [
+            [query] if query in self._nodes else [],
+            self._names_by_length(
+                prefix_grams(query) | grams,
+                len(query) + 1,
+                lambda name: name.startswith(query),
+            ),
+            self._names_by_length(
+                grams,
+                len(query) + 1,
+                lambda name: query in name and not name.startswith(query),
+            ),
+        ]
+        results = []
+        for names in phases:
+            for name in names:
+                # 쓰기 스레드가 집합을 바꾸는 중일 수 있으므로 먼저 복사
+                for node in sorted(list(self._nodes.get(name, ())), key=lambda node: node.path):
+                    results.append(node)
+                    if len(results) >= limit:
+                        return results
+        return results
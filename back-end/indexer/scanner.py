@@ -1,84 +1,472 @@
 import os
+import stat
+import time
+import hashlib
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from indexer.filesystem import FileSystem
 import logging
 
 logger = logging.getLogger(__name__)
 
+# (절대 경로, 디렉토리 여부, 메타데이터)
+ScanEntry = Tuple[str, bool, dict]
+
+
+def build_metadata(name: str, stat: os.stat_result) -> dict:
+    """stat 결과로 메타데이터 생성 (추가 시스템 콜 없음)"""
+    return {
+        "size": stat.st_size,  # 파일 크기 (바이트)
+        "created": datetime.fromtimestamp(stat.st_ctime).strftime(
+            "%Y-%m-%d %H:%M:%S"
+        ),  # 생성일시
+        "modified": datetime.fromtimestamp(stat.st_mtime).strftime(
+            "%Y-%m-%d %H:%M:%S"
+        ),  # 수정일시
+        "is_hidden": name.startswith("."),  # 숨김 파일 여부
+        "permissions": oct(stat.st_mode)[-3:],  # 파일 권한
+        "owner": stat.st_uid,  # 소유자 ID
+        "group": stat.st_gid,  # 그룹 ID
+        "mtime_ns": stat.st_mtime_ns,  # 변경 감지용 수정 시각 (나노초)
+        "inode": stat.st_ino,  # 변경 감지용 inode 번호
+    }
+
+
+def stat_key(metadata: dict) -> tuple:
+    """변경 여부 비교에 쓰는 (크기, 수정 시각, inode)"""
+    return (metadata.get("size"), metadata.get("mtime_ns"), metadata.get("inode"))
+
+
+@dataclass
+class ScanReport:
+    """스캔 1회의 결과 요약"""
+
+    root_path: str
+    workers: int
+    directories: int = 0
+    files: int = 0
+    errors: int = 0
+    elapsed: float = 0.0  # 초
+    error_paths: List[str] = field(default_factory=list)
+
+    @property
+    def entries(self) -> int:
+        return self.directories + self.files
+
+    @property
+    def entries_per_sec(self) -> float:
+        return self.entries / self.elapsed if self.elapsed > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "root_path": self.root_path,
+            "workers": self.workers,
+            "entries": self.entries,
+            "directories": self.directories,
+            "files": self.files,
+            "errors": self.errors,
+            "elapsed": round(self.elapsed, 3),
+            "entries_per_sec": round(self.entries_per_sec, 1),
+        }
+
+
+@dataclass
+class RefreshReport:
+    """증분 새로고침 1회의 결과 요약"""
+
+    root_path: str
+    directories_visited: int = 0
+    directories_skipped: int = 0
+    created: int = 0
+    modified: int = 0
+    deleted: int = 0
+    moved: int = 0  # inode로 찾은 이름 변경/이동
+    elapsed: float = 0.0  # 초
+
+    def to_dict(self) -> dict:
+        return {
+            "root_path": self.root_path,
+            "directories_visited": self.directories_visited,
+            "directories_skipped": self.directories_skipped,
+            "created": self.created,
+            "modified": self.modified,
+            "deleted": self.deleted,
+            "moved": self.moved,
+            "elapsed": round(self.elapsed, 3),
+        }
+
+
+class WorkStealingWalker:
+    """작업 훔치기(work-stealing) 큐로 디렉토리 방문을 여러 스레드에 분산
+
+    각 워커는 자신의 deque 끝에서 작업을 꺼내고, 비어 있으면 다른 워커의
+    deque 앞쪽에서 훔쳐 온다. visit(task)는 이어서 처리할 하위 작업 목록을 반환한다.
+    """
+
+    def __init__(self, workers: int, visit: Callable[[Any], List[Any]]):
+        self.workers = max(1, workers)
+        self.visit = visit
+        self._queues = [deque() for _ in range(self.workers)]
+        self._condition = threading.Condition()
+        self._pending = 0  # 큐에 있거나 처리 중인 디렉토리 수
+
+    def _push(self, worker_id: int, directories: List[Any]):
+        if not directories:
+            return
+        with self._condition:
+            self._pending += len(directories)
+            self._queues[worker_id].extend(directories)
+            self._condition.notify(len(directories))
+
+    def _take(self, worker_id: int) -> Optional[Any]:
+        try:
+            return self._queues[worker_id].pop()
+        except IndexError:
+            pass
+        for offset in range(1, self.workers):
+            victim = self._queues[(worker_id + offset) % self.workers]
+            try:
+                return victim.popleft()
+            except IndexError:
+                continue
+        return None
+
+    def _work(self, worker_id: int):
+        while True:
+            directory = self._take(worker_id)
+            if directory is None:
+                with self._condition:
+                    if self._pending == 0:
+                        self._condition.notify_all()
+                        return
+                    self._condition.wait(0.01)
+                continue
+
+            try:
+                subdirectories = self.visit(directory)
+            except Exception as e:
+                logger.error(f"Error visiting directory {directory}: {e}")
+                subdirectories = []
+            self._push(worker_id, subdirectories)
+
+            with self._condition:
+                self._pending -= 1
+                if self._pending == 0:
+                    self._condition.notify_all()
+
+    def run(self, root: Any):
+        self._push(0, [root])
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="scanner"
+        ) as executor:
+            for future in [
+                executor.submit(self._work, worker_id)
+                for worker_id in range(self.workers)
+            ]:
+                future.result()
+
 
 class FileSystemScanner:
-    def __init__(self, root_path: str, file_system: FileSystem):
-        self.root_path = root_path
+    def __init__(self, root_path: str, file_system: FileSystem,
+                 workers: Optional[int] = None, batch_size: int = 5000):
+        self.root_path = os.path.abspath(root_path)
         self.file_system = file_system
-        self.file_system.root_path = root_path  # root_path 설정
+        self.file_system.root_path = self.root_path  # root_path 설정
+        # 디렉토리 방문 스레드 수 (네트워크 드라이브처럼 지연이 큰 경우 늘리면 유리)
+        self.workers = workers or min(32, (os.cpu_count() or 1) + 4)
+        self.batch_size = batch_size  # FileSystem.bulk_create 한 번에 넘길 항목 수
+        self.last_report: Optional[ScanReport] = None
 
     def get_metadata(self, path: str) -> dict:
         """파일의 메타데이터를 가져옵니다"""
-        stat = os.stat(path)
-        return {
-            "size": stat.st_size,  # 파일 크기 (바이트)
-            "created": datetime.fromtimestamp(stat.st_ctime).strftime(
-                "%Y-%m-%d %H:%M:%S"
-            ),  # 생성일시
-            "modified": datetime.fromtimestamp(stat.st_mtime).strftime(
-                "%Y-%m-%d %H:%M:%S"
-            ),  # 수정일시
-            "is_hidden": os.path.basename(path).startswith("."),  # 숨김 파일 여부
-            "permissions": oct(stat.st_mode)[-3:],  # 파일 권한
-            "owner": stat.st_uid,  # 소유자 ID
-            "group": stat.st_gid,  # 그룹 ID
-        }
+        return build_metadata(os.path.basename(path), os.stat(path))
 
-    def scan(self) -> None:
+    def walk(self, report: ScanReport) -> List[ScanEntry]:
+        """os.scandir 기반 병렬 탐색 (부모 디렉토리가 항상 자식보다 먼저 나오는 순서)"""
+        entries: List[ScanEntry] = []
+        lock = threading.Lock()
+
+        def visit(directory: str) -> List[str]:
+            local: List[ScanEntry] = []
+            subdirectories = []
+            errors = []
+            try:
+                with os.scandir(directory) as iterator:
+                    for entry in iterator:
+                        try:
+                            is_directory = entry.is_dir()
+                            # DirEntry가 캐시한 stat 결과 재사용
+                            metadata = build_metadata(entry.name, entry.stat())
+                        except OSError as e:
+                            logger.error(f"Error reading entry {entry.path}: {e}")
+                            errors.append(entry.path)
+                            continue
+                        local.append((entry.path, is_directory, metadata))
+                        # 심볼릭 링크 디렉토리는 노드만 만들고 내려가지 않음 (os.walk와 동일)
+                        if is_directory and not entry.is_symlink():
+                            subdirectories.append(entry.path)
+            except OSError as e:
+                logger.error(f"Error scanning directory {directory}: {e}")
+                errors.append(directory)
+
+            # 하위 디렉토리를 큐에 넣기 전에 결과를 먼저 추가해야 부모가 앞에 온다
+            with lock:
+                entries.extend(local)
+                report.error_paths.extend(errors)
+            return subdirectories
+
+        WorkStealingWalker(self.workers, visit).run(self.root_path)
+        report.errors = len(report.error_paths)
+        return entries
+
+    def scan(self) -> ScanReport:
         """초기 파일 시스템 스캔"""
         print(f"Starting scan of {self.root_path}")
+        started = time.perf_counter()
+        report = ScanReport(root_path=self.root_path, workers=self.workers)
+
         # 먼저 루트 디렉토리 생성
         if not os.path.exists(self.root_path):
             print(f"Creating directory: {self.root_path}")
             os.makedirs(self.root_path)
 
-        # 루트 노드 생성 및 메타데이터 설정
-        root_node = self.file_system.create_node(self.root_path, is_directory=True)
+        # 루트 노드 생성 및 메타데이터 설정 (생성 시 FileIndexer에 함께 기록됨)
         root_metadata = self.get_metadata(self.root_path)
-        root_node.metadata = root_metadata
-        
-        # FileIndexer에 루트 노드 기록
-        self.file_system.file_indexer.add_event(
-            event_type="created",
-            file_path=self.root_path,
-            metadata=root_metadata
+        self.file_system.create_node(
+            self.root_path, is_directory=True, metadata=root_metadata
         )
 
-        # 파일 시스템 스캔
-        for root, dirs, files in os.walk(self.root_path):
-            # 디렉토리 처리
-            for dir_name in dirs:
-                path = os.path.join(root, dir_name)
+        # 파일 시스템 스캔 (묶음 단위로 노드 등록 및 FileIndexer 기록)
+        # (정렬 색인은 모든 묶음을 등록한 뒤 한 번만 발행)
+        entries = self.walk(report)
+        with self.file_system.writing():
+            for start in range(0, len(entries), self.batch_size):
+                batch = entries[start:start + self.batch_size]
                 try:
-                    node = self.file_system.create_node(path, is_directory=True)
-                    metadata = self.get_metadata(path)
-                    node.metadata = metadata
-                    # FileIndexer에 디렉토리 노드 기록
-                    self.file_system.file_indexer.add_event(
-                        event_type="created",
-                        file_path=path,
-                        metadata=metadata
-                    )
+                    self.file_system.bulk_create(batch)
                 except Exception as e:
-                    logger.error(f"Error creating directory node {path}: {e}")
+                    logger.error(f"Error creating nodes under {self.root_path}: {e}")
+                    report.error_paths.extend(path for path, _, _ in batch)
+                    continue
+                for _, is_directory, _ in batch:
+                    if is_directory:
+                        report.directories += 1
+                    else:
+                        report.files += 1
+
+        report.errors = len(report.error_paths)
+        report.elapsed = time.perf_counter() - started
+        self.last_report = report
+        print(
+            f"Scan finished: {report.entries} entries in {report.elapsed:.2f}s "
+            f"({report.entries_per_sec:.0f} entries/s, {report.workers} workers)"
+        )
+        return report
 
-            # 파일 처리
-            for file_name in files:
-                path = os.path.join(root, file_name)
+    def list_directory(self, directory: str) -> Tuple[Dict[str, ScanEntry], bytes]:
+        """디렉토리 한 단계 목록과 그 목록의 다이제스트"""
+        listing: Dict[str, ScanEntry] = {}
+        with os.scandir(directory) as iterator:
+            for entry in iterator:
                 try:
-                    node = self.file_system.create_node(path, is_directory=False)
-                    metadata = self.get_metadata(path)
-                    node.metadata = metadata
-                    # FileIndexer에 파일 노드 기록
-                    self.file_system.file_indexer.add_event(
-                        event_type="created",
-                        file_path=path,
-                        metadata=metadata
+                    listing[entry.name] = (
+                        entry.path,
+                        entry.is_dir(),
+                        build_metadata(entry.name, entry.stat()),
                     )
-                except Exception as e:
-                    logger.error(f"Error creating file node {path}: {e}")
+                except OSError as e:
+                    logger.error(f"Error reading entry {entry.path}: {e}")
+
+        digest = hashlib.blake2b(digest_size=16)
+        for name in sorted(listing):
+            _, is_directory, metadata = listing[name]
+            digest.update(repr((name, is_directory) + stat_key(metadata)).encode())
+        return listing, digest.digest()
+
+    def refresh(self, path: Optional[str] = None,
+                trust_dir_mtime: bool = True) -> RefreshReport:
+        """디스크와 메모리 트리의 차이만 반영하는 증분 새로고침
+
+        디렉토리 mtime 기반으로 건너뛴다. trust_dir_mtime이면 mtime과 inode가
+        트리에 기록된 값과 같은 디렉토리는 목록을 다시 읽지 않고 하위 디렉토리만
+        stat으로 확인하며 내려간다. 목록을 읽은 디렉토리도 목록 다이제스트(이름/
+        종류/크기/mtime/inode)가 지난번 새로고침 때 저장한 listing_digest와 같으면
+        직속 항목 비교를 건너뛴다. (디렉토리 mtime은 항목 추가/삭제/이름 변경
+        시에만 바뀌므로 파일 제자리 수정은 watchdog이 반영하며,
+        trust_dir_mtime=False로 모든 디렉토리를 읽고 비교할 수 있다.)
+        """
+        start_path = os.path.abspath(path or self.root_path)
+        start_node = self.file_system.get_node_by_path(start_path)
+        if start_node is None or not start_node.is_directory:
+            # 아직 트리에 없는 경로는 전체 스캔으로 처리
+            self.scan()
+            return RefreshReport(root_path=start_path)
+
+        started = time.perf_counter()
+        report = RefreshReport(root_path=start_path)
+        listings: Dict[str, Tuple[Dict[str, ScanEntry], bytes]] = {}
+        # 목록을 읽기 직전 디렉토리 자신의 stat (다음 새로고침에서 건너뛸 수 있게 기록)
+        directory_stats: Dict[str, os.stat_result] = {}
+        order: List[str] = []  # 부모가 자식보다 먼저 오는 방문 순서
+        lock = threading.Lock()
+
+        def unchanged(node, stat_result) -> bool:
+            return (
+                trust_dir_mtime
+                and node is not None
+                and node.is_directory
+                and node.stat_key()[1:] == (stat_result.st_mtime_ns, stat_result.st_ino)
+            )
+
+        def visit(task: Tuple[str, bool]) -> List[Tuple[str, bool]]:
+            directory, need_listing = task
+            node = self.file_system.get_node_by_path(directory)
+            subdirectories = []
+
+            if not need_listing:
+                # mtime이 그대로인 디렉토리: 직속 항목은 변하지 않았으므로 목록을 읽지 않고
+                # 메모리에 있는 하위 디렉토리만 stat으로 확인하며 내려간다
+                for child in list(node.children):
+                    if not child.is_directory:
+                        continue
+                    try:
+                        stat_result = os.stat(child.path, follow_symlinks=False)
+                    except OSError:
+                        subdirectories.append((child.path, True))
+                        continue
+                    if not stat.S_ISLNK(stat_result.st_mode):
+                        subdirectories.append(
+                            (child.path, not unchanged(child, stat_result))
+                        )
+                with lock:
+                    report.directories_skipped += 1
+                    order.append(directory)
+                return subdirectories
+
+            try:
+                directory_stat = os.stat(directory)
+                listing, digest = self.list_directory(directory)
+            except OSError as e:
+                logger.error(f"Error scanning directory {directory}: {e}")
+                return []
+
+            for name, (child_path, is_directory, metadata) in listing.items():
+                if not is_directory or os.path.islink(child_path):
+                    continue
+                child = self.file_system.get_node_by_path(child_path) if node else None
+                need_child_listing = not (
+                    child is not None
+                    and child.is_directory
+                    and trust_dir_mtime
+                    and child.stat_key()[1:] == stat_key(metadata)[1:]
+                )
+                subdirectories.append((child_path, need_child_listing))
+
+            with lock:
+                listings[directory] = (listing, digest)
+                directory_stats[directory] = directory_stat
+                order.append(directory)
+            return subdirectories
+
+        if unchanged(start_node, os.stat(start_path)):
+            start_task = (start_path, False)
+        else:
+            start_task = (start_path, True)
+        WorkStealingWalker(self.workers, visit).run(start_task)
+
+        # 변경분 적용 (단일 스레드)
+        # 목록 다이제스트가 지난번과 같은 디렉토리는 직속 항목이 그대로이므로 비교 생략
+        same_listing = set()
+        if trust_dir_mtime:
+            for directory, (_, digest) in listings.items():
+                node = self.file_system.get_node_by_path(directory)
+                if node is not None and node.listing_digest == digest:
+                    same_listing.add(directory)
+
+        # 사라진 항목은 바로 지우지 않고 inode로 모아 두었다가, 같은 inode의 새 항목이
+        # 있으면 이름 변경/이동으로 보고 하위 트리째 옮긴다 (uuid 유지, 하위 항목 재생성 없음)
+        vanished: Dict[Tuple[int, bool], Any] = {}
+        for directory in order:
+            node = self.file_system.get_node_by_path(directory)
+            if node is None or directory not in listings or directory in same_listing:
+                continue
+            listing, _ = listings[directory]
+            for child in node.children:
+                if child.name not in listing and child.inode:
+                    vanished[(child.inode, child.is_directory)] = child
+
+        def take_moved(child_path: str, is_directory: bool, metadata: dict) -> bool:
+            source = vanished.pop((metadata.get("inode"), is_directory), None)
+            if source is None or self.file_system.get_node_by_path(source.path) is not source:
+                return False
+            self.file_system.move_node(source.path, child_path, metadata)
+            report.moved += 1
+            return True
+
+        created: List[ScanEntry] = []
+        for directory in order:
+            if directory not in listings or directory in same_listing:
+                continue
+            listing, _ = listings[directory]
+            node = self.file_system.get_node_by_path(directory)
+            if node is None:
+                # 새 디렉토리: 옮겨 온 것이 아니면 하위 항목 모두 생성
+                created.extend(
+                    entry for entry in listing.values() if not take_moved(*entry)
+                )
+                continue
+
+            for child in list(node.children):
+                entry = listing.get(child.name)
+                if entry is not None and entry[1] != child.is_directory:
+                    self.file_system.remove_node(child.path)
+                    report.deleted += 1
+
+            for name, (child_path, is_directory, metadata) in listing.items():
+                child = self.file_system.get_node_by_path(child_path)
+                if child is None:
+                    if not take_moved(child_path, is_directory, metadata):
+                        created.append((child_path, is_directory, metadata))
+                elif child.stat_key() != stat_key(metadata):
+                    if is_directory:
+                        # 디렉토리 mtime 변화는 하위 항목 변경으로 드러나므로 조용히 갱신
+                        self.file_system.merge_metadata(child, metadata)
+                    else:
+                        self.file_system.update_node(child_path, metadata)
+                        report.modified += 1
+
+        with self.file_system.writing():
+            for start in range(0, len(created), self.batch_size):
+                self.file_system.bulk_create(created[start:start + self.batch_size])
+        report.created = len(created)
+
+        # 옮겨지지 않은 사라진 항목 제거 (상위 디렉토리와 함께 이미 제거된 것은 건너뜀)
+        for child in vanished.values():
+            if self.file_system.nodes.get(child.uuid) is child:
+                self.file_system.remove_node(child.path)
+                report.deleted += 1
+
+        # 읽은 목록의 다이제스트와 디렉토리 자신의 stat 저장 (다음 새로고침에서 비교)
+        # 부모가 건너뛴 디렉토리는 부모 목록으로 stat이 갱신되지 않으므로 여기서 기록
+        for directory, (_, digest) in listings.items():
+            node = self.file_system.get_node_by_path(directory)
+            if node is None:
+                continue
+            node.listing_digest = digest
+            metadata = build_metadata(node.name, directory_stats[directory])
+            if node.stat_key() != stat_key(metadata):
+                self.file_system.merge_metadata(node, metadata)
+
+        report.directories_visited = len(listings)
+        report.elapsed = time.perf_counter() - started
+        print(
+            f"Refresh finished: +{report.created} ~{report.modified} -{report.deleted} "
+            f">{report.moved} "
+            f"({report.directories_visited} dirs visited, "
+            f"{report.directories_skipped} skipped) in {report.elapsed:.2f}s"
+        )
+        return report
@@ -0,0 +1,539 @@
+import os
+import json
+import logging
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Optional, List, Iterable, Iterator
+
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Float,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+    bindparam,
+    create_engine,
+    delete,
+    event,
+    func,
+    inspect,
+    literal,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.dialects.sqlite import insert
+
+logger = logging.getLogger(__name__)
+
+DATABASE_FILE = "file_index.db"
+# 이력을 스트리밍할 때 한 번에 읽는 행 수
+HISTORY_PAGE_SIZE = 1000
+
+metadata_obj = MetaData()
+
+events_table = Table(
+    "events",
+    metadata_obj,
+    Column("seq", Integer, primary_key=True, autoincrement=True),
+    Column("timestamp", String, nullable=False),  # ISO 형식 (API 응답용)
+    Column("ts", Float, nullable=False),  # epoch 초 (범위 조회용)
+    Column("event_type", String, nullable=False),
+    Column("file_path", Text, nullable=False),
+    Column("metadata", Text, nullable=False),
+    Index("ix_events_path_ts", "file_path", "ts"),
+    Index("ix_events_type_ts", "event_type", "ts"),
+    Index("ix_events_ts", "ts"),
+)
+
+files_table = Table(
+    "files",
+    metadata_obj,
+    Column("file_path", Text, primary_key=True),
+    Column("last_modified", String, nullable=False),
+    Column("metadata", Text, nullable=False),
+    Column("is_directory", Boolean),
+    Column("size", Integer, nullable=False, default=0),
+    Column("extension", String),  # 디렉토리는 NULL
+    Column("top_level", Text, nullable=False),  # root_path 기준 최상위 디렉토리
+    Index("ix_files_extension", "extension"),
+    Index("ix_files_top_level", "top_level"),
+)
+
+# 통계 카운터 (category, key) -> value. flush가 events/files를 바꾸는 같은
+# 트랜잭션에서 변화량만 더하므로 통계 조회는 테이블 크기와 관계없이 작은 행만 읽는다
+statistics_table = Table(
+    "statistics",
+    metadata_obj,
+    Column("category", String, primary_key=True),
+    Column("key", Text, primary_key=True),
+    Column("value", Integer, nullable=False, default=0),
+)
+
+# 카테고리
+EVENT_TYPE = "event_type"
+EXTENSION = "extension"
+TOP_LEVEL = "top_level"
+TOTAL = "total"  # key: entries(파일+디렉토리 수), files(파일 수), bytes(파일 크기 합)
+
+# 통계 변화량 계산에 필요한 files 열
+STAT_COLUMNS = (
+    files_table.c.file_path,
+    files_table.c.is_directory,
+    files_table.c.size,
+    files_table.c.extension,
+    files_table.c.top_level,
+)
+# 기존 행을 경로로 읽을 때 IN 절 하나에 넣는 경로 수
+STAT_LOOKUP_SIZE = 500
+
+
+def _count_entry(counts: Counter, is_directory, size: int, extension, top_level: str,
+                 sign: int = 1):
+    """files 행 하나를 통계 변화량에 더하거나(sign=1) 뺌(sign=-1)"""
+    counts[TOTAL, "entries"] += sign
+    counts[TOP_LEVEL, top_level] += sign
+    if not is_directory:
+        counts[TOTAL, "files"] += sign
+        counts[TOTAL, "bytes"] += sign * (size or 0)
+        if extension is not None:
+            counts[EXTENSION, extension] += sign
+
+
+EVENT_COLUMNS = ("timestamp", "ts", "event_type", "file_path", "metadata")
+
+
+def _to_timestamp(value: str) -> float:
+    return datetime.fromisoformat(value).timestamp()
+
+
+class SQLiteFileIndexer:
+    """SQLite 파일에 인덱스와 히스토리를 저장하는 FileIndexer 대체 구현
+
+    FileIndexer와 같은 메서드를 제공하므로 FileSystem에 그대로 주입할 수 있다.
+    이벤트는 메모리 버퍼에 모았다가 batch_size 또는 flush_interval마다
+    하나의 트랜잭션으로 기록한다. 통계는 그 트랜잭션에서 함께 갱신하는 카운터
+    테이블(statistics)에서 읽는다.
+    """
+
+    def __init__(
+        self,
+        log_directory: str,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+    ):
+        self.log_directory = log_directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.root_path: Optional[str] = None  # 최상위 디렉토리 통계의 기준 경로
+
+        self._lock = threading.RLock()
+        self._pending: List[dict] = []
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._flush_thread = None
+
+        self.ensure_log_directory()
+        self.engine = create_engine(
+            f"sqlite:///{os.path.join(log_directory, DATABASE_FILE)}",
+            connect_args={"check_same_thread": False},
+        )
+        event.listen(self.engine, "connect", self._configure_connection)
+        has_statistics = inspect(self.engine).has_table(statistics_table.name)
+        metadata_obj.create_all(self.engine)
+        if not has_statistics:
+            # 통계 테이블이 없던 이전 데이터베이스: 한 번만 전체 집계로 채움
+            with self.engine.begin() as conn:
+                self._rebuild_statistics(conn)
+        self.start_flusher()
+
+    @staticmethod
+    def _configure_connection(dbapi_connection, connection_record):
+        """WAL 모드 설정"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+    def ensure_log_directory(self):
+        """로그 디렉토리 생성"""
+        if not os.path.exists(self.log_directory):
+            os.makedirs(self.log_directory)
+
+    def start_flusher(self):
+        """백그라운드 배치 기록 스레드 시작"""
+        if self._flush_thread and self._flush_thread.is_alive():
+            return
+        self._stopped.clear()
+        self._flush_thread = threading.Thread(
+            target=self._flush_loop, name="sqlite-indexer-flush", daemon=True
+        )
+        self._flush_thread.start()
+
+    def _flush_loop(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing events to SQLite: {e}")
+
+    def flush(self):
+        """버퍼에 쌓인 이벤트를 하나의 트랜잭션으로 기록"""
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, []
+
+            counts = Counter((EVENT_TYPE, row["event_type"]) for row in pending)
+            with self.engine.begin() as conn:
+                conn.execute(
+                    events_table.insert(),
+                    [{key: row[key] for key in EVENT_COLUMNS} for row in pending],
+                )
+                # 이동은 하위 경로 전체를 바꾸므로 앞뒤 이벤트와 순서를 지켜 반영
+                segment = []
+                for row in pending:
+                    if row["src_path"]:
+                        self._write_files(conn, segment, counts)
+                        segment = []
+                        self._move_files(conn, row["src_path"], row["file_path"], counts)
+                    segment.append(row)
+                self._write_files(conn, segment, counts)
+                self._add_statistics(conn, counts)
+
+    def _add_statistics(self, conn, counts: Counter):
+        """통계 카운터에 변화량을 더함 (flush와 같은 트랜잭션)"""
+        rows = [
+            {"category": category, "key": key, "value": value}
+            for (category, key), value in counts.items()
+            if value
+        ]
+        if rows:
+            statement = insert(statistics_table)
+            conn.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[statistics_table.c.category, statistics_table.c.key],
+                    set_={"value": statistics_table.c.value + statement.excluded.value},
+                ),
+                rows,
+            )
+
+    def _write_files(self, conn, rows: List[dict], counts: Counter):
+        """files 테이블 반영 (같은 경로의 이벤트는 마지막 것만)
+
+        바뀌는 경로의 기존 행을 먼저 읽어 통계에서 빼고, 새로 쓰는 행을 더한다.
+        """
+        latest = {row["file_path"]: row for row in rows}
+        paths = list(latest)
+        for start in range(0, len(paths), STAT_LOOKUP_SIZE):
+            for _, is_directory, size, extension, top_level in conn.execute(
+                select(*STAT_COLUMNS).where(
+                    files_table.c.file_path.in_(paths[start:start + STAT_LOOKUP_SIZE])
+                )
+            ):
+                _count_entry(counts, is_directory, size, extension, top_level, -1)
+        upserts = [
+            {
+                "file_path": row["file_path"],
+                "last_modified": row["timestamp"],
+                "metadata": row["metadata"],
+                "is_directory": row["is_directory"],
+                "size": row["size"],
+                "extension": row["extension"],
+                "top_level": row["top_level"],
+            }
+            for row in latest.values()
+            if row["event_type"] != "deleted"
+        ]
+        for row in upserts:
+            _count_entry(counts, row["is_directory"], row["size"], row["extension"],
+                         row["top_level"])
+        deletes = [
+            {"target_path": row["file_path"]}
+            for row in latest.values()
+            if row["event_type"] == "deleted"
+        ]
+        if upserts:
+            statement = insert(files_table)
+            conn.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[files_table.c.file_path],
+                    set_={
+                        "last_modified": statement.excluded.last_modified,
+                        "metadata": statement.excluded.metadata,
+                        "is_directory": statement.excluded.is_directory,
+                        "size": statement.excluded.size,
+                        "extension": statement.excluded.extension,
+                        "top_level": statement.excluded.top_level,
+                    },
+                ),
+                upserts,
+            )
+        if deletes:
+            conn.execute(
+                delete(files_table).where(
+                    files_table.c.file_path == bindparam("target_path")
+                ),
+                deletes,
+            )
+
+    @staticmethod
+    def _under(path: str):
+        """path 하위 항목 조건 (LIKE 대신 접두사 비교로 %, _ 이스케이프 불필요)"""
+        prefix = path + os.sep
+        return func.substr(files_table.c.file_path, 1, len(prefix)) == prefix
+
+    def _move_files(self, conn, src_path: str, dest_path: str, counts: Counter):
+        """src_path 하위 항목의 경로를 dest_path 기준으로 바꿈 (src_path 자신은 이동 이벤트가 다시 씀)
+
+        지우는 행은 통계에서 빼고, 옮기는 하위 항목은 최상위 디렉토리 개수만 옮긴다.
+        """
+        removed = or_(
+            files_table.c.file_path == src_path,
+            files_table.c.file_path == dest_path,
+            self._under(dest_path),
+        )
+        for _, is_directory, size, extension, top_level in conn.execute(
+            select(*STAT_COLUMNS).where(removed)
+        ):
+            _count_entry(counts, is_directory, size, extension, top_level, -1)
+        conn.execute(delete(files_table).where(removed))
+
+        new_top_level = self._top_level(dest_path, True)
+        for top_level, count in conn.execute(
+            select(files_table.c.top_level, func.count())
+            .where(self._under(src_path))
+            .group_by(files_table.c.top_level)
+        ):
+            counts[TOP_LEVEL, top_level] -= count
+            counts[TOP_LEVEL, new_top_level] += count
+        conn.execute(
+            update(files_table)
+            .where(self._under(src_path))
+            .values(
+                file_path=literal(dest_path)
+                + func.substr(files_table.c.file_path, len(src_path) + 1),
+                top_level=new_top_level,
+            )
+        )
+
+    def close(self):
+        """배치 기록 스레드 종료 후 남은 이벤트 기록"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._flush_thread:
+            self._flush_thread.join()
+            self._flush_thread = None
+        self.flush()
+        self.engine.dispose()
+
+    def checkpoint(self):
+        """남은 이벤트 기록"""
+        self.flush()
+
+    def save_index(self):
+        """인덱스 저장"""
+        self.flush()
+
+    def save_history(self):
+        """히스토리 저장"""
+        self.flush()
+
+    def _top_level(self, file_path: str, is_directory: bool) -> str:
+        """root_path 기준 최상위 디렉토리 이름 (루트 자신과 루트 바로 아래 파일은 ".")"""
+        root_path = os.path.abspath(self.root_path) if self.root_path else None
+        if not root_path or not file_path.startswith(root_path + os.sep):
+            return "."
+        head, sep, _ = file_path[len(root_path) + 1:].partition(os.sep)
+        return head if sep or is_directory else "."
+
+    def add_event(self, event_type: str, file_path: str, metadata: dict,
+                  is_directory: Optional[bool] = None):
+        """파일 시스템 이벤트 기록 (배치로 모아 기록)"""
+        self.add_events([(event_type, file_path, metadata, is_directory)])
+
+    def add_events(self, events: Iterable[tuple]):
+        """여러 이벤트를 한 번에 버퍼에 추가"""
+        now = datetime.now()
+        rows = []
+        for event_type, file_path, metadata, is_directory in events:
+            metadata = metadata or {}
+            rows.append({
+                "timestamp": now.isoformat(),
+                "ts": now.timestamp(),
+                "event_type": event_type,
+                "file_path": file_path,
+                "metadata": json.dumps(metadata, ensure_ascii=False),
+                "is_directory": is_directory,
+                "size": 0 if is_directory else (metadata.get("size") or 0),
+                "extension": None if is_directory
+                else os.path.splitext(file_path)[1][1:].lower() or "없음",
+                "top_level": self._top_level(file_path, bool(is_directory)),
+                "src_path": metadata.get("src_path") if event_type == "moved" else None,
+            })
+        with self._lock:
+            self._pending.extend(rows)
+            if len(self._pending) >= self.batch_size:
+                self._wakeup.set()
+
+    @staticmethod
+    def _row_to_event(row) -> dict:
+        return {
+            "seq": row.seq,
+            "timestamp": row.timestamp,
+            "event_type": row.event_type,
+            "file_path": row.file_path,
+            "metadata": json.loads(row.metadata),
+        }
+
+    def get_file_history(self, file_path: Optional[str] = None,
+                        start_date: Optional[str] = None,
+                        end_date: Optional[str] = None,
+                        event_type: Optional[str] = None) -> List[dict]:
+        """파일 변경 이력 조회 (인덱스를 사용하는 쿼리)"""
+        return list(self.iter_file_history(file_path, start_date, end_date, event_type))
+
+    def iter_file_history(self, file_path: Optional[str] = None,
+                          start_date: Optional[str] = None,
+                          end_date: Optional[str] = None,
+                          event_type: Optional[str] = None,
+                          after_seq: Optional[int] = None) -> Iterator[dict]:
+        """조건에 맞는 이벤트를 seq 순서로 하나씩 (after_seq가 있으면 그 다음부터)
+
+        seq 기준 키셋 페이지로 HISTORY_PAGE_SIZE개씩 읽어, 결과 크기와 관계없이
+        메모리 사용량이 일정하고 페이지 사이에 연결을 붙잡고 있지 않는다.
+        """
+        self.flush()
+
+        query = select(events_table)
+        if file_path:
+            query = query.where(events_table.c.file_path == file_path)
+        if event_type:
+            query = query.where(events_table.c.event_type == event_type)
+        if start_date:
+            query = query.where(events_table.c.ts >= _to_timestamp(start_date))
+        if end_date:
+            query = query.where(events_table.c.ts <= _to_timestamp(end_date))
+        query = query.order_by(events_table.c.seq).limit(HISTORY_PAGE_SIZE)
+
+        last_seq = after_seq or 0
+        while True:
+            with self.engine.connect() as conn:
+                rows = conn.execute(query.where(events_table.c.seq > last_seq)).fetchall()
+            for row in rows:
+                yield self._row_to_event(row)
+            if len(rows) < HISTORY_PAGE_SIZE:
+                return
+            last_seq = rows[-1].seq
+
+    def get_file_metadata(self, file_path: str) -> Optional[dict]:
+        """파일 메타데이터 조회"""
+        self.flush()
+
+        query = select(files_table).where(files_table.c.file_path == file_path)
+        with self.engine.connect() as conn:
+            row = conn.execute(query).first()
+        if row is None:
+            return None
+        return {
+            "last_modified": row.last_modified,
+            "metadata": json.loads(row.metadata),
+        }
+
+    def _rebuild_statistics(self, conn):
+        """events/files 전체를 집계해 통계 카운터를 다시 채움 (O(n), 처음 한 번만)"""
+        conn.execute(delete(statistics_table))
+        is_file = files_table.c.is_directory.isnot(True)
+        rows = [
+            {"category": EVENT_TYPE, "key": event_type, "value": count}
+            for event_type, count in conn.execute(
+                select(events_table.c.event_type, func.count()).group_by(
+                    events_table.c.event_type
+                )
+            )
+        ]
+        entries = conn.execute(select(func.count()).select_from(files_table)).scalar_one()
+        files, total_bytes = conn.execute(
+            select(func.count(), func.coalesce(func.sum(files_table.c.size), 0)).where(is_file)
+        ).one()
+        rows += [
+            {"category": TOTAL, "key": "entries", "value": entries},
+            {"category": TOTAL, "key": "files", "value": files},
+            {"category": TOTAL, "key": "bytes", "value": total_bytes},
+        ]
+        rows += [
+            {"category": EXTENSION, "key": extension, "value": count}
+            for extension, count in conn.execute(
+                select(files_table.c.extension, func.count())
+                .where(is_file, files_table.c.extension.isnot(None))
+                .group_by(files_table.c.extension)
+            )
+        ]
+        rows += [
+            {"category": TOP_LEVEL, "key": top_level, "value": count}
+            for top_level, count in conn.execute(
+                select(files_table.c.top_level, func.count()).group_by(files_table.c.top_level)
+            )
+        ]
+        conn.execute(statistics_table.insert(), rows)
+
+    def _read_statistics(self, conn) -> dict:
+        """category -> {key: value} (0이 된 카운터는 제외)"""
+        counters = {}
+        for category, key, value in conn.execute(
+            select(statistics_table).where(statistics_table.c.value != 0)
+        ):
+            counters.setdefault(category, {})[key] = value
+        return counters
+
+    def _statistics(self) -> tuple:
+        """(기본 통계, 카운터). 버퍼를 먼저 기록한 뒤 카운터 테이블과 마지막 이벤트만 읽음"""
+        self.flush()
+
+        with self.engine.connect() as conn:
+            counters = self._read_statistics(conn)
+            last = conn.execute(
+                select(events_table.c.seq, events_table.c.timestamp)
+                .order_by(events_table.c.seq.desc())
+                .limit(1)
+            ).first()
+
+        type_counts = counters.get(EVENT_TYPE, {})
+        statistics = {
+            "total_files": counters.get(TOTAL, {}).get("entries", 0),
+            "total_events": last.seq if last else 0,
+            "last_event": last.timestamp if last else None,
+            "event_types": {
+                "created": type_counts.get("created", 0),
+                "modified": type_counts.get("modified", 0),
+                "deleted": type_counts.get("deleted", 0),
+                "moved": type_counts.get("moved", 0),
+            },
+        }
+        return statistics, counters
+
+    def get_statistics(self) -> dict:
+        """파일 시스템 통계 정보 (트리거로 유지되는 카운터 기반)"""
+        return self._statistics()[0]
+
+    def get_detailed_statistics(self) -> dict:
+        """확장 통계 정보 (확장자/최상위 디렉토리별 개수, 전체 크기)"""
+        statistics, counters = self._statistics()
+        totals = counters.get(TOTAL, {})
+        file_count = totals.get("files", 0)
+        statistics.update({
+            "event_types": counters.get(EVENT_TYPE, {}),
+            "file_count": file_count,
+            "directory_count": statistics["total_files"] - file_count,
+            "total_bytes": totals.get("bytes", 0),
+            "extensions": counters.get(EXTENSION, {}),
+            "top_level_directories": counters.get(TOP_LEVEL, {}),
+        })
+        return statistics
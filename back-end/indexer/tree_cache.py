@@ -0,0 +1,193 @@
+import os
+import json
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# API 응답 캐시에 보관하는 최대 응답 수
+MAX_RESPONSES = 256
+
+# 조각을 만들 때 경로 자리에 넣는 값 (파일 이름에 들어갈 수 없는 NUL이라 이름과
+# 겹치지 않으며, JSON에서는 항상 아래 문자열로 인코딩됨)
+PATH_PLACEHOLDER = "\0"
+ENCODED_PLACEHOLDER = '"\\u0000"'
+
+
+def encode_json(value) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def node_entry(node) -> dict:
+    return {
+        "uuid": node.uuid,
+        "name": node.name,
+        "path": node.path,
+        "is_directory": node.is_directory,
+        "metadata": node.metadata,
+    }
+
+
+def split_entry(entry: dict, marker: tuple, children: str = "") -> List:
+    """경로 자리를 비워 둔 항목 조각 목록
+
+    경로 값(항목의 "path"와 metadata["path"])마다 marker가 들어가며 이어 붙일 때
+    채운다. marker는 ()이면 디렉토리(또는 시작 노드) 자신의 경로, (인코딩한
+    이름,)이면 그 디렉토리 아래 이름의 경로다.
+    """
+    entry["path"] = PATH_PLACEHOLDER
+    if "path" in entry["metadata"]:
+        entry["metadata"]["path"] = PATH_PLACEHOLDER
+    text = encode_json(entry)
+    if children:
+        text = text[:-1] + children
+    parts = []
+    for index, piece in enumerate(text.split(ENCODED_PLACEHOLDER)):
+        if index:
+            parts.append(marker)
+        parts.append(piece)
+    return parts
+
+
+def child_marker(name: str) -> tuple:
+    """디렉토리 아래 name의 경로 표식 (여는 따옴표를 뺀 JSON 인코딩 이름)"""
+    return (encode_json(name)[1:],)
+
+
+class TreeCache:
+    """트리 직렬화 캐시
+
+    디렉토리마다 자기 항목과 직속 파일 항목을 직렬화한 조각 목록을 보관하고,
+    하위 디렉토리 자리에는 노드 참조만 둔다. 그래서 파일 하나가 바뀌면 그 부모
+    디렉토리의 조각만 다시 만들고, 조상들은 캐시된 조각을 그대로 이어 붙인다.
+    경로는 조각에 넣지 않고 이어 붙일 때 채우므로, 디렉토리를 옮겨도 옮긴
+    노드와 이전/새 부모의 조각만 버리면 된다.
+    조상으로 전파되는 버전(FileNode.version)은 전체 트리 문자열과 API 응답
+    캐시의 유효성 확인, ETag에 쓴다.
+
+    읽기 스레드가 잠금 없이 조각을 만드는 동안 쓰기가 끝나면(버전 증가 후
+    무효화) 만든 조각이 오래된 것일 수 있으므로, 만들기 전과 후의 버전이 다르면
+    캐시에 남기지 않는다.
+    """
+
+    def __init__(self, max_responses: int = MAX_RESPONSES):
+        self._parts: Dict[str, List] = {}  # 디렉토리 uuid -> 조각 목록 (문자열 또는 하위 디렉토리)
+        self._joined: Optional[Tuple[tuple, str]] = None  # ((uuid, 경로, 버전), 전체 문자열)
+        self._responses: "OrderedDict[tuple, Tuple[int, str]]" = OrderedDict()
+        self.max_responses = max_responses
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self, node):
+        """node의 항목이 들어 있는 조각을 버림 (디렉토리는 자기, 파일은 부모 조각)"""
+        directory = node if node.is_directory else node.parent
+        if directory is not None:
+            self._parts.pop(directory.uuid, None)
+
+    def discard(self, node):
+        """제거된 노드의 캐시 정리"""
+        self._parts.pop(node.uuid, None)
+
+    def clear(self):
+        self._parts.clear()
+        self._joined = None
+        self._responses.clear()
+
+    def _build_parts(self, node) -> List:
+        parts, text = [], []
+
+        def extend(pieces):
+            # 이웃한 문자열은 하나로 합쳐 둠
+            for piece in pieces:
+                if isinstance(piece, str):
+                    text.append(piece)
+                else:
+                    parts.append("".join(text))
+                    parts.append(piece)
+                    text.clear()
+
+        extend(split_entry(node_entry(node), (), ',"children":['))
+        for index, child in enumerate(node.children):
+            if index:
+                text.append(",")
+            if child.is_directory:
+                extend((child,))
+            else:
+                extend(split_entry(
+                    {**node_entry(child), "children": []}, child_marker(child.name)
+                ))
+        text.append("]}")
+        parts.append("".join(text))
+        return parts
+
+    def _node_parts(self, node) -> List:
+        if not node.is_directory:
+            return split_entry({**node_entry(node), "children": []}, ())
+        parts = self._parts.get(node.uuid)
+        if parts is None:
+            self.misses += 1
+            version = node.version
+            parts = self._parts[node.uuid] = self._build_parts(node)
+            if node.version != version:
+                self._parts.pop(node.uuid, None)
+        else:
+            self.hits += 1
+        return parts
+
+    def iter_subtree(self, node) -> Iterator[str]:
+        """node 하위 트리 전체의 JSON 조각 (이어 붙이면 중첩 children 형식)
+
+        경로 표식은 디렉토리마다 한 번 인코딩한 경로와 자식 경로 접두사로 채운다.
+        """
+        stack = []
+
+        def push(directory, path):
+            prefix = encode_json(os.path.join(path, ""))[:-1]
+            stack.append((iter(self._node_parts(directory)), path, encode_json(path), prefix))
+
+        push(node, node.path)
+        while stack:
+            parts, path, encoded_path, prefix = stack[-1]
+            for part in parts:
+                if isinstance(part, str):
+                    yield part
+                elif isinstance(part, tuple):
+                    if part:
+                        yield prefix
+                        yield part[0]
+                    else:
+                        yield encoded_path
+                else:
+                    push(part, os.path.join(path, part.name))
+                    break
+            else:
+                stack.pop()
+
+    def subtree_json(self, node) -> str:
+        """node 하위 트리 전체의 JSON 문자열 (경로와 버전이 같으면 이전 결과 재사용)"""
+        key = (node.uuid, node.path, node.version)
+        joined = self._joined
+        if joined is not None and joined[0] == key:
+            return joined[1]
+        text = "".join(self.iter_subtree(node))
+        self._joined = (key, text)
+        return text
+
+    def response(self, key: tuple, version: int, build: Callable[[], str]) -> str:
+        """key(노드 uuid, 경로와 조회 조건)에 대한 직렬화된 응답 (version이 같으면 재사용)"""
+        cached = self._responses.get(key)
+        if cached is not None and cached[0] == version:
+            self._responses.move_to_end(key)
+            return cached[1]
+        text = build()
+        self._responses[key] = (version, text)
+        self._responses.move_to_end(key)
+        while len(self._responses) > self.max_responses:
+            self._responses.popitem(last=False)
+        return text
+
+    def stats(self) -> dict:
+        return {
+            "directories": len(self._parts),
+            "responses": len(self._responses),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
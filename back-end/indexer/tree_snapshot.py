@@ -0,0 +1,140 @@
+import os
+import time
+import marshal
+import struct
+import logging
+from collections import deque
+from indexer.filesystem import METADATA_FIELDS, FileNode, FileSystem
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b"FMTS"
+SNAPSHOT_VERSION = 2
+# magic, 포맷 버전, marshal 버전, 노드 수
+HEADER = struct.Struct("<4sHHQ")
+
+
+class TreeSnapshotStore:
+    """FileSystem 트리(노드, 부모 관계, 메타데이터, 고정 uuid)를 바이너리 스냅샷으로 저장/복원
+
+    노드를 부모가 먼저 오는 순서로 나열해 열(column)별 리스트로 만든 뒤 marshal로
+    직렬화한다. 복원 시 파일 전체를 한 번에 읽어 이벤트 기록 없이 노드를 일괄 생성한다.
+    """
+
+    def __init__(self, storage_path="filesystem.snapshot"):
+        self.storage_path = storage_path
+
+    def save(self, file_system: FileSystem) -> int:
+        """현재 트리를 스냅샷으로 저장 (임시 파일에 쓴 뒤 원자적으로 교체)"""
+        root = file_system.root
+        if root is None:
+            return 0
+
+        started = time.perf_counter()
+        uuids, names, parents, flags = [], [], [], []
+        fields, created, modified, listing_digests = [], [], [], []
+
+        # 너비 우선으로 나열하여 부모 인덱스가 항상 자식보다 작도록 함
+        queue = deque([(root, -1)])
+        while queue:
+            node, parent_index = queue.popleft()
+            index = len(uuids)
+            uuids.append(node.uuid)
+            names.append(node.name)
+            parents.append(parent_index)
+            flags.append(1 if node.is_directory else 0)
+            fields.append(tuple(getattr(node, field) for field in METADATA_FIELDS))
+            created.append(node.created_ts)
+            modified.append(node.modified_ts)
+            listing_digests.append(node.listing_digest)
+            for child in node.children:
+                queue.append((child, index))
+
+        payload = marshal.dumps(
+            {
+                "root_path": root.path,
+                "uuids": uuids,
+                "names": names,
+                "parents": parents,
+                "flags": bytes(flags),
+                "fields": fields,
+                "created": created,
+                "modified": modified,
+                "listing_digests": listing_digests,
+            }
+        )
+        header = HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, marshal.version, len(uuids))
+
+        tmp_path = self.storage_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(header)
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.storage_path)
+
+        logger.info(
+            f"Tree snapshot saved: {len(uuids)} nodes in "
+            f"{time.perf_counter() - started:.2f}s ({self.storage_path})"
+        )
+        return len(uuids)
+
+    def load(self, file_system: FileSystem, root_path: str) -> bool:
+        """스냅샷으로 빈 트리를 채움 (스냅샷이 없거나 다른 루트/포맷이면 False)"""
+        if file_system.root is not None or not os.path.exists(self.storage_path):
+            return False
+
+        started = time.perf_counter()
+        try:
+            with open(self.storage_path, "rb") as f:
+                data = f.read()
+            magic, version, marshal_version, count = HEADER.unpack_from(data)
+            if (
+                magic != SNAPSHOT_MAGIC
+                or version != SNAPSHOT_VERSION
+                or marshal_version != marshal.version
+            ):
+                logger.warning(f"Ignoring incompatible tree snapshot: {self.storage_path}")
+                return False
+            payload = marshal.loads(memoryview(data)[HEADER.size:])
+        except Exception as e:
+            logger.error(f"Error reading tree snapshot: {e}")
+            return False
+
+        if payload["root_path"] != os.path.abspath(root_path) or not count:
+            logger.warning("Tree snapshot belongs to a different root; ignoring it")
+            return False
+
+        file_system.root_path = payload["root_path"]
+        nodes = []
+        children = {}  # 부모 위치 -> 자식 목록 (부모마다 이름 목록을 한 번만 만듦)
+        parents = payload["parents"]
+        flags = payload["flags"]
+        for index, node_uuid in enumerate(payload["uuids"]):
+            parent = nodes[parents[index]] if parents[index] >= 0 else None
+            name = payload["names"][index]
+            node = FileNode(
+                name,
+                payload["root_path"] if parent is None else None,
+                bool(flags[index]),
+                node_uuid=node_uuid,
+                created_ts=payload["created"][index],
+            )
+            node.modified_ts = payload["modified"][index]
+            for field, value in zip(METADATA_FIELDS, payload["fields"][index]):
+                setattr(node, field, value)
+            node.listing_digest = payload["listing_digests"][index]
+            node.parent = parent
+            if parent is not None:
+                children.setdefault(parents[index], []).append(node)
+            nodes.append(node)
+
+        for parent_index, siblings in children.items():
+            nodes[parent_index].children.add_many(siblings)
+        file_system.register_nodes(nodes)
+        file_system.root = nodes[0]
+        logger.info(
+            f"Tree snapshot loaded: {len(nodes)} nodes in "
+            f"{time.perf_counter() - started:.2f}s"
+        )
+        return True
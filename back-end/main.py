@@ -16,12 +16,24 @@ from indexer.scanner import FileSystemScanner
 from websocket.file_monitor_ws import file_monitor_manager
 from websocket.file_system_ws import FileSystemManager
 from indexer.file_indexer import FileIndexer
+from indexer.tree_snapshot import TreeSnapshotStore
 
 # 로그 디렉토리 설정
 LOG_DIRECTORY = os.path.join(os.path.dirname(__file__), "logs")
 
+# 트리 스냅샷 저장 주기 (초)
+SNAPSHOT_INTERVAL = float(os.environ.get("TREE_SNAPSHOT_INTERVAL", "300"))
+
+# 인덱서 저장소 선택 ("json": 저널 + 스냅샷, "sqlite": SQLite 파일)
+INDEXER_BACKEND = os.environ.get("FILE_INDEXER_BACKEND", "json")
+
 # FileIndexer 초기화
-file_indexer = FileIndexer(LOG_DIRECTORY)
+if INDEXER_BACKEND == "sqlite":
+    from indexer.sqlite_indexer import SQLiteFileIndexer
+
+    file_indexer = SQLiteFileIndexer(LOG_DIRECTORY)
+else:
+    file_indexer = FileIndexer(LOG_DIRECTORY)
 
 # FileSystem 초기화 (FileIndexer 주입)
 file_system = FileSystem(file_indexer)
@@ -30,6 +42,30 @@ file_system = FileSystem(file_indexer)
 watchdog_thread = WatchdogThread(target_folder_path, file_system)
 file_system_manager = FileSystemManager(file_system)  # 추가
 
+# 빠른 재시작을 위한 트리 스냅샷
+tree_snapshot_store = TreeSnapshotStore(os.path.join(LOG_DIRECTORY, "filesystem.snapshot"))
+background_tasks = []
+
+
+async def reconcile_snapshot(scanner: FileSystemScanner):
+    """스냅샷으로 복원한 트리를 백그라운드에서 디스크와 맞춤"""
+    try:
+        # 꺼져 있던 동안의 제자리 수정은 디렉토리 mtime을 바꾸지 않으므로 전체 검증
+        report = await asyncio.to_thread(scanner.refresh, trust_dir_mtime=False)
+        print(f"Snapshot reconciled with disk: {report.to_dict()}")
+    except Exception as e:
+        print(f"Error reconciling snapshot: {e}")
+
+
+async def save_snapshot_periodically():
+    """주기적으로 트리 스냅샷 저장"""
+    while True:
+        await asyncio.sleep(SNAPSHOT_INTERVAL)
+        try:
+            await asyncio.to_thread(tree_snapshot_store.save, file_system)
+        except Exception as e:
+            print(f"Error saving tree snapshot: {e}")
+
 
 async def start():
     print("Service is starting...")
@@ -38,11 +74,15 @@ async def start():
     os.makedirs(LOG_DIRECTORY, exist_ok=True)
     print(f"Log directory initialized: {LOG_DIRECTORY}")
     
-    # 파일 시스템 초기화
+    # 파일 시스템 초기화 (스냅샷이 있으면 즉시 복원 후 백그라운드에서 디스크와 대조)
     scanner = FileSystemScanner(target_folder_path, file_system)
-    print(f"Scanning directory: {target_folder_path}")
-    scanner.scan()
-    print("Scan completed")
+    warm_started = tree_snapshot_store.load(file_system, scanner.root_path)
+    if warm_started:
+        print(f"Warm start from snapshot: {len(file_system.nodes)} nodes")
+    else:
+        print(f"Scanning directory: {target_folder_path}")
+        report = scanner.scan()
+        print(f"Scan completed: {report.to_dict()}")
 
     if not file_system.root:
         print("Warning: File system root is not initialized!")
@@ -51,22 +91,29 @@ async def start():
         print(f"Root node initialized: {file_system.root.uuid}")
         
     # FileIndexer 상태 확인
-    print(f"FileIndexer initialized with {len(file_indexer.index)} indexed files")
-    print(f"File history contains {len(file_indexer.history)} events")
+    stats = file_indexer.get_statistics()
+    print(f"FileIndexer ({INDEXER_BACKEND}) initialized with {stats['total_files']} indexed files")
+    print(f"File history contains {stats['total_events']} events")
 
     # Start watchdog thread and process queues
     watchdog_thread.start()
-    asyncio.create_task(file_monitor_manager.process_queue())
-    asyncio.create_task(file_system_manager.process_queue())
+    background_tasks.append(asyncio.create_task(file_monitor_manager.process_queue()))
+    background_tasks.append(asyncio.create_task(file_system_manager.process_queue()))
+    background_tasks.append(asyncio.create_task(save_snapshot_periodically()))
+    if warm_started:
+        background_tasks.append(asyncio.create_task(reconcile_snapshot(scanner)))
 
 async def shutdown():
     print("Service is shutting down...")
     watchdog_thread.stop()
     file_monitor_manager.stop()
     file_system_manager.stop()
+    for task in background_tasks:
+        task.cancel()
     # manager.stop()
-    file_indexer.save_index()
-    file_indexer.save_history()
+    tree_snapshot_store.save(file_system)
+    print("Tree snapshot saved")
+    file_indexer.close()  # 마지막 체크포인트 기록 후 저널 닫기
     print("FileIndexer data saved")
 
 @asynccontextmanager
@@ -0,0 +1,281 @@
+import os
+import time
+import heapq
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CREATED = "created"
+MODIFIED = "modified"
+DELETED = "deleted"
+MOVED = "moved"  # 대상 경로 기준, PendingChange.src_path가 원래 경로
+
+# 경로에 마지막 이벤트가 온 뒤 이만큼 조용하면 합친 결과를 반영 (초)
+QUIET_PERIOD = float(os.environ.get("WATCH_QUIET_PERIOD", "0.5"))
+# 이벤트가 계속 와도 첫 이벤트 후 이 시간이 지나면 반영 (초)
+MAX_DELAY = float(os.environ.get("WATCH_MAX_DELAY", "5"))
+# 대기 중인 경로 수 상한 (가득 차면 writer가 마감 전이라도 가장 오래된 것부터 반영)
+MAX_PENDING = int(os.environ.get("WATCH_MAX_PENDING", "100000"))
+# writer가 한 번에 반영하는 최대 변경 수 (FileIndexer 그룹 커밋 단위)
+BATCH_SIZE = int(os.environ.get("WATCH_BATCH_SIZE", "1000"))
+# 대기 목록이 가득 찼을 때 observer 스레드가 자리가 나기를 기다리는 시간 (초).
+# 그래도 가득 차 있으면 이벤트 대신 그 디렉토리를 나중에 다시 스캔하도록 기록
+BACKPRESSURE_TIMEOUT = float(os.environ.get("WATCH_BACKPRESSURE_TIMEOUT", "0.05"))
+# 다시 스캔할 디렉토리가 이보다 많아지면 루트 전체를 다시 스캔
+MAX_RESCAN_PATHS = 64
+
+# (이전 순수 효과, 새 이벤트) -> 새 순수 효과 (None이면 아무 일도 없었던 것)
+MERGE = {
+    (CREATED, MODIFIED): CREATED,
+    # 생성 후 삭제: 임시 파일. 처음 본 시점에 트리에 있던 경로(놓친 삭제 뒤의 생성
+    # 등)는 트리에서 지워야 하므로 DELETED로 남김 (EventCoalescer.add 참고)
+    (CREATED, DELETED): None,
+    (MODIFIED, CREATED): MODIFIED,
+    (MODIFIED, DELETED): DELETED,
+    (DELETED, CREATED): MODIFIED,  # 삭제 후 다시 생성: 교체 저장
+    (DELETED, MODIFIED): MODIFIED,
+    (MOVED, CREATED): MOVED,
+    (MOVED, MODIFIED): MOVED,
+    (MOVED, DELETED): DELETED,  # 옮긴 뒤 삭제: src_path의 노드도 제거
+}
+
+
+class PendingChange:
+    __slots__ = (
+        "path", "kind", "is_directory", "first_seen", "deadline", "src_path", "existed",
+    )
+
+    def __init__(self, path: str, kind: str, is_directory: bool, now: float,
+                 src_path: Optional[str] = None, existed: bool = True):
+        self.path = path
+        self.kind = kind
+        self.is_directory = is_directory
+        self.first_seen = now
+        self.deadline = now
+        self.src_path = src_path  # 이동(MOVED)의 원래 경로
+        self.existed = existed  # 처음 본 시점에 트리에 있던 경로인지
+
+
+class EventCoalescer:
+    """경로별 이벤트 묶음을 순수 효과 하나로 합쳐 조용해진 뒤 반영하는 데드라인 힙
+
+    이벤트가 오면 경로의 대기 항목을 MERGE 표로 갱신하고 마감 시각을
+    min(마지막 이벤트 + quiet, 첫 이벤트 + max_delay)로 미룬다. 힙에는 경로마다
+    항목이 하나만 있고, 꺼냈을 때 마감이 미뤄졌으면 다시 넣는다. 생성 후 삭제처럼
+    서로 상쇄된 경로는 대기 목록에서 빠지고 힙 항목은 꺼낼 때 버린다.
+    이름 변경/이동은 대상 경로의 MOVED 하나로 합치고 원래 경로의 대기 항목은
+    가져온다 (아직 반영하지 않은 생성이었다면 대상 경로의 생성이 된다).
+    exists는 경로가 트리에 있는지 알려 주는 함수로, 처음 본 시점에 트리에 없던
+    경로의 생성 후 삭제만 상쇄한다 (없으면 모든 경로를 트리에 있던 것으로 본다).
+
+    add는 observer 스레드에서 대기 목록만 갱신하고, 파일 시스템 반영은 단일
+    writer 스레드가 마감된 변경을 batch_size개씩 묶어 apply_batch로 넘긴다.
+    대기 목록이 max_pending에 닿으면 writer는 마감을 기다리지 않고 오래된 것부터
+    반영하고, observer는 backpressure_timeout만큼 기다린 뒤에도 자리가 없으면
+    이벤트 대신 그 디렉토리를 기록해 두었다가 rescan으로 다시 스캔한다.
+    """
+
+    def __init__(
+        self,
+        apply_batch: Callable[[List[PendingChange]], None],
+        rescan: Optional[Callable[[str], None]] = None,
+        exists: Optional[Callable[[str], bool]] = None,
+        quiet: float = QUIET_PERIOD,
+        max_delay: float = MAX_DELAY,
+        max_pending: int = MAX_PENDING,
+        batch_size: int = BATCH_SIZE,
+        backpressure_timeout: float = BACKPRESSURE_TIMEOUT,
+    ):
+        self.apply_batch = apply_batch
+        self.rescan = rescan
+        self.exists = exists
+        self.quiet = quiet
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.backpressure_timeout = backpressure_timeout
+        self._pending: Dict[str, PendingChange] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._overflow: set = set()  # 이벤트를 버린 디렉토리 (다시 스캔할 대상)
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self.received = 0
+        self.emitted = 0
+        self.overflowed = 0
+        self.rescans = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, path: str, kind: str, is_directory: bool = False,
+            src_path: Optional[str] = None):
+        """이벤트 추가 (watchdog 스레드에서 호출)"""
+        with self._condition:
+            self.received += 1
+            change = self._pending.get(path)
+            if change is None and len(self._pending) >= self.max_pending:
+                # writer가 자리를 만들 때까지 잠시 기다림 (backpressure)
+                self._condition.notify_all()
+                self._condition.wait_for(
+                    lambda: len(self._pending) < self.max_pending or not self._running,
+                    self.backpressure_timeout,
+                )
+                change = self._pending.get(path)
+                if change is None and len(self._pending) >= self.max_pending:
+                    self._add_overflow(os.path.dirname(path))
+                    if src_path:
+                        self._add_overflow(os.path.dirname(src_path))
+                    return
+            now = time.monotonic()
+            if change is None:
+                existed = self.exists(path) if self.exists else True
+                change = self._pending[path] = PendingChange(
+                    path, kind, is_directory, now, src_path, existed
+                )
+                change.deadline = now + self.quiet
+                heapq.heappush(self._heap, (change.deadline, path))
+                if self._heap[0][1] == path or len(self._pending) >= self.max_pending:
+                    # writer가 기다리는 마감보다 이르거나 가득 찼을 때만 깨움
+                    self._condition.notify_all()
+            else:
+                merged = MERGE.get((change.kind, kind), kind)
+                if merged is None and change.existed:
+                    merged = DELETED
+                if merged is None:
+                    del self._pending[path]
+                    return
+                replaced = change.src_path if change.kind == MOVED and kind == MOVED else None
+                change.kind = merged
+                change.is_directory = is_directory
+                if kind == MOVED:
+                    change.src_path = src_path
+                change.deadline = min(now + self.quiet, change.first_seen + self.max_delay)
+                if replaced and replaced != src_path:
+                    # 다른 항목을 같은 경로로 옮겨 덮어썼으면 먼저 옮기려던 항목은 삭제
+                    self.add(replaced, DELETED, is_directory)
+
+    def move(self, src_path: str, dest_path: str, is_directory: bool = False):
+        """이름 변경/이동 이벤트 추가"""
+        with self._condition:
+            source = self._pending.pop(src_path, None)
+            if source is not None and source.kind == CREATED:
+                # 반영 전의 새 항목(임시 파일 등)을 옮긴 것은 대상 경로의 생성
+                if source.existed:
+                    # 원래 경로가 트리에 있었으면 그 노드는 지움
+                    self.add(src_path, DELETED, is_directory)
+                self.add(dest_path, CREATED, is_directory)
+                return
+            if source is not None and source.kind == MOVED:
+                # 연달아 옮긴 경우 트리에 있는 처음 경로에서 옮김
+                src_path = source.src_path
+            self.add(dest_path, MOVED, is_directory, src_path)
+
+    def _add_overflow(self, directory: str):
+        self.overflowed += 1
+        if len(self._overflow) < MAX_RESCAN_PATHS:
+            self._overflow.add(directory)
+        else:
+            # 너무 많으면 공통 조상 하나로 (rescan이 가장 가까운 기존 디렉토리를 찾음)
+            self._overflow = {os.path.commonpath(list(self._overflow) + [directory])}
+
+    def _pop_due(self, now: float, force: bool = False) -> List[PendingChange]:
+        """마감이 지난 항목을 최대 batch_size개 (force면 마감 전이라도 오래된 것부터)
+
+        마감이 미뤄진 항목은 새 마감으로 다시 넣는다.
+        """
+        due = []
+        heap = self._heap
+        while heap and len(due) < self.batch_size and (force or heap[0][0] <= now):
+            _, path = heapq.heappop(heap)
+            change = self._pending.get(path)
+            if change is None:
+                continue
+            if change.deadline > now and not force:
+                heapq.heappush(heap, (change.deadline, path))
+                continue
+            del self._pending[path]
+            due.append(change)
+        return due
+
+    def _apply(self, changes: List[PendingChange]):
+        # 부모 디렉토리가 자식보다 먼저 반영되도록 경로 길이순
+        changes.sort(key=lambda change: len(change.path))
+        try:
+            self.apply_batch(changes)
+            self.emitted += len(changes)
+        except Exception as e:
+            logger.error(f"Error applying {len(changes)} changes: {e}")
+
+    def _rescan(self, directories: set):
+        if not self.rescan:
+            return
+        for directory in sorted(directories):
+            self.rescans += 1
+            try:
+                self.rescan(directory)
+            except Exception as e:
+                logger.error(f"Error rescanning {directory}: {e}")
+
+    def _ready(self) -> bool:
+        return bool(
+            self._overflow
+            or len(self._pending) >= self.max_pending
+            or (self._heap and self._heap[0][0] <= time.monotonic())
+        )
+
+    def flush(self):
+        """대기 중인 모든 변경을 먼저 들어온 순서로 즉시 반영"""
+        with self._condition:
+            changes = sorted(self._pending.values(), key=lambda change: change.first_seen)
+            self._pending.clear()
+            self._heap.clear()
+            overflow, self._overflow = self._overflow, set()
+        for start in range(0, len(changes), self.batch_size):
+            self._apply(changes[start:start + self.batch_size])
+        self._rescan(overflow)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running and not self._ready():
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    self._condition.wait(timeout)
+                if not self._running:
+                    return
+                due = self._pop_due(
+                    time.monotonic(), force=len(self._pending) >= self.max_pending
+                )
+                overflow, self._overflow = self._overflow, set()
+                # 자리가 났으니 기다리는 observer를 깨움
+                self._condition.notify_all()
+            if due:
+                self._apply(due)
+            self._rescan(overflow)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="event-coalescer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """스레드를 멈추고 남은 변경을 모두 반영"""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join()
+        self.flush()
+
+    def metrics(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "received": self.received,
+            "emitted": self.emitted,
+            "overflowed": self.overflowed,
+            "rescans": self.rescans,
+        }
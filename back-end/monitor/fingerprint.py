@@ -0,0 +1,399 @@
+import os
+import stat
+import time
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Float,
+    MetaData,
+    String,
+    Table,
+    create_engine,
+    delete,
+    event,
+    select,
+    tuple_,
+)
+from sqlalchemy.dialects.sqlite import insert
+
+logger = logging.getLogger(__name__)
+
+# 내용 지문 비교 사용 여부 (끄면 mtime/크기 변화를 모두 수정으로 반영)
+FINGERPRINT_ENABLED = os.environ.get("WATCH_FINGERPRINT", "1") == "1"
+# 지문을 계산하는 스레드 수
+HASH_WORKERS = int(os.environ.get("WATCH_HASH_WORKERS", "4"))
+# 이보다 큰 파일은 표본 블록만 먼저 비교하고 전체 해시는 나중에 계산 (바이트)
+SAMPLE_THRESHOLD = int(os.environ.get("WATCH_HASH_SAMPLE_THRESHOLD", str(64 * 1024 * 1024)))
+# 캐시에 보관하는 최대 항목 수 (넘으면 오래 확인하지 않은 것부터 삭제)
+MAX_CACHE_ENTRIES = int(os.environ.get("WATCH_HASH_CACHE_ENTRIES", "1000000"))
+HASH_CACHE_FILE = "hash_cache.db"
+# 스캔한 파일과 새로 생긴 파일의 지문을 백그라운드에서 미리 계산할지
+# (처음 보는 파일의 touch, 같은 내용 저장도 걸러냄. 시작 시 트리 전체를 읽으므로 기본은 끔)
+SEED_ENABLED = os.environ.get("WATCH_HASH_SEED", "0") == "1"
+# 미리 계산하는 스레드의 nice 값 (수정 확인보다 낮은 우선순위, Linux에서만 적용)
+SEED_NICENESS = 10
+# 미리 계산할 때 한 번에 꺼내는 경로 수
+SEED_CHUNK_SIZE = 200
+READ_CHUNK_SIZE = 1024 * 1024
+SAMPLE_BLOCK_SIZE = 64 * 1024
+SAMPLE_BLOCKS = 16
+# 몇 번 저장할 때마다 캐시 크기를 확인할지
+PRUNE_EVERY = 1000
+
+# (st_dev, st_ino, 크기, mtime_ns)
+StatKey = Tuple[int, int, int, int]
+
+metadata_obj = MetaData()
+
+hashes_table = Table(
+    "hashes",
+    metadata_obj,
+    Column("dev", BigInteger, primary_key=True),
+    Column("ino", BigInteger, primary_key=True),
+    Column("size", BigInteger, primary_key=True),
+    Column("mtime_ns", BigInteger, primary_key=True),
+    Column("sample", String),  # 표본 블록 지문 (작은 파일은 전체 해시와 같음)
+    Column("digest", String),  # 전체 내용 해시 (큰 파일은 계산 전이면 NULL)
+    Column("checked_at", Float, nullable=False, index=True),
+)
+
+
+def stat_key_of(stat_result: os.stat_result) -> StatKey:
+    return (stat_result.st_dev, stat_result.st_ino, stat_result.st_size, stat_result.st_mtime_ns)
+
+
+def full_digest(path: str) -> str:
+    """파일 전체의 blake2b 해시 (고정 버퍼로 나눠 읽음)"""
+    digest = hashlib.blake2b(digest_size=32)
+    buffer = bytearray(READ_CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            digest.update(view[:read])
+    return digest.hexdigest()
+
+
+def sample_digest(path: str, size: int) -> str:
+    """처음/끝과 고르게 떨어진 블록만 읽은 표본 지문 (파일 크기와 무관하게 약 1MB 읽음)"""
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    last = max(size - SAMPLE_BLOCK_SIZE, 0)
+    offsets = sorted({last * index // (SAMPLE_BLOCKS - 1) for index in range(SAMPLE_BLOCKS)})
+    with open(path, "rb") as f:
+        for offset in offsets:
+            f.seek(offset)
+            digest.update(f.read(SAMPLE_BLOCK_SIZE))
+    return digest.hexdigest()
+
+
+def _lower_priority():
+    """미리 계산 스레드의 우선순위를 낮춤 (지원하지 않는 플랫폼에서는 그대로)"""
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), SEED_NICENESS)
+    except (AttributeError, OSError):
+        pass
+
+
+class HashCache:
+    """(st_dev, st_ino, 크기, mtime_ns) -> 내용 지문 영구 캐시 (SQLite)
+
+    파일이 바뀌면 키가 달라지므로 무효화가 필요 없다. 바뀌기 전 키로 이전
+    지문을 찾아 새 내용과 비교하고, 비교가 끝난 이전 키는 지운다.
+    """
+
+    def __init__(self, path: str, max_entries: int = MAX_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._stores = 0
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.engine = create_engine(
+            f"sqlite:///{path}", connect_args={"check_same_thread": False}
+        )
+        event.listen(self.engine, "connect", self._configure_connection)
+        metadata_obj.create_all(self.engine)
+
+    @staticmethod
+    def _configure_connection(dbapi_connection, connection_record):
+        """WAL 모드 설정"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+    def get_many(self, keys: Iterable[StatKey]) -> Dict[StatKey, Tuple[Optional[str], Optional[str]]]:
+        """키별 (표본 지문, 전체 해시). 없는 키는 결과에 없음"""
+        keys = list(set(keys))
+        found = {}
+        columns = (hashes_table.c.dev, hashes_table.c.ino, hashes_table.c.size, hashes_table.c.mtime_ns)
+        with self.engine.connect() as conn:
+            for start in range(0, len(keys), 200):
+                rows = conn.execute(
+                    select(*columns, hashes_table.c.sample, hashes_table.c.digest).where(
+                        tuple_(*columns).in_(keys[start:start + 200])
+                    )
+                )
+                for dev, ino, size, mtime_ns, sample, digest in rows:
+                    found[(dev, ino, size, mtime_ns)] = (sample, digest)
+        return found
+
+    def store_many(self, entries: List[Tuple[StatKey, Optional[str], Optional[str]]],
+                   stale: Iterable[StatKey] = ()):
+        """(키, 표본 지문, 전체 해시) 저장 후 stale 키 삭제 (한 트랜잭션)"""
+        stale = [key for key in set(stale) if key not in {entry[0] for entry in entries}]
+        if not entries and not stale:
+            return
+        now = time.time()
+        with self.engine.begin() as conn:
+            if entries:
+                statement = insert(hashes_table)
+                conn.execute(
+                    statement.on_conflict_do_update(
+                        index_elements=["dev", "ino", "size", "mtime_ns"],
+                        set_={
+                            "sample": statement.excluded.sample,
+                            "digest": statement.excluded.digest,
+                            "checked_at": statement.excluded.checked_at,
+                        },
+                    ),
+                    [
+                        {
+                            "dev": key[0], "ino": key[1], "size": key[2], "mtime_ns": key[3],
+                            "sample": sample, "digest": digest, "checked_at": now,
+                        }
+                        for key, sample, digest in entries
+                    ],
+                )
+            for key in stale:
+                conn.execute(
+                    delete(hashes_table).where(
+                        hashes_table.c.dev == key[0],
+                        hashes_table.c.ino == key[1],
+                        hashes_table.c.size == key[2],
+                        hashes_table.c.mtime_ns == key[3],
+                    )
+                )
+            self._stores += 1
+            if self._stores % PRUNE_EVERY == 0:
+                self._prune(conn)
+
+    def _prune(self, conn):
+        cutoff = conn.execute(
+            select(hashes_table.c.checked_at)
+            .order_by(hashes_table.c.checked_at.desc())
+            .offset(self.max_entries)
+            .limit(1)
+        ).scalar()
+        if cutoff is not None:
+            conn.execute(delete(hashes_table).where(hashes_table.c.checked_at <= cutoff))
+
+    def close(self):
+        self.engine.dispose()
+
+
+class ContentFingerprinter:
+    """수정 이벤트가 실제 내용 변경인지 지문으로 확인
+
+    mtime만 바뀐 touch, 권한 변경, 같은 내용으로 다시 저장한 경우를 걸러낸다.
+    파일이 바뀌기 전 stat 키로 캐시에서 이전 지문을 찾고, 새 내용의 지문을
+    스레드 풀에서 계산해 비교한다. 이전 지문이 없으면(처음 보는 파일) 바뀐 것으로
+    본다. 큰 파일은 표본 블록 지문만 먼저 비교하고, 표본이 같으면 일단 그대로로
+    보고 전체 해시를 별도 스레드에서 계산해 다르면 on_changed로 알린다.
+    seed로 넘긴 파일은 우선순위가 낮은 전용 스레드에서 지문을 미리 계산해 두어
+    처음 바뀔 때도 비교할 수 있게 한다 (큰 파일은 표본 지문만).
+    """
+
+    def __init__(self, cache: HashCache, workers: int = HASH_WORKERS,
+                 sample_threshold: int = SAMPLE_THRESHOLD):
+        self.cache = cache
+        self.sample_threshold = sample_threshold
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix="watch-hash")
+        # 큰 파일 전체 해시 (한 스레드로 순서대로, 수정 반영을 막지 않음)
+        self.background = ThreadPoolExecutor(1, thread_name_prefix="watch-hash-full")
+        # 미리 계산 (수정 확인 작업과 따로, cancel_seed로 중단)
+        self.seeder = ThreadPoolExecutor(
+            1, thread_name_prefix="watch-hash-seed", initializer=_lower_priority
+        )
+        self._seed_cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.unchanged_count = 0
+        self.deferred = 0
+        self.late_changes = 0
+        self.seeded = 0
+        self.bytes_hashed = 0
+
+    def _fingerprint(self, candidate: Tuple[str, tuple, dict]):
+        """(경로, 이전 stat_key, 새 메타데이터) -> (경로, 이전 키, 새 키, 표본, 전체 해시)
+
+        읽는 동안 파일이 다시 바뀌었거나 메타데이터와 다르면 None (일반 수정으로 반영).
+        """
+        path, (old_size, old_mtime_ns, old_inode), metadata = candidate
+        try:
+            before = os.stat(path)
+            if (before.st_size, before.st_mtime_ns, before.st_ino) != (
+                metadata.get("size"), metadata.get("mtime_ns"), metadata.get("inode")
+            ):
+                return None
+            if before.st_size > self.sample_threshold:
+                sample, digest = sample_digest(path, before.st_size), None
+                read = min(before.st_size, SAMPLE_BLOCK_SIZE * SAMPLE_BLOCKS)
+            else:
+                digest = full_digest(path)
+                sample, read = digest, before.st_size
+            if stat_key_of(os.stat(path)) != stat_key_of(before):
+                return None
+        except OSError as e:
+            logger.debug(f"Skipping fingerprint for {path}: {e}")
+            return None
+        with self._lock:
+            self.bytes_hashed += read
+        old_key = (before.st_dev, old_inode, old_size, old_mtime_ns)
+        return path, old_key, stat_key_of(before), sample, digest
+
+    def unchanged(self, candidates: List[Tuple[str, tuple, dict]],
+                  on_changed: Callable[[str], None]) -> Set[str]:
+        """내용이 그대로인 경로 집합
+
+        candidates는 (경로, 이전 stat_key, 새 메타데이터) 목록이다. 표본만 비교한
+        큰 파일은 나중에 전체 해시가 이전과 다르면 on_changed(경로)를 호출한다.
+        """
+        if not candidates:
+            return set()
+        results = [result for result in self.pool.map(self._fingerprint, candidates) if result]
+        previous = self.cache.get_many(result[1] for result in results)
+
+        unchanged, entries, stale, deferred = set(), [], [], []
+        for path, old_key, new_key, sample, digest in results:
+            old_sample, old_digest = previous.get(old_key, (None, None))
+            if old_sample is not None:
+                stale.append(old_key)
+            if digest is not None:
+                # 작은 파일: 전체 해시로 바로 비교
+                if old_digest is not None and digest == old_digest:
+                    unchanged.add(path)
+                entries.append((new_key, sample, digest))
+            elif old_sample is not None and sample == old_sample:
+                # 큰 파일: 표본이 같으면 일단 그대로로 보고 전체 해시로 확인
+                # (미리 계산한 표본만 있으면 전체 해시는 다음 비교를 위해 저장만 함)
+                unchanged.add(path)
+                entries.append((new_key, sample, None))
+                if old_digest is not None:
+                    deferred.append((path, new_key, sample, old_digest, on_changed))
+                else:
+                    deferred.append((path, new_key, sample, None, None))
+            else:
+                entries.append((new_key, sample, None))
+                deferred.append((path, new_key, sample, None, None))
+        self.cache.store_many(entries, stale)
+
+        for args in deferred:
+            self.background.submit(self._complete, *args)
+        with self._lock:
+            self.checked += len(candidates)
+            self.unchanged_count += len(unchanged)
+            self.deferred += len(deferred)
+        return unchanged
+
+    def _complete(self, path: str, key: StatKey, sample: str, expected: Optional[str],
+                  on_changed: Optional[Callable[[str], None]]):
+        """큰 파일의 전체 해시를 계산해 캐시에 저장 (expected와 다르면 on_changed)"""
+        try:
+            if stat_key_of(os.stat(path)) != key:
+                return  # 그 사이 다시 바뀜 (새 수정 이벤트가 처리함)
+            digest = full_digest(path)
+            if stat_key_of(os.stat(path)) != key:
+                return
+            with self._lock:
+                self.bytes_hashed += key[2]
+            self.cache.store_many([(key, sample, digest)])
+            if expected is not None and digest != expected and on_changed is not None:
+                with self._lock:
+                    self.late_changes += 1
+                on_changed(path)
+        except Exception as e:
+            logger.error(f"Error hashing {path}: {e}")
+
+    def seed(self, paths: Iterable[str]):
+        """캐시에 없는 파일의 지문을 전용 스레드에서 계산해 저장
+
+        paths는 SEED_CHUNK_SIZE개씩 꺼내 쓰고 조각마다 작업을 다시 넣으므로, 트리
+        전체를 넘겨도 경로 목록을 만들지 않는다. sample_threshold보다 큰 파일은
+        표본 지문만 계산한다 (전체 해시는 처음 바뀔 때 계산).
+        """
+        if SEED_ENABLED and not self._seed_cancelled.is_set():
+            self.seeder.submit(self._seed, iter(paths))
+
+    def cancel_seed(self):
+        """진행 중인 미리 계산을 다음 조각부터 중단"""
+        self._seed_cancelled.set()
+
+    def _seed(self, paths: Iterator[str]):
+        if self._seed_cancelled.is_set():
+            return
+        chunk = list(islice(paths, SEED_CHUNK_SIZE))
+        if not chunk:
+            return
+        try:
+            keys = {}
+            for path in chunk:
+                try:
+                    stat_result = os.stat(path)
+                except OSError:
+                    continue
+                if stat.S_ISREG(stat_result.st_mode):
+                    keys[stat_key_of(stat_result)] = path
+            cached = self.cache.get_many(keys)
+            entries = []
+            for key, path in keys.items():
+                if key in cached:
+                    continue
+                try:
+                    if key[2] > self.sample_threshold:
+                        sample, digest = sample_digest(path, key[2]), None
+                        read = min(key[2], SAMPLE_BLOCK_SIZE * SAMPLE_BLOCKS)
+                    else:
+                        digest = full_digest(path)
+                        sample, read = digest, key[2]
+                    if stat_key_of(os.stat(path)) != key:
+                        continue  # 읽는 동안 바뀜 (수정 이벤트가 처리함)
+                except OSError:
+                    continue
+                entries.append((key, sample, digest))
+                with self._lock:
+                    self.bytes_hashed += read
+            self.cache.store_many(entries)
+            with self._lock:
+                self.seeded += len(entries)
+        except Exception as e:
+            logger.error(f"Error seeding hash cache: {e}")
+        try:
+            self.seeder.submit(self._seed, paths)
+        except RuntimeError:
+            pass  # 종료 중
+
+    def close(self):
+        self.cancel_seed()
+        self.seeder.shutdown(cancel_futures=True)
+        self.pool.shutdown()
+        self.background.shutdown(cancel_futures=True)
+        self.cache.close()
+
+    def metrics(self) -> dict:
+        return {
+            "checked": self.checked,
+            "unchanged": self.unchanged_count,
+            "deferred": self.deferred,
+            "late_changes": self.late_changes,
+            "seeded": self.seeded,
+            "bytes_hashed": self.bytes_hashed,
+        }
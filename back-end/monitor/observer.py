@@ -2,14 +2,30 @@ import os
 import time
 import logging
 import shutil
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from websocket.file_monitor_ws import file_monitor_manager
+from monitor.coalescer import CREATED, DELETED, MODIFIED, MOVED, EventCoalescer
+from monitor.fingerprint import (
+    FINGERPRINT_ENABLED,
+    HASH_CACHE_FILE,
+    ContentFingerprinter,
+    HashCache,
+)
+from indexer.scanner import FileSystemScanner, stat_key
+from indexer.filesystem import stat_metadata
 
 # target_folder_path = "volumes/monitored"
 target_folder_path = r"C:\Users\WEVEN_PC\Desktop\project\file-management\volumes\monitored"
 log_directory = "logs"
 log_file_path = os.path.join(log_directory, "watchdog.log")
+# writer가 변경 묶음의 메타데이터를 병렬로 읽는 스레드 수
+STAT_WORKERS = int(os.environ.get("WATCH_STAT_WORKERS", "8"))
+# 원래 경로를 번역하기 위해 기억하는 최근 디렉토리 이동 수
+RECENT_MOVES = 64
 
 
 # 로깅 설정
@@ -40,14 +56,39 @@ def exists_folder(folder_path):
 
 
 class FolderHandler(FileSystemEventHandler):
-    def __init__(self, target_folder_path, file_system):
+    """watchdog 이벤트를 EventCoalescer로 모아 경로별 순수 효과만 반영
+
+    observer 스레드는 이벤트를 대기 목록에 넣기만 하고, coalescer의 writer
+    스레드가 묶음 단위로 메타데이터를 병렬로 읽어 FileSystem에 반영한 뒤
+    FileIndexer에 한 번에 기록한다. 편집기의 임시 파일 저장(생성 -> 수정 -> 이름
+    변경)이나 연속 수정은 조용해진 뒤 이벤트 하나로 반영되고, 반영할 때 디스크의
+    현재 상태를 다시 읽으므로 중간에 무시되는 변경 없이 최종 상태가 맞춰진다.
+    대기 목록이 넘쳐 버린 이벤트는 해당 디렉토리를 다시 스캔해 맞춘다.
+    이름 변경/이동은 노드를 하위 트리째로 옮겨 uuid를 유지한다.
+    내용 지문(ContentFingerprinter)을 쓰면 내용이 그대로인 수정(touch, 같은 내용
+    저장)은 이벤트 없이 메타데이터만 갱신한다.
+    """
+
+    def __init__(self, target_folder_path, file_system, coalescer=None, fingerprinter=None):
         super().__init__()
         self.target_folder_path = target_folder_path
         self.file_system = file_system
-        self.last_modified = {}
-        self.cooldown = 1
-        self.recently_created = set()  # 최근 생성된 파일 추적
-        self.creation_cooldown = 2  # 생성 이벤트 후 수정 이벤트 무시 시간
+        self.coalescer = coalescer or EventCoalescer(
+            self.apply_changes, self.rescan, exists=self.in_tree
+        )
+        self.stat_pool = ThreadPoolExecutor(STAT_WORKERS, thread_name_prefix="watch-stat")
+        self.scanner = None
+        # 최근 디렉토리 이동 (원래 경로, 새 경로). 디렉토리를 옮긴 직후 그 안에서 생긴
+        # 이동 이벤트는 watchdog이 아직 이전 디렉토리 경로로 보고할 수 있음
+        self.recent_moves = deque(maxlen=RECENT_MOVES)
+        if fingerprinter is None and FINGERPRINT_ENABLED:
+            fingerprinter = ContentFingerprinter(
+                HashCache(os.path.join(log_directory, HASH_CACHE_FILE))
+            )
+        self.fingerprinter = fingerprinter
+        # 전체 해시로 내용이 바뀐 것이 확인되어 writer가 수정으로 반영할 경로
+        self.late_changes = set()
+        self._late_lock = threading.Lock()
 
     def get_file_metadata(self, file_path):
         try:
@@ -67,12 +108,17 @@ class FolderHandler(FileSystemEventHandler):
                 "extension": ext[1:] if ext else "없음",
                 "is_hidden": basename.startswith("."),
                 "path": file_path,
+                "mtime_ns": stat.st_mtime_ns,
+                "inode": stat.st_ino,
             }
+        except FileNotFoundError:
+            # 이벤트를 반영하기 전에 이미 지워진 경로
+            return None
         except Exception as e:
             logger.error(f"Error getting file metadata: {e}")
             return None
 
-    def notify_clients(self, event_type: str, file_path: str):
+    def notify_clients(self, event_type: str, file_path: str, metadata=None):
         if event_type == "deleted":
             # 삭제 이벤트의 경우 기본 정보만 전송
             message = {
@@ -83,7 +129,7 @@ class FolderHandler(FileSystemEventHandler):
             file_monitor_manager.sync_notify(message)
         else:
             # 다른 이벤트의 경우 기존 로직 유지
-            metadata = self.get_file_metadata(file_path)
+            metadata = metadata or self.get_file_metadata(file_path)
             if metadata:
                 message = {
                     "type": event_type,
@@ -92,72 +138,201 @@ class FolderHandler(FileSystemEventHandler):
                 }
                 file_monitor_manager.sync_notify(message)
 
-    def on_created(self, event):
-        abs_path = os.path.abspath(event.src_path)
-        logger.info(
-            f"{'Directory' if event.is_directory else 'File'} created: {abs_path}"
-        )
+    def in_tree(self, path: str) -> bool:
+        """경로가 메모리 트리에 있는지 (observer 스레드에서 잠금 없이 조회)"""
+        return self.file_system.get_node_by_path(path) is not None
+
+    def apply_changes(self, changes):
+        """writer 스레드: 변경 묶음의 메타데이터를 병렬로 읽은 뒤 한 번에 반영"""
+        paths = [change.path for change in changes if change.kind != DELETED]
+        if len(paths) > 1:
+            metadata = dict(zip(paths, self.stat_pool.map(self.get_file_metadata, paths)))
+        else:
+            metadata = {path: self.get_file_metadata(path) for path in paths}
+        late = set()
+        if self.late_changes:
+            with self._late_lock:
+                late = {change.path for change in changes if change.path in self.late_changes}
+                self.late_changes -= late
+        unchanged = self.unchanged_content(changes, metadata, late)
+
+        with self.file_system.batch():
+            for change in changes:
+                try:
+                    self.apply_change(
+                        change.path, change.kind, change.is_directory,
+                        metadata.get(change.path), change.src_path,
+                        change.path in unchanged, change.path in late,
+                    )
+                except Exception as e:
+                    logger.error(f"Error applying {change.kind} for {change.path}: {e}")
+
+        if self.fingerprinter is not None:
+            # 새 파일의 지문을 미리 계산해 첫 touch/같은 내용 저장도 걸러냄
+            created = [
+                change.path for change in changes
+                if change.kind == CREATED and not change.is_directory and metadata.get(change.path)
+            ]
+            if created:
+                self.fingerprinter.seed(created)
+
+    def seed_hash_cache(self):
+        """트리에 있는 파일의 지문을 백그라운드에서 미리 계산 (시작할 때 한 번)"""
+        if self.fingerprinter is not None and self.file_system.root is not None:
+            self.fingerprinter.seed(self.iter_file_paths())
+
+    def iter_file_paths(self):
+        """트리의 파일 경로를 깊이 우선으로 하나씩 (잠금 없이 읽음)"""
+        stack = [self.file_system.root]
+        while stack:
+            node = stack.pop()
+            if node.is_directory:
+                stack.extend(node.children)
+            else:
+                yield node.path
+
+    def unchanged_content(self, changes, metadata, late=()) -> set:
+        """크기/mtime은 바뀌었지만 내용 지문이 같은 기존 파일 경로 (late는 제외)"""
+        if self.fingerprinter is None:
+            return set()
+        candidates = []
+        for change in changes:
+            file_metadata = metadata.get(change.path)
+            if change.kind in (DELETED, MOVED) or change.src_path or not file_metadata:
+                continue
+            if change.path in late:
+                continue
+            node = self.file_system.get_node_by_path(change.path)
+            if node is None or node.is_directory or node.stat_key() == stat_key(file_metadata):
+                continue
+            candidates.append((change.path, node.stat_key(), file_metadata))
+        try:
+            return self.fingerprinter.unchanged(candidates, self.apply_late_change)
+        except Exception as e:
+            logger.error(f"Error fingerprinting {len(candidates)} files: {e}")
+            return set()
 
-        # 이미 존재하는 경로인지 확인
-        existing_node = self.file_system.get_node_by_path(abs_path)
-        if existing_node:
-            logger.info(f"Node already exists for path: {abs_path}")
+    def apply_late_change(self, path: str):
+        """표본 블록으로는 같았던 큰 파일이 전체 해시로는 달랐을 때 (해시 스레드)
+
+        트리는 writer 스레드만 바꾸므로 직접 반영하지 않고, 경로를 기록한 뒤
+        coalescer에 수정 이벤트로 넘겨 writer가 수정으로 반영하게 한다.
+        """
+        with self._late_lock:
+            self.late_changes.add(path)
+        self.coalescer.add(path, MODIFIED, False)
+
+    def apply_change(self, path: str, kind: str, is_directory: bool, metadata=None,
+                     src_path=None, content_unchanged=False, content_changed=False):
+        """합쳐진 변경을 파일 시스템에 반영 (디스크의 현재 상태 기준)
+
+        content_unchanged는 내용 지문이 같았던 경우, content_changed는 stat이
+        그대로여도 내용이 바뀐 것이 확인된 경우(apply_late_change)다.
+        """
+        if kind != DELETED and metadata is None:
+            metadata = self.get_file_metadata(path)
+        if src_path and not os.path.lexists(src_path):
+            if kind == MOVED and metadata:
+                self.apply_move(src_path, path, metadata)
+                return
+            # 옮긴 뒤 삭제/교체된 경우 원래 경로에 남은 노드 정리
+            if self.file_system.get_node_by_path(src_path) is not None:
+                self.file_system.remove_node(src_path)
+                self.notify_clients("deleted", src_path)
+
+        node = self.file_system.get_node_by_path(path)
+        if kind == DELETED or (metadata is None and not os.path.lexists(path)):
+            if node is not None:
+                logger.info(f"{'Directory' if node.is_directory else 'File'} deleted: {path}")
+                self.file_system.remove_node(path)
+                self.notify_clients("deleted", path)
             return
 
-        # 파일 시스템에 노드 추가
-        metadata = self.get_file_metadata(abs_path)
-        if metadata:
+        if not metadata:
+            logger.error(f"Failed to get metadata for: {path}")
+            return
+        if node is None:
+            logger.info(f"{'Directory' if is_directory else 'File'} created: {path}")
+            self.file_system.create_node(path, is_directory=is_directory, metadata=metadata)
+            self.notify_clients("created", path, metadata)
+        elif not node.is_directory and not content_changed and (
+            content_unchanged or node.stat_key() == stat_key(metadata)
+        ):
+            # touch, 권한 변경, 같은 내용으로 다시 저장: 이벤트 없이 stat 필드만 갱신
+            # (설명, 권한, 소유자 등 watcher가 모르는 메타데이터는 유지)
+            self.file_system.merge_metadata(node, stat_metadata(metadata))
+        else:
+            logger.info(f"{'Directory' if node.is_directory else 'File'} modified: {path}")
+            self.file_system.update_node(path, metadata)
+            self.notify_clients("modified", path, metadata)
+
+    def apply_move(self, src_path: str, path: str, metadata: dict):
+        """이동을 노드 재배치로 반영 (하위 항목은 경로가 함께 바뀜)"""
+        node = self.file_system.get_node_by_path(path)
+        if node is not None and self.file_system.get_node_by_path(src_path) is None:
+            # 상위 디렉토리와 함께 이미 옮겨진 항목 (watchdog의 하위 항목 이동 이벤트)
+            if node.stat_key() != stat_key(metadata):
+                self.file_system.update_node(path, metadata)
+                self.notify_clients("modified", path, metadata)
+            return
+        if self.file_system.get_node_by_path(src_path) is None:
+            for old_directory, new_directory in reversed(self.recent_moves):
+                if src_path.startswith(old_directory + os.sep):
+                    src_path = new_directory + src_path[len(old_directory):]
+                    break
+        moved = self.file_system.move_node(src_path, path, metadata)
+        if moved is None:
+            # 원래 경로를 모르면 새로 생긴 것으로 반영 (디렉토리는 내용까지 스캔)
+            logger.info(f"Moved from unknown path, creating: {path}")
             node = self.file_system.create_node(
-                abs_path, is_directory=event.is_directory
+                path, is_directory=os.path.isdir(path), metadata=metadata
             )
-            node.metadata = metadata
-            self.recently_created.add(abs_path)
-            self.last_modified[abs_path] = time.time()
-            # 클라이언트에 생성 이벤트 알림
-            self.notify_clients("created", abs_path)
-        else:
-            logger.error(f"Failed to get metadata for: {abs_path}")
+            if node.is_directory:
+                self.rescan(path, reason="Directory moved from an unknown path")
+            self.notify_clients("created", path, metadata)
+            return
+        if moved.is_directory:
+            self.recent_moves.append((src_path, path))
+        logger.info(f"Moved: {src_path} -> {path}")
+        self.notify_clients("moved", path, {**metadata, "src_path": src_path})
+
+    def rescan(self, directory: str, reason: str = "Event queue overflowed"):
+        """이벤트를 잃은 디렉토리를 다시 스캔 (트리에 있는 가장 가까운 상위 디렉토리부터)"""
+        node = None
+        while node is None and directory:
+            node = self.file_system.get_node_by_path(directory)
+            if node is not None and not node.is_directory:
+                node = None
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                break
+            directory = parent
+        if node is None:
+            node = self.file_system.root
+        if node is None:
+            return
+        if self.scanner is None:
+            self.scanner = FileSystemScanner(self.target_folder_path, self.file_system)
+        logger.warning(f"{reason}, rescanning: {node.path}")
+        # 제자리 수정도 놓쳤을 수 있으므로 디렉토리 mtime을 믿지 않고 전체 확인
+        self.scanner.refresh(node.path, trust_dir_mtime=False)
+
+    def on_created(self, event):
+        self.coalescer.add(os.path.abspath(event.src_path), CREATED, event.is_directory)
 
     def on_modified(self, event):
+        # 디렉토리 수정 이벤트는 하위 항목 변경에 따른 것이므로 무시
         if not event.is_directory:
-            current_time = time.time()
-            abs_path = os.path.abspath(event.src_path)
-
-            # 최근 생성된 파일의 수정 이벤트인 경우 무시
-            if abs_path in self.recently_created:
-                last_created_time = self.last_modified.get(abs_path, 0)
-                if current_time - last_created_time < self.creation_cooldown:
-                    return
-                self.recently_created.remove(abs_path)
-
-            last_modified = self.last_modified.get(abs_path, 0)
-            if current_time - last_modified > self.cooldown:
-                logger.info(f"File modified: {abs_path}")
-
-                if not os.path.exists(abs_path):
-                    logger.warning(f"Modified file does not exist: {abs_path}")
-                    return
-
-                metadata = self.get_file_metadata(abs_path)
-                if metadata:
-                    self.file_system.update_node(abs_path, metadata)
-                    self.last_modified[abs_path] = current_time
-                    self.notify_clients("modified", abs_path)
+            self.coalescer.add(os.path.abspath(event.src_path), MODIFIED, False)
 
     def on_deleted(self, event):
-        if not event.is_directory:
-            logger.info(f"File deleted: {event.src_path}")
+        self.coalescer.add(os.path.abspath(event.src_path), DELETED, event.is_directory)
 
-            # recently_created 세트에서 제거
-            if event.src_path in self.recently_created:
-                self.recently_created.remove(event.src_path)
-            # last_modified 딕셔너리에서 제거
-            if event.src_path in self.last_modified:
-                del self.last_modified[event.src_path]
-
-            # 파일 시스템에서 노드 제거
-            self.file_system.remove_node(event.src_path)
-            self.notify_clients("deleted", event.src_path)
+    def on_moved(self, event):
+        # 임시 파일 -> 대상 파일 저장처럼 반영 전의 새 항목이면 대상 경로의 생성으로 합침
+        self.coalescer.move(
+            os.path.abspath(event.src_path), os.path.abspath(event.dest_path), event.is_directory
+        )
 
     def copy_file(self, src_path: str, dest_path: str):
         try:
@@ -175,6 +350,7 @@ class WatchdogThread:
         self.observer = Observer()
         self.target_folder_path = target_folder_path
         self.file_system = file_system
+        self.event_handler = None
         self.is_running = False
 
     def start(self):
@@ -183,9 +359,11 @@ class WatchdogThread:
                 logger.error(f"Failed to start monitoring: {self.target_folder_path}")
                 return
 
-            event_handler = FolderHandler(self.target_folder_path, self.file_system)
+            self.event_handler = FolderHandler(self.target_folder_path, self.file_system)
+            self.event_handler.coalescer.start()
+            self.event_handler.seed_hash_cache()
             self.observer.schedule(
-                event_handler, self.target_folder_path, recursive=True
+                self.event_handler, self.target_folder_path, recursive=True
             )
             self.observer.start()
             self.is_running = True
@@ -197,6 +375,11 @@ class WatchdogThread:
             if self.observer and self.is_running:
                 self.observer.stop()
                 self.observer.join()
+                # 아직 반영되지 않은 변경까지 반영
+                self.event_handler.coalescer.stop()
+                self.event_handler.stat_pool.shutdown()
+                if self.event_handler.fingerprinter is not None:
+                    self.event_handler.fingerprinter.close()
                 self.is_running = False
                 logger.info("Monitoring stopped")
         except Exception as e:
@@ -1,11 +1,24 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import Dict, List, Optional
-from indexer.filesystem import FileSystem
+import os
+import json
+import base64
+import hashlib
+from datetime import datetime
+from itertools import islice
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Dict, Iterable, Iterator, List, Optional
+from indexer.filesystem import FileSystem, parse_time
 from indexer.scanner import FileSystemScanner
 from monitor.observer import target_folder_path
 
 router = APIRouter()
 
+# 트리 API에서 디렉토리 하나당 돌려주는 기본 자식 수와 응답 하나의 최대 노드 수
+TREE_PAGE_SIZE = int(os.environ.get("TREE_PAGE_SIZE", "200"))
+TREE_MAX_NODES = int(os.environ.get("TREE_MAX_NODES", "5000"))
+# 스트리밍 응답에서 한 번에 보내는 조각의 목표 크기 (문자 수)
+STREAM_CHUNK_SIZE = 64 * 1024
+
 
 file_system: Optional[FileSystem] = None
 
@@ -25,63 +38,300 @@ def get_filesystem() -> FileSystem:
     return file_system
 
 
-@router.get("/filesystem/tree")
-async def get_filesystem_tree():
-    """전체 파일 시스템 트리 구조 반환"""
+def node_summary(node) -> dict:
+    """트리 응답의 노드 항목 (자식 목록 없이 자식 수만)"""
+    return {
+        "uuid": node.uuid,
+        "name": node.name,
+        "path": node.path,
+        "is_directory": node.is_directory,
+        "metadata": node.metadata,
+        "child_count": len(node.children),
+    }
+
+
+def expand_children(item: dict, node, limit: int, cursor: Optional[str] = None) -> List:
+    """item에 node의 자식 한 페이지(이름순)와 next_cursor를 채우고 자식 노드 목록 반환"""
+    page = node.children.after(cursor, limit + 1)
+    has_more = len(page) > limit
+    page = page[:limit]
+    item["children"] = [node_summary(child) for child in page]
+    item["next_cursor"] = page[-1].name if has_more and page else None
+    return page
+
+
+def chunked(parts: Iterable[str], size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """작은 문자열 조각들을 size 정도 크기의 바이트 덩어리로 묶음"""
+    buffer, length = [], 0
+    for part in parts:
+        buffer.append(part)
+        length += len(part)
+        if length >= size:
+            yield "".join(buffer).encode("utf-8")
+            buffer, length = [], 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def resolve_node(uuid: Optional[str], path: Optional[str]):
+    """uuid나 절대 경로로 지정한 노드 (둘 다 없으면 루트)"""
     if not file_system:
         raise HTTPException(status_code=404, detail="File system not initialized")
     if not file_system.root:
-        print(f"Debug - Root node is missing. Total nodes: {len(file_system.nodes)}")
-        print(
-            f"Debug - Available nodes: {[node.name for node in file_system.nodes.values()]}"
-        )
         raise HTTPException(
             status_code=500, detail="File system root is not initialized"
         )
+    if uuid:
+        node = file_system.nodes.get(uuid)
+    elif path:
+        node = file_system.get_node_by_path(os.path.abspath(path))
+    else:
+        node = file_system.root
+    if not node:
+        raise HTTPException(status_code=404, detail="Node not found")
+    return node
+
+
+def tree_etag(node, *params) -> str:
+    """시작 노드의 경로, 하위 트리 버전과 조회 조건으로 만든 ETag
+
+    상위 디렉토리가 옮겨지면 하위 노드의 버전은 그대로이고 경로만 바뀌므로 경로도
+    넣는다. 조건에는 파일 이름(cursor)이 들어가므로 헤더에 쓸 수 없는 문자가 없도록
+    해시한다.
+    """
+    key = json.dumps(
+        [file_system.tree_epoch, node.uuid, node.path, node.version, *params],
+        ensure_ascii=False,
+    )
+    return '"' + hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """If-None-Match 헤더(쉼표로 구분한 목록, W/ 약한 비교 허용)가 etag와 맞는지"""
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == "*" or candidate == etag:
+            return True
+    return False
+
+
+@router.get("/filesystem/tree")
+async def get_filesystem_tree(
+    request: Request,
+    uuid: Optional[str] = None,
+    path: Optional[str] = None,
+    depth: int = 1,
+    limit: int = TREE_PAGE_SIZE,
+    cursor: Optional[str] = None,
+):
+    """파일 시스템 트리의 일부 반환 (시작 노드에서 depth 단계, 디렉토리마다 limit개씩)
+
+    시작 노드는 uuid나 절대 경로로 지정하며 없으면 루트다. 펼친 디렉토리에는
+    "children"(이름순 한 페이지)과 "next_cursor"가, 모든 노드에는 "child_count"가
+    들어 있다. "children"이 없는 디렉토리는 같은 API에 uuid를 넘겨 펼치고, 다음
+    페이지는 next_cursor를 cursor로 넘겨 받는다 (cursor는 시작 노드의 자식에만 적용).
+    응답 전체 노드 수가 TREE_MAX_NODES를 넘으면 더 깊은 디렉토리는 펼치지 않는다.
+    시작 노드 아래가 바뀌지 않았으면 직렬화된 응답을 재사용하고, If-None-Match가
+    ETag와 같으면 304를 돌려준다.
+    """
+    if depth < 0:
+        raise HTTPException(status_code=400, detail="depth must be 0 or greater")
+    if not 1 <= limit <= 1000:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 1000")
+
+    node = resolve_node(uuid, path)
+    etag = tree_etag(node, depth, limit, cursor or "")
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    body = file_system.tree_cache.response(
+        (node.uuid, node.path, depth, limit, cursor),
+        node.version,
+        lambda: json.dumps(build_tree_page(node, depth, limit, cursor), ensure_ascii=False),
+    )
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+@router.get("/filesystem/tree/stream")
+async def stream_filesystem_tree(
+    uuid: Optional[str] = None,
+    path: Optional[str] = None,
+    format: str = "json",
+):
+    """시작 노드 아래 전체 트리를 스트리밍 (깊이/개수 제한 없음)
+
+    format=json은 예전 전체 트리와 같은 중첩 children 형식으로, 디렉토리별 직렬화
+    캐시의 조각을 그대로 흘려보낸다. format=ndjson은 노드마다 한 줄
+    ({..., "child_count", "parent": 부모 uuid})을 깊이 우선 순서로 보낸다.
+    어느 쪽이든 요청마다 쓰는 메모리는 조각 크기와 트리 깊이 정도다.
+    """
+    if format not in ("json", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be json or ndjson")
+    node = resolve_node(uuid, path)
+    if format == "ndjson":
+        return StreamingResponse(chunked(tree_lines(node)), media_type="application/x-ndjson")
+    return StreamingResponse(
+        chunked(file_system.tree_cache.iter_subtree(node)), media_type="application/json"
+    )
+
+
+def tree_lines(node) -> Iterator[str]:
+    """node와 하위 노드를 깊이 우선으로 한 줄씩 (자식 목록을 복사하지 않고 O(깊이) 메모리)"""
+    stack = [(iter((node,)), node.parent.uuid if node.parent else None)]
+    while stack:
+        children, parent_uuid = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            continue
+        yield json.dumps({**node_summary(child), "parent": parent_uuid}, ensure_ascii=False) + "\n"
+        if child.is_directory and child.children:
+            stack.append((iter(child.children), child.uuid))
+
+
+def build_tree_page(node, depth: int, limit: int, cursor: Optional[str]) -> dict:
+    tree = node_summary(node)
+    if depth == 0 or not node.is_directory:
+        return tree
 
-    def node_to_dict(node):
-        result = {
+    # 너비 우선으로 펼쳐 응답 크기 제한에 걸리면 얕은 단계가 먼저 채워지게 함
+    budget = TREE_MAX_NODES
+    level = [(tree, node)]
+    for current in range(depth):
+        below = []
+        for item, directory in level:
+            if budget <= 0:
+                break
+            page = expand_children(
+                item, directory, min(limit, budget), cursor if current == 0 else None
+            )
+            budget -= len(page)
+            if current + 1 < depth:
+                below.extend(
+                    (child_item, child)
+                    for child_item, child in zip(item["children"], page)
+                    if child.is_directory and child.children
+                )
+        level = below
+        if not level:
+            break
+    return tree
+
+
+@router.get("/filesystem/search")
+async def search_filesystem(query: str, limit: int = 100):
+    """파일 시스템 검색 (이름 trigram 색인, 정확히 일치 > 접두사 > 부분 일치 순)"""
+    if not file_system:
+        raise HTTPException(status_code=404, detail="File system not initialized")
+
+    return [
+        {
             "uuid": node.uuid,
             "name": node.name,
             "path": node.path,
             "is_directory": node.is_directory,
             "metadata": node.metadata,
-            "children": [
-                node_to_dict(child)
-                for child in sorted(node.children, key=lambda x: x.name)
-            ],
         }
-        print(
-            f"Debug - Processing node: {node.name} with {len(node.children)} children"
-        )  # 디버깅 로그
-        return result
+        for node in file_system.search_nodes(query, limit)
+    ]
 
-    tree = node_to_dict(file_system.root)
-    print(
-        f"Debug - Final tree root has {len(tree['children'])} children"
-    )  # 디버깅 로그
-    return tree
 
+def parse_time_param(value: Optional[str]) -> Optional[float]:
+    """epoch 초 또는 "%Y-%m-%d %H:%M:%S" 형식 시각"""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        timestamp = parse_time(value)
+        if timestamp is None:
+            raise HTTPException(status_code=400, detail=f"Invalid time: {value}")
+        return timestamp
 
-@router.get("/filesystem/search")
-async def search_filesystem(query: str):
-    """파일 시스템 검색"""
+
+def encode_cursor(key: Optional[list]) -> Optional[str]:
+    if key is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+# 정렬 필드별 커서 값으로 허용하는 타입
+CURSOR_VALUE_TYPES = {"size": (int,), "modified": (int, float)}
+
+
+def decode_cursor(cursor: Optional[str], sort: str) -> Optional[list]:
+    """next_cursor 복원. [정렬 값, uuid] 형태가 아니면 400"""
+    if not cursor:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if (
+        not isinstance(key, list)
+        or len(key) != 2
+        or isinstance(key[0], bool)
+        or not isinstance(key[0], CURSOR_VALUE_TYPES[sort])
+        or not isinstance(key[1], str)
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key
+
+
+@router.get("/filesystem/query")
+async def query_filesystem(
+    size_min: Optional[int] = None,
+    size_max: Optional[int] = None,
+    modified_after: Optional[str] = None,
+    modified_before: Optional[str] = None,
+    extension: Optional[str] = None,
+    is_directory: Optional[bool] = None,
+    sort: str = "modified",
+    order: str = "desc",
+    limit: int = 100,
+    cursor: Optional[str] = None,
+):
+    """메타데이터 조건 조회 (크기/수정 시각 범위, 확장자 목록; 정렬 + 커서 페이지)
+
+    extension은 쉼표로 구분 (예: "psd,jpg"). 다음 페이지는 응답의 next_cursor를
+    같은 조건과 함께 cursor로 넘긴다.
+    """
     if not file_system:
         raise HTTPException(status_code=404, detail="File system not initialized")
+    if sort not in ("size", "modified") or order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="Invalid sort or order")
+    if not 1 <= limit <= 1000:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 1000")
 
-    results = []
-    for uuid, node in file_system.nodes.items():
-        if query.lower() in node.name.lower():
-            results.append(
-                {
-                    "uuid": node.uuid,
-                    "name": node.name,
-                    "path": node.path,
-                    "is_directory": node.is_directory,
-                    "metadata": node.metadata,
-                }
-            )
-    return results
+    result = file_system.query_nodes(
+        size_min=size_min,
+        size_max=size_max,
+        modified_after=parse_time_param(modified_after),
+        modified_before=parse_time_param(modified_before),
+        extensions=[item for item in (extension or "").split(",") if item.strip()],
+        is_directory=is_directory,
+        sort=sort,
+        descending=order == "desc",
+        limit=limit,
+        cursor=decode_cursor(cursor, sort),
+    )
+    return {
+        "results": [
+            {
+                "uuid": node.uuid,
+                "name": node.name,
+                "path": node.path,
+                "is_directory": node.is_directory,
+                "metadata": node.metadata,
+            }
+            for node in result["nodes"]
+        ],
+        "next_cursor": encode_cursor(result["next_cursor"]),
+        "plan": result["plan"],
+    }
 
 
 @router.get("/filesystem/node/{node_uuid}")
@@ -107,16 +357,22 @@ async def get_node_details(node_uuid: str):
 
 
 @router.post("/filesystem/refresh")
-async def refresh_filesystem():
-    """파일 시스템 상태 새로고침"""
+async def refresh_filesystem(path: Optional[str] = None, deep: bool = False):
+    """파일 시스템 상태 새로고침 (변경분만 반영, deep이면 mtime을 믿지 않고 전체 검증)"""
     if not file_system:
         raise HTTPException(status_code=404, detail="File system not initialized")
 
-    # 파일 시스템 스캐너 재실행
     scanner = FileSystemScanner(target_folder_path, file_system)
-    scanner.scan()
+    if not file_system.root:
+        report = scanner.scan()
+    else:
+        report = scanner.refresh(path=path, trust_dir_mtime=not deep)
 
-    return {"status": "success", "message": "File system refreshed"}
+    return {
+        "status": "success",
+        "message": "File system refreshed",
+        "report": report.to_dict(),
+    }
 
 
 @router.post("/filesystem/node/{node_uuid}/description")
@@ -148,19 +404,54 @@ async def get_filesystem_history(
     file_path: Optional[str] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    event_type: Optional[str] = None
+    event_type: Optional[str] = None,
+    after_seq: Optional[int] = None,
+    limit: Optional[int] = None,
+    format: str = "json",
 ):
-    """파일 시스템 변경 이력 조회"""
+    """파일 시스템 변경 이력 조회 (seq 순서로 스트리밍)
+
+    format=json은 {"history": [...], "last_seq": N}, format=ndjson은 이벤트를 한 줄에
+    하나씩 보낸다. 끊기거나 limit으로 잘린 뒤에는 마지막으로 받은 seq를
+    after_seq로 넘겨 이어 받는다.
+    """
     if not file_system:
         raise HTTPException(status_code=404, detail="File system not initialized")
-    
-    history = file_system.file_indexer.get_file_history(
+    if format not in ("json", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be json or ndjson")
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be 1 or greater")
+    for value in (start_date, end_date):
+        # 스트리밍이 시작된 뒤에는 오류 응답을 보낼 수 없으므로 미리 확인
+        if value:
+            try:
+                datetime.fromisoformat(value)
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"Invalid date: {value}")
+
+    events = file_system.file_indexer.iter_file_history(
         file_path=file_path,
         start_date=start_date,
         end_date=end_date,
-        event_type=event_type
+        event_type=event_type,
+        after_seq=after_seq,
     )
-    return {"history": history}
+    if limit is not None:
+        events = islice(events, limit)
+    if format == "ndjson":
+        lines = (json.dumps(event, ensure_ascii=False) + "\n" for event in events)
+        return StreamingResponse(chunked(lines), media_type="application/x-ndjson")
+    return StreamingResponse(chunked(history_json(events)), media_type="application/json")
+
+
+def history_json(events: Iterable[dict]) -> Iterator[str]:
+    yield '{"history":['
+    last_seq = None
+    for index, event in enumerate(events):
+        yield ("," if index else "") + json.dumps(event, ensure_ascii=False)
+        last_seq = event.get("seq")
+    yield f'],"last_seq":{json.dumps(last_seq)}}}'
+
 
 @router.get("/filesystem/stats")
 async def get_filesystem_stats():
@@ -169,3 +460,12 @@ async def get_filesystem_stats():
         raise HTTPException(status_code=404, detail="File system not initialized")
     
     return file_system.file_indexer.get_statistics()
+
+
+@router.get("/filesystem/stats/detail")
+async def get_filesystem_stats_detail():
+    """파일 시스템 확장 통계 정보 (확장자/최상위 디렉토리별 개수, 전체 크기)"""
+    if not file_system:
+        raise HTTPException(status_code=404, detail="File system not initialized")
+
+    return file_system.file_indexer.get_detailed_statistics()
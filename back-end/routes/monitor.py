@@ -12,6 +12,15 @@ def initialize_router(manager: FileSystemManager):
     filesystem_manager = manager
 
 
+@router.get("/metrics")
+async def websocket_metrics():
+    """WebSocket 클라이언트별 송신 큐 길이와 지연 지표"""
+    return {
+        "monitor": file_monitor_manager.metrics(),
+        "filesystem": filesystem_manager.metrics() if filesystem_manager else None,
+    }
+
+
 @router.websocket("/monitor")
 async def file_monitor_endpoint(websocket: WebSocket):
     await file_monitor_manager.connect(websocket)
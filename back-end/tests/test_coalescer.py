@@ -0,0 +1,134 @@
+import unittest
+
+from monitor.coalescer import CREATED, DELETED, MERGE, MODIFIED, MOVED, EventCoalescer
+
+
+def make_coalescer(tree=()):
+    """writer 스레드 없이 flush()로 반영하는 coalescer와 반영된 변경 목록"""
+    applied = []
+    coalescer = EventCoalescer(
+        applied.extend, exists=lambda path: path in tree, quiet=60, max_delay=60
+    )
+    return coalescer, applied
+
+
+def effects(applied):
+    return sorted((change.path, change.kind, change.src_path) for change in applied)
+
+
+class MergeTransitionTest(unittest.TestCase):
+    def test_created_then_modified_is_created(self):
+        coalescer, applied = make_coalescer()
+        coalescer.add("/r/a", CREATED)
+        coalescer.add("/r/a", MODIFIED)
+        coalescer.flush()
+        self.assertEqual(effects(applied), [("/r/a", CREATED, None)])
+
+    def test_created_then_deleted_cancels_for_new_path(self):
+        coalescer, applied = make_coalescer()
+        coalescer.add("/r/a.tmp", CREATED)
+        coalescer.add("/r/a.tmp", DELETED)
+        coalescer.flush()
+        self.assertEqual(applied, [])
+        self.assertEqual(len(coalescer), 0)
+
+    def test_created_then_deleted_keeps_delete_for_path_in_tree(self):
+        coalescer, applied = make_coalescer(tree={"/r/a"})
+        coalescer.add("/r/a", CREATED)
+        coalescer.add("/r/a", DELETED)
+        coalescer.flush()
+        self.assertEqual(effects(applied), [("/r/a", DELETED, None)])
+
+    def test_modified_then_created_is_modified(self):
+        coalescer, applied = make_coalescer(tree={"/r/a"})
+        coalescer.add("/r/a", MODIFIED)
+        coalescer.add("/r/a", CREATED)
+        coalescer.flush()
+        self.assertEqual(effects(applied), [("/r/a", MODIFIED, None)])
+
+    def test_modified_then_deleted_is_deleted(self):
+        coalescer, applied = make_coalescer(tree={"/r/a"})
+        coalescer.add("/r/a", MODIFIED)
+        coalescer.add("/r/a", DELETED)
+        coalescer.flush()
+        self.assertEqual(effects(applied), [("/r/a", DELETED, None)])
+
+    def test_deleted_then_created_is_modified(self):
+        coalescer, applied = make_coalescer(tree={"/r/a"})
+        coalescer.add("/r/a", DELETED)
+        coalescer.add("/r/a", CREATED)
+        coalescer.flush()
+        self.assertEqual(effects(applied), [("/r/a", MODIFIED, None)])
+
+    def test_deleted_then_modified_is_modified(self):
+        coalescer, applied = make_coalescer(tree={"/r/a"})
+        coalescer.add("/r/a", DELETED)
+        coalescer.add("/r/a", MODIFIED)
+        coalescer.flush()
+        self.assertEqual(effects(applied), [("/r/a", MODIFIED, None)])
+
+    def test_moved_then_created_or_modified_stays_moved(self):
+        for kind in (CREATED, MODIFIED):
+            with self.subTest(kind=kind):
+                coalescer, applied = make_coalescer(tree={"/r/a"})
+                coalescer.move("/r/a", "/r/b")
+                coalescer.add("/r/b", kind)
+                coalescer.flush()
+                self.assertEqual(effects(applied), [("/r/b", MOVED, "/r/a")])
+
+    def test_moved_then_deleted_is_deleted(self):
+        coalescer, applied = make_coalescer(tree={"/r/a"})
+        coalescer.move("/r/a", "/r/b")
+        coalescer.add("/r/b", DELETED)
+        coalescer.flush()
+        self.assertEqual(effects(applied), [("/r/b", DELETED, "/r/a")])
+
+    def test_unlisted_pairs_take_the_new_kind(self):
+        for kind in (CREATED, MODIFIED, DELETED):
+            for previous in (CREATED, MODIFIED, DELETED):
+                if (previous, kind) in MERGE:
+                    continue
+                with self.subTest(previous=previous, kind=kind):
+                    coalescer, applied = make_coalescer(tree={"/r/a"})
+                    coalescer.add("/r/a", previous)
+                    coalescer.add("/r/a", kind)
+                    coalescer.flush()
+                    self.assertEqual(effects(applied), [("/r/a", kind, None)])
+
+
+class MoveTest(unittest.TestCase):
+    def test_moving_pending_new_file_is_created_at_destination(self):
+        coalescer, applied = make_coalescer()
+        coalescer.add("/r/a.tmp", CREATED)
+        coalescer.move("/r/a.tmp", "/r/a")
+        coalescer.flush()
+        self.assertEqual(effects(applied), [("/r/a", CREATED, None)])
+
+    def test_moving_recreated_path_in_tree_deletes_source(self):
+        coalescer, applied = make_coalescer(tree={"/r/a.tmp"})
+        coalescer.add("/r/a.tmp", CREATED)
+        coalescer.move("/r/a.tmp", "/r/a")
+        coalescer.flush()
+        self.assertEqual(
+            effects(applied), [("/r/a", CREATED, None), ("/r/a.tmp", DELETED, None)]
+        )
+
+    def test_chained_moves_start_from_first_source(self):
+        coalescer, applied = make_coalescer(tree={"/r/a"})
+        coalescer.move("/r/a", "/r/b")
+        coalescer.move("/r/b", "/r/c")
+        coalescer.flush()
+        self.assertEqual(effects(applied), [("/r/c", MOVED, "/r/a")])
+
+    def test_move_onto_pending_move_deletes_replaced_source(self):
+        coalescer, applied = make_coalescer(tree={"/r/a", "/r/b"})
+        coalescer.move("/r/a", "/r/c")
+        coalescer.move("/r/b", "/r/c")
+        coalescer.flush()
+        self.assertEqual(
+            effects(applied), [("/r/a", DELETED, None), ("/r/c", MOVED, "/r/b")]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import tempfile
+import unittest
+
+from indexer.file_indexer import FileIndexer
+from indexer.filesystem import FileSystem
+
+
+class BulkCreateTest(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.indexer = FileIndexer(self.temp.name, fsync=False)
+        self.file_system = FileSystem(self.indexer)
+        self.file_system.root_path = "/r"
+        self.file_system.create_node("/r", is_directory=True)
+        self.file_system.create_node("/r/f.txt", metadata={"size": 1})
+
+    def tearDown(self):
+        self.indexer.close()
+        self.temp.cleanup()
+
+    def test_skips_entries_whose_parent_is_a_file(self):
+        created = self.file_system.bulk_create([
+            ("/r/f.txt/x", False, {"size": 2}),
+            ("/r/f.txt/d/y", False, {"size": 3}),
+            ("/r/d", True, {}),
+            ("/r/d/z", False, {"size": 4}),
+        ])
+
+        self.assertEqual([node.path for node in created], ["/r/d", "/r/d/z"])
+        self.assertEqual(self.file_system.get_node_by_path("/r/f.txt").children, ())
+        self.assertIsNone(self.file_system.get_node_by_path("/r/f.txt/x"))
+        self.assertIsNone(self.file_system.get_node_by_path("/r/f.txt/d"))
+
+    def test_create_node_rejects_file_parent(self):
+        with self.assertRaises(ValueError):
+            self.file_system.create_node("/r/f.txt/x")
+
+    def test_existing_entry_keeps_description(self):
+        self.file_system.update_node("/r/f.txt", {"description": "설명"})
+
+        self.file_system.bulk_create([("/r/f.txt", False, {"size": 5})])
+
+        metadata = self.file_system.get_node_by_path("/r/f.txt").metadata
+        self.assertEqual((metadata["size"], metadata["description"]), (5, "설명"))
+
+
+if __name__ == "__main__":
+    unittest.main()
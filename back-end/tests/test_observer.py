@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+
+from indexer.file_indexer import FileIndexer
+from indexer.filesystem import FileSystem
+from indexer.scanner import FileSystemScanner
+from monitor.coalescer import MODIFIED, MOVED
+from monitor.fingerprint import ContentFingerprinter, HashCache
+from monitor.observer import FolderHandler
+
+
+class FolderHandlerTest(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.temp.name, "root")
+        os.makedirs(self.root)
+        self.path = os.path.join(self.root, "a.txt")
+        with open(self.path, "w") as f:
+            f.write("hello")
+        os.chmod(self.path, 0o640)
+
+        self.indexer = FileIndexer(os.path.join(self.temp.name, "logs"), fsync=False)
+        self.file_system = FileSystem(self.indexer)
+        FileSystemScanner(self.root, self.file_system).scan()
+        self.file_system.update_node(self.path, {"description": "설명"})
+
+        self.fingerprinter = ContentFingerprinter(
+            HashCache(os.path.join(self.temp.name, "hash.db"))
+        )
+        self.handler = FolderHandler(
+            self.root, self.file_system, fingerprinter=self.fingerprinter
+        )
+        self.events = []
+        self.file_system.subscribe(lambda event_type, node, **summary: self.events.append(event_type))
+
+    def tearDown(self):
+        self.handler.stat_pool.shutdown()
+        self.fingerprinter.close()
+        self.indexer.close()
+        self.temp.cleanup()
+
+    def test_touch_keeps_description_and_permissions(self):
+        self.fingerprinter._seed(iter([self.path]))
+        stat_result = os.stat(self.path)
+        os.utime(self.path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 10**9))
+
+        self.handler.coalescer.add(self.path, MODIFIED)
+        self.handler.coalescer.flush()
+
+        node = self.file_system.get_node_by_path(self.path)
+        self.assertEqual(self.events, [])
+        self.assertEqual(node.mtime_ns, os.stat(self.path).st_mtime_ns)
+        self.assertEqual(node.metadata["description"], "설명")
+        self.assertEqual(node.metadata["permissions"], "640")
+        self.assertEqual(node.metadata["owner"], stat_result.st_uid)
+
+    def test_move_keeps_uuid_and_description(self):
+        node = self.file_system.get_node_by_path(self.path)
+        dest_path = os.path.join(self.root, "b.txt")
+        os.rename(self.path, dest_path)
+
+        self.handler.apply_change(dest_path, MOVED, False, src_path=self.path)
+
+        moved = self.file_system.get_node_by_path(dest_path)
+        self.assertIsNone(self.file_system.get_node_by_path(self.path))
+        self.assertIs(moved, node)
+        self.assertEqual(self.events, ["moved"])
+        self.assertEqual(moved.metadata["description"], "설명")
+        self.assertEqual(moved.metadata["permissions"], "640")
+        self.assertEqual(moved.metadata["path"], dest_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
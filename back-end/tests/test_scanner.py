@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+
+from indexer.file_indexer import FileIndexer
+from indexer.filesystem import FileSystem
+from indexer.scanner import FileSystemScanner
+
+
+class RefreshTest(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.temp.name, "root")
+        os.makedirs(os.path.join(self.root, "a", "b", "c"))
+        self.indexer = FileIndexer(os.path.join(self.temp.name, "logs"), fsync=False)
+        self.file_system = FileSystem(self.indexer)
+        self.scanner = FileSystemScanner(self.root, self.file_system)
+        self.scanner.scan()
+
+    def tearDown(self):
+        self.indexer.close()
+        self.temp.cleanup()
+
+    def test_second_refresh_skips_listed_directory(self):
+        path = os.path.join(self.root, "a", "b", "c", "new.txt")
+        with open(path, "w") as f:
+            f.write("x")
+
+        first = self.scanner.refresh()
+        second = self.scanner.refresh()
+
+        self.assertEqual((first.directories_visited, first.created), (1, 1))
+        self.assertIsNotNone(self.file_system.get_node_by_path(path))
+        self.assertEqual((second.directories_visited, second.created), (0, 0))
+
+    def test_full_refresh_finds_in_place_modification(self):
+        path = os.path.join(self.root, "a", "f.txt")
+        with open(path, "w") as f:
+            f.write("x")
+        self.scanner.refresh()
+        stat_result = os.stat(path)
+        with open(path, "w") as f:
+            f.write("longer")
+        os.utime(path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 10**9))
+
+        self.assertEqual(self.scanner.refresh().modified, 0)
+        self.assertEqual(self.scanner.refresh(trust_dir_mtime=False).modified, 1)
+        self.assertEqual(self.file_system.get_node_by_path(path).size, 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import tempfile
+import unittest
+
+from indexer.sqlite_indexer import SQLiteFileIndexer
+
+
+class StatisticsTest(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.indexer = SQLiteFileIndexer(self.temp.name, flush_interval=60)
+        self.indexer.root_path = "/r"
+
+    def tearDown(self):
+        self.indexer.close()
+        self.temp.cleanup()
+
+    def rebuilt_statistics(self) -> dict:
+        """전체 집계로 다시 만든 카운터 (트리거로 유지한 값과 비교용, 되돌림)"""
+        with self.indexer.engine.connect() as conn:
+            with conn.begin() as transaction:
+                self.indexer._rebuild_statistics(conn)
+                counters = self.indexer._read_statistics(conn)
+                transaction.rollback()
+        return counters
+
+    def test_counters_follow_upserts_moves_and_deletes(self):
+        self.indexer.add_events([
+            ("created", "/r/a", {}, True),
+            ("created", "/r/a/x.txt", {"size": 10}, False),
+            ("created", "/r/a/y.py", {"size": 5}, False),
+            ("created", "/r/z.txt", {"size": 1}, False),
+        ])
+        self.indexer.add_event("modified", "/r/a/x.txt", {"size": 30}, False)
+        self.indexer.add_event("moved", "/r/b", {"src_path": "/r/a"}, True)
+        self.indexer.add_event("deleted", "/r/z.txt", {}, False)
+
+        statistics = self.indexer.get_detailed_statistics()
+
+        self.assertEqual(statistics["total_files"], 3)
+        self.assertEqual(statistics["total_events"], 7)
+        self.assertEqual(statistics["file_count"], 2)
+        self.assertEqual(statistics["directory_count"], 1)
+        self.assertEqual(statistics["total_bytes"], 35)
+        self.assertEqual(statistics["extensions"], {"txt": 1, "py": 1})
+        self.assertEqual(statistics["top_level_directories"], {"b": 3})
+        self.assertEqual(
+            statistics["event_types"], {"created": 4, "modified": 1, "moved": 1, "deleted": 1}
+        )
+        with self.indexer.engine.connect() as conn:
+            self.assertEqual(self.indexer._read_statistics(conn), self.rebuilt_statistics())
+
+    def test_existing_database_is_backfilled_once(self):
+        self.indexer.add_event("created", "/r/x.txt", {"size": 4}, False)
+        self.indexer.close()
+        with self.indexer.engine.begin() as conn:
+            conn.exec_driver_sql("DROP TABLE statistics")
+
+        self.indexer = SQLiteFileIndexer(self.temp.name, flush_interval=60)
+        statistics = self.indexer.get_detailed_statistics()
+
+        self.assertEqual((statistics["total_files"], statistics["total_bytes"]), (1, 4))
+        self.assertEqual(statistics["event_types"], {"created": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
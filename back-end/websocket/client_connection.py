@@ -0,0 +1,146 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Callable, Dict, Optional, Union
+from fastapi import WebSocket
+from .encoding import COLUMNAR, JSON, encode_columns, encode_frame
+
+logger = logging.getLogger(__name__)
+
+# 큐가 가득 찼을 때의 처리 방식
+DROP_OLDEST = "drop_oldest"  # 가장 오래된 메시지를 버림
+RESYNC = "resync"  # 대기 중인 메시지를 모두 버리고 재동기화 요청 메시지 하나로 대체
+DISCONNECT = "disconnect"  # 연결을 끊음
+OVERFLOW_POLICIES = (DROP_OLDEST, RESYNC, DISCONNECT)
+
+RESYNC_MESSAGE = {"type": "resync_required"}
+
+
+class ClientConnection:
+    """클라이언트 하나의 송신 큐와 전용 송신 태스크
+
+    브로드캐스트는 큐에 넣기만 하므로 느린 클라이언트가 다른 클라이언트나
+    디스패치 루프를 막지 않는다. 큐가 max_queue를 넘으면 overflow_policy에 따라
+    처리한다.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        max_queue: int,
+        overflow_policy: str = DROP_OLDEST,
+        on_close: Optional[Callable[[WebSocket], None]] = None,
+    ):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.overflow_policy = overflow_policy
+        self.on_close = on_close
+        self.queue = deque()  # (넣은 시각, 직렬화된 프레임)
+        self.encoding = JSON  # 클라이언트가 협상한 인코딩
+        self.compress = False  # True면 zlib 압축 바이너리 프레임
+        self.connected_at = time.time()
+        self.sent = 0
+        self.dropped = 0
+        self.resyncs = 0
+        self.last_lag = 0.0  # 마지막으로 보낸 메시지가 큐에서 기다린 시간 (초)
+        self.closed = False
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def encode(self, message: dict, raw: Optional[Dict[str, str]] = None) -> Union[str, bytes]:
+        """개별 응답 메시지를 이 클라이언트의 인코딩으로 직렬화
+
+        columnar 클라이언트에게는 응답에 담긴 이벤트 목록(sync, 스냅샷 따라잡기)도
+        열 단위로 보낸다. raw는 이미 직렬화된 값 (encode_message 참고).
+        """
+        if self.encoding == COLUMNAR and isinstance(message.get("events"), list):
+            message = {**message, "events": encode_columns(message["events"])}
+        return encode_frame([message], JSON, self.compress, raw=raw)
+
+    def enqueue(self, text: Union[str, bytes]) -> bool:
+        """메시지를 송신 큐에 추가 (연결이 끊겼거나 끊어야 하면 False)"""
+        if self.closed:
+            return False
+
+        now = time.monotonic()
+        if len(self.queue) >= self.max_queue:
+            if self.overflow_policy == DISCONNECT:
+                logger.warning(f"Disconnecting slow WebSocket client ({len(self.queue)} queued)")
+                asyncio.ensure_future(self._close(code=1013))
+                return False
+            if self.overflow_policy == RESYNC:
+                # 밀린 메시지 대신 클라이언트가 전체를 다시 받도록 알림
+                self.dropped += len(self.queue)
+                self.resyncs += 1
+                self.queue.clear()
+                self.queue.append((now, self.encode(RESYNC_MESSAGE)))
+            else:
+                self.queue.popleft()
+                self.dropped += 1
+
+        self.queue.append((now, text))
+        self._ready.set()
+        return True
+
+    async def _run(self):
+        try:
+            while True:
+                if not self.queue:
+                    self._ready.clear()
+                    await self._ready.wait()
+                    continue
+                enqueued_at, frame = self.queue.popleft()
+                if isinstance(frame, bytes):
+                    await self.websocket.send_bytes(frame)
+                else:
+                    await self.websocket.send_text(frame)
+                self.sent += 1
+                self.last_lag = time.monotonic() - enqueued_at
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error sending WebSocket message: {e}")
+            await self._close()
+
+    async def _close(self, code: int = 1000):
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.clear()
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+        if self.on_close:
+            self.on_close(self.websocket)
+        self.stop()
+
+    def stop(self):
+        """송신 태스크 중지 (연결 해제 시)"""
+        self.closed = True
+        self.queue.clear()
+        if self._task and self._task is not asyncio.current_task():
+            self._task.cancel()
+
+    def metrics(self) -> dict:
+        """지연 지표 (대기 메시지 수, 가장 오래된 대기 메시지의 나이 등)"""
+        oldest_age = time.monotonic() - self.queue[0][0] if self.queue else 0.0
+        client = self.websocket.client
+        return {
+            "client": f"{client.host}:{client.port}" if client else None,
+            "connected_at": self.connected_at,
+            "queued": len(self.queue),
+            "max_queue": self.max_queue,
+            "overflow_policy": self.overflow_policy,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "resyncs": self.resyncs,
+            "lag_seconds": round(oldest_age, 4),
+            "last_lag_seconds": round(self.last_lag, 4),
+        }
@@ -0,0 +1,173 @@
+import os
+import json
+import zlib
+from typing import Dict, List, Optional, Tuple, Union
+
+# 클라이언트가 {"action": "set_encoding", ...}로 고를 수 있는 인코딩
+JSON = "json"  # 기본값: 메시지마다 JSON (여러 개면 batch로 감쌈)
+COLUMNAR = "columnar"  # 이벤트 묶음을 열(column) 단위로 압축한 프레임
+ENCODINGS = (JSON, COLUMNAR)
+
+# 열 종류
+RAW = "r"  # 값을 그대로
+STRING = "s"  # 문자열 테이블 인덱스 (없으면 -1)
+PATH = "p"  # 공통 접두사 기준 (디렉토리 인덱스, 이름 인덱스) 쌍
+DELTA = "d"  # 정수: 첫 값과 이후 차이값 (seq, inode, mtime_ns처럼 증가하는 값)
+CONSTANT = "c"  # 모든 행이 같은 값
+
+COMPRESS_LEVEL = 6
+
+
+def encode_message(message: dict, raw: Optional[Dict[str, str]] = None) -> str:
+    """send_json과 같은 형식으로 직렬화 (모든 클라이언트가 결과를 공유)
+
+    raw는 키 -> 이미 직렬화된 JSON 문자열로, 캐시된 트리처럼 큰 값을 다시
+    직렬화하지 않고 그대로 끼워 넣는다.
+    """
+    text = json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+    if not raw:
+        return text
+    fields = ",".join(f"{json.dumps(key)}:{value}" for key, value in raw.items())
+    return text[:-1] + ("," if message else "") + fields + "}"
+
+
+def _flatten(message: dict, prefix: Tuple[str, ...], row: dict):
+    """중첩 dict를 (키, 하위 키, ...) 튜플 -> 값으로 펼침 (빈 dict는 값으로 남김)"""
+    for key, value in message.items():
+        name = prefix + (key,)
+        if isinstance(value, dict) and value:
+            _flatten(value, name, row)
+        elif value is not None:
+            row[name] = value
+
+
+class _StringTable:
+    def __init__(self):
+        self.strings: List[str] = []
+        self._index: Dict[str, int] = {}
+
+    def __contains__(self, value: str) -> bool:
+        return value in self._index
+
+    def add(self, value: str) -> int:
+        index = self._index.get(value)
+        if index is None:
+            index = self._index[value] = len(self.strings)
+            self.strings.append(value)
+        return index
+
+
+def encode_columns(messages: List[dict]) -> dict:
+    """메시지 목록을 열 단위 프레임으로 변환
+
+    중첩 dict는 ["node", "metadata", "size"] 같은 키 목록 열로 펼친다 (키에 "."이
+    들어 있어도 섞이지 않고, 빈 dict는 그 자리의 값으로 보낸다). 반복되는 문자열
+    (이벤트 종류, 이름, 확장자 등)은 문자열 테이블 인덱스로, "path" 열은 공통
+    접두사 기준 상대 디렉토리와 이름의 인덱스 쌍으로, 정수 열은 차이값으로,
+    모든 행이 같은 열은 값 하나로 보낸다. 값이 없는 칸은 RAW 열에서 null,
+    STRING/PATH 열에서 -1이다. 열은 [키 목록, 종류, 값] 목록이고, 경로를 나눌 때
+    쓴 구분자(sep)를 함께 보낸다.
+    """
+    rows = []
+    keys: Dict[Tuple[str, ...], None] = {}
+    for message in messages:
+        row = {}
+        _flatten(message, (), row)
+        rows.append(row)
+        keys.update(dict.fromkeys(row))
+
+    # 경로 열의 공통 접두사
+    directories = [
+        os.path.dirname(value)
+        for row in rows
+        for key, value in row.items()
+        if key[-1] == "path" and isinstance(value, str) and value
+    ]
+    try:
+        prefix = os.path.commonpath(directories) if directories else ""
+    except ValueError:
+        prefix = ""
+
+    table = _StringTable()
+    columns = {}
+    # 경로 열을 먼저 처리해 이름 열이 경로의 이름 인덱스를 재사용하게 함
+    ordered = sorted(keys, key=lambda key: key[-1] != "path")
+    for key in ordered:
+        values = [row.get(key) for row in rows]
+        present = [value for value in values if value is not None]
+        if len(present) == len(values) and all(
+            type(value) is type(values[0]) and value == values[0] for value in values
+        ):
+            columns[key] = [CONSTANT, values[0]]
+        elif (
+            prefix
+            and key[-1] == "path"
+            and all(isinstance(value, str) and value for value in present)
+        ):
+            pairs = []
+            for value in values:
+                if value is None:
+                    pairs.extend((-1, -1))
+                    continue
+                directory, name = os.path.split(value)
+                pairs.append(table.add(directory[len(prefix):]))
+                pairs.append(table.add(name))
+            columns[key] = [PATH, pairs]
+        elif all(isinstance(value, str) for value in present) and (
+            len(set(present)) < len(present) or all(value in table for value in present)
+        ):
+            # 반복되거나 이미 테이블에 있는 문자열만 인덱스로 (uuid처럼 모두 다른 값은 그대로)
+            columns[key] = [
+                STRING,
+                [-1 if value is None else table.add(value) for value in values],
+            ]
+        elif len(present) == len(values) and all(
+            type(value) is int for value in values
+        ):
+            columns[key] = [
+                DELTA,
+                [values[0]] + [b - a for a, b in zip(values, values[1:])],
+            ]
+        else:
+            columns[key] = [RAW, values]
+    return {
+        "type": "columns",
+        "count": len(messages),
+        "prefix": prefix,
+        "sep": os.sep,
+        "strings": table.strings,
+        # 열 순서는 원래 키 순서대로
+        "columns": [[list(key), *columns[key]] for key in keys],
+    }
+
+
+def encode_frame(messages: List[dict], encoding: str, compress: bool,
+                 encoded: Dict[int, str] = None,
+                 raw: Optional[Dict[str, str]] = None) -> Union[str, bytes]:
+    """클라이언트가 고른 인코딩으로 프레임 생성 (compress면 zlib 바이너리 프레임)
+
+    encoded는 메시지 id -> JSON 문자열 캐시로, 여러 클라이언트가 같은 메시지의
+    직렬화 결과를 공유하게 한다. raw는 JSON 메시지 하나에 끼워 넣을 직렬화된
+    값이다 (encode_message 참고).
+    """
+    if encoding == COLUMNAR:
+        text = encode_message(encode_columns(messages))
+    elif raw:
+        text = encode_message(messages[0], raw)
+    else:
+        if encoded is None:
+            encoded = {}
+        parts = []
+        for message in messages:
+            part = encoded.get(id(message))
+            if part is None:
+                part = encoded[id(message)] = encode_message(message)
+            parts.append(part)
+        if len(parts) == 1:
+            text = parts[0]
+        else:
+            text = '{"type":"batch","events":[' + ",".join(parts) + "]}"
+
+    if compress:
+        return zlib.compress(text.encode("utf-8"), COMPRESS_LEVEL)
+    return text
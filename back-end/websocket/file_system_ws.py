@@ -1,15 +1,40 @@
+import os
+import uuid
+import asyncio
+import threading
+from collections import deque
+from itertools import islice
+from typing import List, Optional
 from fastapi import WebSocket
 from indexer.filesystem import FileSystem
 from .websocket_base import WebSocketManagerBase
 
+# 재연결한 클라이언트에게 다시 보낼 수 있도록 보관하는 최근 이벤트 수
+FEED_BUFFER_SIZE = int(os.environ.get("WS_FEED_BUFFER_SIZE", "10000"))
+# 트리 상태를 전달하므로 이벤트를 조용히 버리지 않고 재동기화를 요청하는 것이 기본
+OVERFLOW_POLICY = os.environ.get("WS_OVERFLOW_POLICY", "resync")
+
 
 class FileSystemManager(WebSocketManagerBase):
-    def __init__(self, file_system: FileSystem):
-        super().__init__()
+    """파일 시스템 이벤트에 순번(seq)을 붙여 전달하는 매니저
+
+    최근 이벤트를 링 버퍼에 보관하여, 재연결한 클라이언트가
+    {"action": "sync", "last_seq": N, "epoch": E}를 보내면 놓친 이벤트만 보낸다.
+    버퍼 범위를 벗어났거나 서버가 재시작되어 epoch가 다르면 트리 스냅샷과
+    그 이후의 이벤트를 보낸다.
+    """
+
+    def __init__(self, file_system: FileSystem, feed_size: int = FEED_BUFFER_SIZE,
+                 overflow_policy: str = OVERFLOW_POLICY):
+        super().__init__(overflow_policy=overflow_policy)
         self.file_system = file_system
+        self.epoch = uuid.uuid4().hex  # 서버 실행마다 달라지는 seq 기준
+        self.seq = 0
+        self.feed = deque(maxlen=feed_size)
+        self._feed_lock = threading.Lock()
         self.file_system.subscribe(self.handle_filesystem_event)
 
-    def handle_filesystem_event(self, event_type: str, node):
+    def handle_filesystem_event(self, event_type: str, node, **summary):
         # 파일 시스템 이벤트를 웹소켓으로 전달
         message = {
             "type": event_type,
@@ -21,25 +46,76 @@ class FileSystemManager(WebSocketManagerBase):
                 "metadata": node.metadata,
             },
         }
-        self.sync_notify(message)
+        if summary:
+            # bulk_created 같은 요약 이벤트는 node가 묶음의 상위 디렉토리
+            message["summary"] = summary
+        with self._feed_lock:
+            # 순번 부여와 큐 삽입을 함께 잠가 seq 순서대로 전달되도록 함
+            self.seq += 1
+            message["seq"] = self.seq
+            self.feed.append(message)
+            self.sync_notify(message)
+
+    def event_path(self, message: dict) -> Optional[str]:
+        return message["node"]["path"]
+
+    def events_since(self, last_seq: int) -> Optional[List[dict]]:
+        """last_seq 이후의 이벤트 (버퍼 범위를 벗어났으면 None)"""
+        with self._feed_lock:
+            if last_seq > self.seq:
+                return None
+            if last_seq == self.seq:
+                return []
+            first_seq = self.feed[0]["seq"] if self.feed else self.seq + 1
+            if last_seq + 1 < first_seq:
+                return None
+            return list(islice(self.feed, last_seq + 1 - first_seq, None))
 
     async def handle_client_message(self, websocket: WebSocket, message: dict):
         # 파일 시스템 관련 클라이언트 메시지 처리
-        if message.get("action") == "get_tree":
+        if await self.handle_control_message(websocket, message):
+            return
+        action = message.get("action")
+        if action == "get_tree":
             await self.send_filesystem_tree(websocket)
+        elif action == "sync":
+            await self.send_missed_events(
+                websocket, message.get("last_seq"), message.get("epoch")
+            )
+
+    async def send_missed_events(self, websocket: WebSocket, last_seq, epoch):
+        # 놓친 이벤트만 전송 (불가능하면 전체 트리)
+        if epoch == self.epoch and isinstance(last_seq, int):
+            events = self.events_since(last_seq)
+            if events is not None:
+                events = [event for event in events if self.accepts(websocket, event)]
+                await self.send_personal(
+                    websocket,
+                    {"type": "sync", "epoch": self.epoch, "seq": last_seq, "events": events},
+                )
+                return
+        await self.send_filesystem_tree(websocket)
 
     async def send_filesystem_tree(self, websocket: WebSocket):
-        # 파일 시스템 트리 정보 전송
+        # 파일 시스템 트리 정보 전송 (트리를 만드는 동안 생긴 이벤트도 함께)
+        # 트리는 디렉토리별 직렬화 캐시를 이어 붙인 문자열을 그대로 보냄
+        # (큰 트리 직렬화가 이벤트 루프를 막지 않도록 스레드에서)
         if self.file_system.root:
-            tree = self.build_tree(self.file_system.root)
-            await websocket.send_json({"type": "filesystem_tree", "data": tree})
-
-    def build_tree(self, node):
-        return {
-            "uuid": node.uuid,
-            "name": node.name,
-            "path": node.path,
-            "is_directory": node.is_directory,
-            "metadata": node.metadata,
-            "children": [self.build_tree(child) for child in node.children],
-        }
+            seq = self.seq
+            tree = await asyncio.to_thread(
+                self.file_system.tree_cache.subtree_json, self.file_system.root
+            )
+            await self.send_personal(
+                websocket,
+                {
+                    "type": "filesystem_tree",
+                    "epoch": self.epoch,
+                    "seq": seq,
+                    "events": [
+                        event
+                        for event in self.events_since(seq) or []
+                        if self.accepts(websocket, event)
+                    ],
+                },
+                raw={"data": tree},
+            )
@@ -0,0 +1,198 @@
+import os
+from fnmatch import fnmatchcase
+from typing import Dict, Iterable, List, Optional, Set
+
+GLOB_CHARS = frozenset("*?[")
+
+
+def split_path(path: str) -> List[str]:
+    """경로를 트라이 키(경로 구성 요소 목록)로 변환"""
+    return [part for part in os.path.normpath(path).split(os.sep) if part]
+
+
+def literal_prefix(pattern: str) -> List[str]:
+    """glob 패턴에서 와일드카드가 처음 나오기 전까지의 구성 요소"""
+    parts = []
+    for part in split_path(pattern):
+        if GLOB_CHARS.intersection(part):
+            break
+        parts.append(part)
+    return parts
+
+
+class Subscription:
+    """클라이언트 하나의 구독 조건 (경로 접두사, glob 패턴, 이벤트 종류)"""
+
+    __slots__ = ("client", "paths", "globs", "event_types")
+
+    def __init__(self, client, paths: tuple, globs: tuple, event_types: Optional[frozenset]):
+        self.client = client
+        self.paths = paths
+        self.globs = globs
+        self.event_types = event_types  # None이면 모든 종류
+
+    def accepts_type(self, event_type: str) -> bool:
+        return self.event_types is None or event_type in self.event_types
+
+    def to_dict(self) -> dict:
+        return {
+            "paths": list(self.paths),
+            "globs": list(self.globs),
+            "event_types": sorted(self.event_types) if self.event_types else None,
+        }
+
+
+class _TrieNode:
+    __slots__ = ("children", "subscribers", "globs")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.subscribers: Set[Subscription] = set()  # 이 경로 이하 전체를 구독
+        self.globs: List[tuple] = []  # 이 경로가 리터럴 접두사인 (패턴, 구독)
+
+    def is_empty(self) -> bool:
+        return not (self.children or self.subscribers or self.globs)
+
+
+class SubscriptionIndex:
+    """경로 구성 요소 트라이로 구독을 찾는 인덱스
+
+    접두사 구독은 해당 경로의 노드에, glob 구독은 와일드카드 앞까지의 리터럴
+    접두사 노드에 저장한다. 이벤트 경로를 따라 트라이를 한 번 내려가며 만나는
+    구독만 검사하므로 비용은 구독자 수가 아니라 경로 깊이에 비례한다.
+    구독하지 않은 클라이언트는 모든 이벤트를 받는다 (인덱스에 없음).
+    """
+
+    def __init__(self):
+        self._root = _TrieNode()
+        self._subscriptions: Dict[object, Subscription] = {}
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+    def __contains__(self, client) -> bool:
+        return client in self._subscriptions
+
+    def get(self, client) -> Optional[Subscription]:
+        return self._subscriptions.get(client)
+
+    def clients(self) -> set:
+        return set(self._subscriptions)
+
+    def _node(self, parts: List[str], create: bool = False) -> Optional[_TrieNode]:
+        node = self._root
+        for part in parts:
+            child = node.children.get(part)
+            if child is None:
+                if not create:
+                    return None
+                child = node.children[part] = _TrieNode()
+            node = child
+        return node
+
+    def subscribe(
+        self,
+        client,
+        paths: Iterable[str] = (),
+        globs: Iterable[str] = (),
+        event_types: Optional[Iterable[str]] = None,
+    ) -> Subscription:
+        """클라이언트의 구독을 설정 (기존 구독은 교체)"""
+        self.unsubscribe(client)
+        subscription = Subscription(
+            client,
+            tuple(os.path.normpath(path) for path in paths),
+            tuple(os.path.normpath(pattern) for pattern in globs),
+            frozenset(event_types) if event_types else None,
+        )
+        if not subscription.paths and not subscription.globs:
+            # 경로 조건 없이 이벤트 종류만 거르는 구독
+            self._root.subscribers.add(subscription)
+        for path in subscription.paths:
+            self._node(split_path(path), create=True).subscribers.add(subscription)
+        for pattern in subscription.globs:
+            self._node(literal_prefix(pattern), create=True).globs.append(
+                (pattern, subscription)
+            )
+        self._subscriptions[client] = subscription
+        return subscription
+
+    def unsubscribe(self, client):
+        subscription = self._subscriptions.pop(client, None)
+        if subscription is None:
+            return
+        if not subscription.paths and not subscription.globs:
+            self._root.subscribers.discard(subscription)
+        for path in subscription.paths:
+            self._remove(split_path(path), lambda node: node.subscribers.discard(subscription))
+        for pattern in subscription.globs:
+            self._remove(
+                literal_prefix(pattern),
+                lambda node: node.globs.remove((pattern, subscription)),
+            )
+
+    def _remove(self, parts: List[str], detach):
+        """노드에서 구독을 떼어낸 뒤 비게 된 노드를 정리"""
+        trail = [self._root]
+        for part in parts:
+            child = trail[-1].children.get(part)
+            if child is None:
+                return
+            trail.append(child)
+        detach(trail[-1])
+        for depth in range(len(parts), 0, -1):
+            if not trail[depth].is_empty():
+                break
+            del trail[depth - 1].children[parts[depth - 1]]
+
+    def match(self, path: str, event_type: str, subtree: bool = False) -> set:
+        """이벤트를 받을 클라이언트 집합
+
+        subtree가 True이면 (bulk_created 같은 요약 이벤트) path 아래를 구독한
+        클라이언트도 포함한다.
+        """
+        matched = set()
+        node = self._root
+        self._collect(node, path, event_type, matched)
+        for part in split_path(path):
+            node = node.children.get(part)
+            if node is None:
+                return matched
+            self._collect(node, path, event_type, matched)
+
+        if subtree:
+            stack = list(node.children.values())
+            while stack:
+                below = stack.pop()
+                for subscription in below.subscribers:
+                    if subscription.accepts_type(event_type):
+                        matched.add(subscription.client)
+                for _, subscription in below.globs:
+                    if subscription.accepts_type(event_type):
+                        matched.add(subscription.client)
+                stack.extend(below.children.values())
+            for _, subscription in node.globs:
+                if subscription.accepts_type(event_type):
+                    matched.add(subscription.client)
+        return matched
+
+    @staticmethod
+    def _collect(node: _TrieNode, path: str, event_type: str, matched: set):
+        for subscription in node.subscribers:
+            if subscription.accepts_type(event_type):
+                matched.add(subscription.client)
+        for pattern, subscription in node.globs:
+            if (
+                subscription.client not in matched
+                and subscription.accepts_type(event_type)
+                and fnmatchcase(path, pattern)
+            ):
+                matched.add(subscription.client)
+
+    def accepts(self, client, path: Optional[str], event_type: str,
+                subtree: bool = False) -> bool:
+        """client가 이 이벤트를 받아야 하는지 (구독하지 않았으면 항상 True)"""
+        subscription = self._subscriptions.get(client)
+        if subscription is None or path is None:
+            return True
+        return client in self.match(path, event_type, subtree)
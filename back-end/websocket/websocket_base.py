@@ -1,54 +1,233 @@
 from abc import ABC, abstractmethod
 from fastapi import WebSocket
-from typing import List
+from typing import Dict, List, Optional
+import os
 import asyncio
-from queue import Queue
 import logging
+from .client_connection import ClientConnection
+from .encoding import ENCODINGS, encode_frame
+from .subscriptions import SubscriptionIndex
 
 logger = logging.getLogger(__name__)
 
+# 한 프레임에 묶어 보낼 최대 이벤트 수
+MAX_BATCH_SIZE = int(os.environ.get("WS_MAX_BATCH_SIZE", "500"))
+# 첫 이벤트 이후 뒤따르는 이벤트를 더 모으기 위해 기다리는 시간 (초)
+BATCH_LINGER = float(os.environ.get("WS_BATCH_LINGER", "0.005"))
+# 클라이언트별 송신 큐 크기와 초과 시 처리 방식 (drop_oldest | resync | disconnect)
+CLIENT_QUEUE_SIZE = int(os.environ.get("WS_CLIENT_QUEUE_SIZE", "1000"))
+OVERFLOW_POLICY = os.environ.get("WS_OVERFLOW_POLICY", "drop_oldest")
+
 
 class WebSocketManagerBase(ABC):
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        self.message_queue = Queue()
+    """이벤트를 모아 연결된 클라이언트에 브로드캐스트하는 매니저
+
+    다른 스레드(watchdog 등)는 sync_notify로 이벤트 루프의 asyncio.Queue에 메시지를
+    넘기고, process_queue가 대기 중인 메시지를 모두 꺼내 하나의 프레임으로 보낸다.
+    메시지가 하나면 그대로, 여러 개면 {"type": "batch", "events": [...]}로 보낸다.
+    메시지는 한 번만 직렬화해 클라이언트별 송신 큐(ClientConnection)에 넣는다.
+    클라이언트는 열 단위(columnar) 인코딩과 zlib 압축을 선택할 수 있다.
+    {"action": "subscribe", ...}로 구독한 클라이언트에게는 구독 조건에 맞는
+    이벤트만 골라 보낸다.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        linger: float = BATCH_LINGER,
+        client_queue_size: int = CLIENT_QUEUE_SIZE,
+        overflow_policy: str = OVERFLOW_POLICY,
+    ):
+        self.clients: Dict[WebSocket, ClientConnection] = {}
+        self.subscriptions = SubscriptionIndex()
+        self.message_queue: asyncio.Queue = asyncio.Queue()
+        self.max_batch_size = max_batch_size
+        self.linger = linger
+        self.client_queue_size = client_queue_size
+        self.overflow_policy = overflow_policy
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._backlog = []  # 이벤트 루프가 연결되기 전에 들어온 메시지
         self.is_running = True
 
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self.clients)
+
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        client = ClientConnection(
+            websocket,
+            self.client_queue_size,
+            self.overflow_policy,
+            on_close=self.disconnect,
+        )
+        self.clients[websocket] = client
+        client.start()
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        self.subscriptions.unsubscribe(websocket)
+        client = self.clients.pop(websocket, None)
+        if client:
+            client.stop()
+
+    def event_path(self, message: dict) -> Optional[str]:
+        """구독 필터링에 쓰는 이벤트 경로"""
+        return (message.get("metadata") or {}).get("path")
+
+    def accepts(self, websocket: WebSocket, message: dict) -> bool:
+        """websocket이 구독 조건상 message를 받아야 하는지"""
+        return self.subscriptions.accepts(
+            websocket, self.event_path(message), message.get("type"), "summary" in message
+        )
 
     async def broadcast(self, message: dict):
-        if not self.active_connections:
+        await self.broadcast_batch([message])
+
+    async def broadcast_batch(self, messages: List[dict]):
+        """메시지를 각 클라이언트 큐에 넣음 (전송을 기다리지 않음)
+
+        같은 메시지 묶음과 인코딩을 받는 클라이언트들은 직렬화된 프레임 하나를
+        공유하고, JSON 메시지 직렬화 결과는 묶음이 달라도 재사용한다.
+        """
+        if not self.clients:
             return
 
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                logger.error(f"Error broadcasting message: {e}")
-                disconnected.append(connection)
+        everyone = tuple(range(len(messages)))
+        selected: Dict[WebSocket, List[int]] = {}
+        if self.subscriptions:
+            # 구독한 클라이언트별로 받을 메시지를 고름 (경로 깊이만큼 트라이 탐색)
+            for index, message in enumerate(messages):
+                path = self.event_path(message)
+                if path is None:
+                    recipients = self.subscriptions.clients()
+                else:
+                    recipients = self.subscriptions.match(
+                        path, message.get("type"), subtree="summary" in message
+                    )
+                for websocket in recipients:
+                    selected.setdefault(websocket, []).append(index)
 
-        for conn in disconnected:
-            try:
-                self.active_connections.remove(conn)
-            except ValueError:
-                pass
+        encoded = {}
+        frames = {}
+        for websocket, client in list(self.clients.items()):
+            if websocket in self.subscriptions:
+                if websocket not in selected:
+                    continue
+                indexes = tuple(selected[websocket])
+            else:
+                indexes = everyone
+            key = (client.encoding, client.compress, indexes)
+            frame = frames.get(key)
+            if frame is None:
+                frame = frames[key] = encode_frame(
+                    [messages[index] for index in indexes],
+                    client.encoding,
+                    client.compress,
+                    encoded,
+                )
+            client.enqueue(frame)
+
+    async def handle_control_message(self, websocket: WebSocket, message: dict) -> bool:
+        """구독/인코딩 설정 메시지 처리 (처리했으면 True)
+
+        {"action": "subscribe", "paths": [...], "globs": [...], "event_types": [...]}
+        는 기존 구독을 교체하고, {"action": "unsubscribe"}는 모든 이벤트 수신으로 되돌린다.
+        {"action": "set_encoding", "encoding": "columnar", "compress": true}는 이후
+        프레임의 인코딩을 바꾼다 (기본값은 압축하지 않은 JSON).
+        """
+        action = message.get("action")
+        if action == "set_encoding":
+            client = self.clients.get(websocket)
+            encoding = message.get("encoding", "json")
+            if client and encoding in ENCODINGS:
+                # 응답은 바뀌기 전 인코딩으로 보내 클라이언트가 전환 시점을 알 수 있게 함
+                await self.send_personal(
+                    websocket,
+                    {
+                        "type": "encoding",
+                        "encoding": encoding,
+                        "compress": bool(message.get("compress")),
+                    },
+                )
+                client.encoding = encoding
+                client.compress = bool(message.get("compress"))
+            return True
+        if action == "subscribe":
+            subscription = self.subscriptions.subscribe(
+                websocket,
+                paths=message.get("paths") or (),
+                globs=message.get("globs") or (),
+                event_types=message.get("event_types"),
+            )
+            await self.send_personal(websocket, {"type": "subscribed", **subscription.to_dict()})
+            return True
+        if action == "unsubscribe":
+            self.subscriptions.unsubscribe(websocket)
+            await self.send_personal(websocket, {"type": "unsubscribed"})
+            return True
+        return False
+
+    async def send_personal(self, websocket: WebSocket, message: dict,
+                            raw: Optional[Dict[str, str]] = None):
+        """한 클라이언트에게만 보냄 (브로드캐스트와 같은 송신 큐를 거쳐 순서 유지)
+
+        raw는 메시지에 그대로 끼워 넣을 직렬화된 값 (캐시된 트리 등)
+        """
+        client = self.clients.get(websocket)
+        if client:
+            client.enqueue(client.encode(message, raw))
+
+    def metrics(self) -> dict:
+        """클라이언트별 송신 지연 지표"""
+        return {
+            "pending": self.message_queue.qsize(),
+            "subscriptions": len(self.subscriptions),
+            "clients": [
+                {
+                    **client.metrics(),
+                    "subscribed": websocket in self.subscriptions,
+                    "encoding": client.encoding,
+                    "compress": client.compress,
+                }
+                for websocket, client in self.clients.items()
+            ],
+        }
 
     def sync_notify(self, message: dict):
-        self.message_queue.put(message)
+        """어느 스레드에서나 호출 가능한 메시지 전달"""
+        loop = self.loop
+        if loop is None:
+            self._backlog.append(message)
+            return
+        try:
+            loop.call_soon_threadsafe(self.message_queue.put_nowait, message)
+        except RuntimeError:
+            # 종료 중에 이벤트 루프가 닫힌 경우
+            pass
+
+    def _drain(self, batch: list):
+        queue = self.message_queue
+        while len(batch) < self.max_batch_size and not queue.empty():
+            batch.append(queue.get_nowait())
 
     async def process_queue(self):
+        self.loop = asyncio.get_running_loop()
+        backlog, self._backlog = self._backlog, []
+        for message in backlog:
+            self.message_queue.put_nowait(message)
+
         while self.is_running:
             try:
-                if not self.message_queue.empty():
-                    message = self.message_queue.get()
-                    await self.broadcast(message)
-                await asyncio.sleep(0.1)
+                batch = [await self.message_queue.get()]
+                self._drain(batch)
+                if len(batch) < self.max_batch_size and self.linger > 0:
+                    # 연달아 오는 이벤트(대량 복사 등)를 한 프레임에 묶음
+                    await asyncio.sleep(self.linger)
+                    self._drain(batch)
+
+                await self.broadcast_batch(batch)
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 logger.error(f"Error in process_queue: {e}")
                 continue
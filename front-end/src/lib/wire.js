@@ -0,0 +1,67 @@
+// 서버의 columnar 인코딩/압축 프레임 디코더 (back-end/websocket/encoding.py 참고)
+
+async function inflate(buffer) {
+    // 서버는 zlib 형식(= DecompressionStream의 'deflate')으로 압축한다
+    const stream = new Blob([buffer]).stream().pipeThrough(new DecompressionStream('deflate'));
+    return await new Response(stream).text();
+}
+
+// keys는 ['node', 'metadata', 'size'] 같은 키 목록 (키 자체에 '.'이 있어도 됨)
+function setPath(target, keys, value) {
+    let node = target;
+    for (const key of keys.slice(0, -1)) {
+        if (!node[key]) node[key] = {};
+        node = node[key];
+    }
+    node[keys[keys.length - 1]] = value;
+}
+
+// 서버가 경로를 나눌 때 쓴 구분자(sep)로 다시 이어 붙임
+function joinPath(prefix, directory, name, sep) {
+    const dir = prefix + directory;
+    return dir.endsWith(sep) ? dir + name : dir + sep + name;
+}
+
+// {"type": "columns", ...} 프레임을 메시지 배열로 되돌림
+export function decodeColumns(frame) {
+    const { count, prefix, strings, columns } = frame;
+    const sep = frame.sep || '/';
+    const messages = Array.from({ length: count }, () => ({}));
+
+    for (const [keys, kind, values] of columns) {
+        let running = 0;
+        for (let i = 0; i < count; i++) {
+            let value;
+            if (kind === 'c') {
+                // 객체 값(빈 dict 등)은 메시지마다 따로 가지도록 복사
+                value = values !== null && typeof values === 'object' ? structuredClone(values) : values;
+            } else if (kind === 'd') {
+                running = i === 0 ? values[0] : running + values[i];
+                value = running;
+            } else if (kind === 's') {
+                value = values[i] === -1 ? null : strings[values[i]];
+            } else if (kind === 'p') {
+                const dir = values[2 * i];
+                value = dir === -1 ? null : joinPath(prefix, strings[dir], strings[values[2 * i + 1]], sep);
+            } else {
+                value = values[i];
+            }
+            if (value !== null && value !== undefined) setPath(messages[i], keys, value);
+        }
+    }
+    return messages;
+}
+
+// WebSocket 메시지 데이터(문자열 또는 압축된 ArrayBuffer)를 메시지 배열로 변환
+export async function decodeFrame(data) {
+    const text = typeof data === 'string' ? data : await inflate(data);
+    const frame = JSON.parse(text);
+
+    if (frame.type === 'columns') return decodeColumns(frame);
+    if (frame.type === 'batch') return frame.events;
+    if (frame.events && frame.events.type === 'columns') {
+        // sync/스냅샷 응답에 담긴 이벤트 목록
+        frame.events = decodeColumns(frame.events);
+    }
+    return [frame];
+}